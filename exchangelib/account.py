@@ -293,7 +293,7 @@ class Account(object):
             oof_settings=value,
         )
 
-    def _consume_item_service(self, service_cls, items, chunk_size, kwargs):
+    def _consume_item_service(self, service_cls, items, chunk_size, kwargs, ordered=True, parse_func=None):
         # 'items' could be an unevaluated QuerySet, e.g. if we ended up here via `some_folder.filter(...).delete()`. In
         # that case, we want to use its iterator. Otherwise, peek() will start a count() which is wasteful because we
         # need the item IDs immediately afterwards. iterator() will only do the bare minimum.
@@ -305,20 +305,29 @@ class Account(object):
             # empty 'ids' and return early.
             return
         kwargs['items'] = items
-        for i in service_cls(account=self, chunk_size=chunk_size).call(**kwargs):
-            yield i
+        for i in service_cls(account=self, chunk_size=chunk_size, ordered=ordered).call(**kwargs):
+            if parse_func is None:
+                yield i
+            elif ordered:
+                yield i if isinstance(i, Exception) else parse_func(i)
+            else:
+                # Results are (index, result) tuples
+                index, i = i
+                yield index, i if isinstance(i, Exception) else parse_func(i)
 
-    def export(self, items, chunk_size=None):
+    def export(self, items, chunk_size=None, ordered=True):
         """Return export strings of the given items
 
         :param items: An iterable containing the Items we want to export
         :param chunk_size: The number of items to send to the server in a single request
+        :param ordered: If False, return (index, result) tuples in the order the results were received from the
+               server. 'index' is the position of the corresponding item in 'items'.
 
         :return A list of strings, the exported representation of the object
         """
-        return list(
-            self._consume_item_service(service_cls=ExportItems, items=items, chunk_size=chunk_size, kwargs=dict())
-        )
+        return list(self._consume_item_service(
+            service_cls=ExportItems, items=items, chunk_size=chunk_size, kwargs=dict(), ordered=ordered
+        ))
 
     def upload(self, data, chunk_size=None):
         """Adds objects retrieved from export into the given folders
@@ -357,6 +366,16 @@ class Account(object):
                  BulkCreateResult objects are normal Item objects except they only contain the 'id' and 'changekey'
                  of the created item, and the 'id' of any attachments that were also created.
         """
+        kwargs = self._get_bulk_create_kwargs(
+            folder=folder, items=items, message_disposition=message_disposition,
+            send_meeting_invitations=send_meeting_invitations,
+        )
+        return list(self._consume_item_service(
+            service_cls=CreateItem, items=items, chunk_size=chunk_size, kwargs=kwargs,
+            parse_func=self._bulk_create_result_from_xml,
+        ))
+
+    def _get_bulk_create_kwargs(self, folder, items, message_disposition, send_meeting_invitations):
         if message_disposition not in MESSAGE_DISPOSITION_CHOICES:
             raise ValueError("'message_disposition' %s must be one of %s" % (
                 message_disposition, MESSAGE_DISPOSITION_CHOICES
@@ -386,19 +405,18 @@ class Account(object):
             message_disposition,
             send_meeting_invitations,
         )
-        return list(
-            i if isinstance(i, Exception)
-            else BulkCreateResult.from_xml(elem=i, account=self)
-            for i in self._consume_item_service(service_cls=CreateItem, items=items, chunk_size=chunk_size, kwargs=dict(
-                folder=folder,
-                message_disposition=message_disposition,
-                send_meeting_invitations=send_meeting_invitations,
-            ))
+        return dict(
+            folder=folder,
+            message_disposition=message_disposition,
+            send_meeting_invitations=send_meeting_invitations,
         )
 
+    def _bulk_create_result_from_xml(self, elem):
+        return BulkCreateResult.from_xml(elem=elem, account=self)
+
     def bulk_update(self, items, conflict_resolution=AUTO_RESOLVE, message_disposition=SAVE_ONLY,
                     send_meeting_invitations_or_cancellations=SEND_TO_NONE, suppress_read_receipts=True,
-                    chunk_size=None):
+                    chunk_size=None, ordered=True):
         """
         Bulk updates existing items
 
@@ -411,9 +429,23 @@ class Account(object):
                specified in SEND_MEETING_INVITATIONS_AND_CANCELLATIONS_CHOICES
         :param suppress_read_receipts: nly supported from Exchange 2013. True or False
         :param chunk_size: The number of items to send to the server in a single request
+        :param ordered: If False, return (index, result) tuples in the order the results were received from the
+               server. 'index' is the position of the corresponding item in 'items'.
 
         :return: a list of either (id, changekey) tuples or exception instances, in the same order as the input
         """
+        kwargs = self._get_bulk_update_kwargs(
+            items=items, conflict_resolution=conflict_resolution, message_disposition=message_disposition,
+            send_meeting_invitations_or_cancellations=send_meeting_invitations_or_cancellations,
+            suppress_read_receipts=suppress_read_receipts,
+        )
+        return list(self._consume_item_service(
+            service_cls=UpdateItem, items=items, chunk_size=chunk_size, kwargs=kwargs, ordered=ordered,
+            parse_func=Item.id_from_xml,
+        ))
+
+    def _get_bulk_update_kwargs(self, items, conflict_resolution, message_disposition,
+                                send_meeting_invitations_or_cancellations, suppress_read_receipts):
         if conflict_resolution not in CONFLICT_RESOLUTION_CHOICES:
             raise ValueError("'conflict_resolution' %s must be one of %s" % (
                 conflict_resolution, CONFLICT_RESOLUTION_CHOICES
@@ -442,18 +474,16 @@ class Account(object):
             message_disposition,
             send_meeting_invitations_or_cancellations,
         )
-        return list(
-            i if isinstance(i, Exception) else Item.id_from_xml(i)
-            for i in self._consume_item_service(service_cls=UpdateItem, items=items, chunk_size=chunk_size, kwargs=dict(
-                conflict_resolution=conflict_resolution,
-                message_disposition=message_disposition,
-                send_meeting_invitations_or_cancellations=send_meeting_invitations_or_cancellations,
-                suppress_read_receipts=suppress_read_receipts,
-            ))
+        return dict(
+            conflict_resolution=conflict_resolution,
+            message_disposition=message_disposition,
+            send_meeting_invitations_or_cancellations=send_meeting_invitations_or_cancellations,
+            suppress_read_receipts=suppress_read_receipts,
         )
 
     def bulk_delete(self, ids, delete_type=HARD_DELETE, send_meeting_cancellations=SEND_TO_NONE,
-                    affected_task_occurrences=ALL_OCCURRENCIES, suppress_read_receipts=True, chunk_size=None):
+                    affected_task_occurrences=ALL_OCCURRENCIES, suppress_read_receipts=True, chunk_size=None,
+                    ordered=True):
         """
         Bulk deletes items.
 
@@ -465,9 +495,21 @@ class Account(object):
                AFFECTED_TASK_OCCURRENCES_CHOICES.
         :param suppress_read_receipts: only supported from Exchange 2013. True or False.
         :param chunk_size: The number of items to send to the server in a single request
+        :param ordered: If False, return (index, result) tuples in the order the results were received from the
+               server. 'index' is the position of the corresponding item in 'ids'.
 
         :return: a list of either True or exception instances, in the same order as the input
         """
+        kwargs = self._get_bulk_delete_kwargs(
+            delete_type=delete_type, send_meeting_cancellations=send_meeting_cancellations,
+            affected_task_occurrences=affected_task_occurrences, suppress_read_receipts=suppress_read_receipts,
+        )
+        return list(self._consume_item_service(
+            service_cls=DeleteItem, items=ids, chunk_size=chunk_size, kwargs=kwargs, ordered=ordered
+        ))
+
+    def _get_bulk_delete_kwargs(self, delete_type, send_meeting_cancellations, affected_task_occurrences,
+                                suppress_read_receipts):
         if delete_type not in DELETE_TYPE_CHOICES:
             raise ValueError("'delete_type' %s must be one of %s" % (
                 delete_type, DELETE_TYPE_CHOICES
@@ -489,13 +531,11 @@ class Account(object):
             send_meeting_cancellations,
             affected_task_occurrences,
         )
-        return list(
-            self._consume_item_service(service_cls=DeleteItem, items=ids, chunk_size=chunk_size, kwargs=dict(
-                delete_type=delete_type,
-                send_meeting_cancellations=send_meeting_cancellations,
-                affected_task_occurrences=affected_task_occurrences,
-                suppress_read_receipts=suppress_read_receipts,
-            ))
+        return dict(
+            delete_type=delete_type,
+            send_meeting_cancellations=send_meeting_cancellations,
+            affected_task_occurrences=affected_task_occurrences,
+            suppress_read_receipts=suppress_read_receipts,
         )
 
     def bulk_send(self, ids, save_copy=True, copy_to_folder=None, chunk_size=None):
@@ -507,64 +547,88 @@ class Account(object):
         :param chunk_size: The number of items to send to the server in a single request
         :return: Status for each send operation, in the same order as the input
         """
+        kwargs = self._get_bulk_send_kwargs(save_copy=save_copy, copy_to_folder=copy_to_folder)
+        return list(
+            self._consume_item_service(service_cls=SendItem, items=ids, chunk_size=chunk_size, kwargs=kwargs)
+        )
+
+    def _get_bulk_send_kwargs(self, save_copy, copy_to_folder):
         if copy_to_folder and not save_copy:
             raise AttributeError("'save_copy' must be True when 'copy_to_folder' is set")
         if save_copy and not copy_to_folder:
             copy_to_folder = self.sent  # 'Sent' is default EWS behaviour
-        return list(
-            self._consume_item_service(service_cls=SendItem, items=ids, chunk_size=chunk_size, kwargs=dict(
-                saved_item_folder=copy_to_folder,
-            ))
-        )
+        return dict(saved_item_folder=copy_to_folder)
 
-    def bulk_copy(self, ids, to_folder, chunk_size=None):
+    def bulk_copy(self, ids, to_folder, chunk_size=None, ordered=True):
         """ Copy items to another folder
 
         :param ids: an iterable of either (id, changekey) tuples or Item objects.
         :param to_folder: The destination folder of the copy operation
         :param chunk_size: The number of items to send to the server in a single request
+        :param ordered: If False, return (index, result) tuples in the order the results were received from the
+               server. 'index' is the position of the corresponding item in 'ids'.
         :return: Status for each send operation, in the same order as the input
         """
-        if not isinstance(to_folder, Folder):
-            raise ValueError("'to_folder' %r must be a Folder instance" % to_folder)
-        return list(
-            i if isinstance(i, Exception) else Item.id_from_xml(i)
-            for i in self._consume_item_service(service_cls=CopyItem, items=ids, chunk_size=chunk_size, kwargs=dict(
-                to_folder=to_folder,
-            ))
-        )
+        return list(self._consume_item_service(
+            service_cls=CopyItem, items=ids, chunk_size=chunk_size, kwargs=self._get_bulk_move_kwargs(to_folder),
+            ordered=ordered, parse_func=Item.id_from_xml,
+        ))
 
-    def bulk_move(self, ids, to_folder, chunk_size=None):
+    def bulk_move(self, ids, to_folder, chunk_size=None, ordered=True):
         """Move items to another folder
 
         :param ids: an iterable of either (id, changekey) tuples or Item objects.
         :param to_folder: The destination folder of the copy operation
         :param chunk_size: The number of items to send to the server in a single request
+        :param ordered: If False, return (index, result) tuples in the order the results were received from the
+               server. 'index' is the position of the corresponding item in 'ids'.
         :return: The new IDs of the moved items, in the same order as the input. If 'to_folder' is a public folder or a
         folder in a different mailbox, an empty list is returned.
         """
+        return list(self._consume_item_service(
+            service_cls=MoveItem, items=ids, chunk_size=chunk_size, kwargs=self._get_bulk_move_kwargs(to_folder),
+            ordered=ordered, parse_func=Item.id_from_xml,
+        ))
+
+    @staticmethod
+    def _get_bulk_move_kwargs(to_folder):
+        # Used by both bulk_move() and bulk_copy()
         if not isinstance(to_folder, Folder):
             raise ValueError("'to_folder' %r must be a Folder instance" % to_folder)
-        return list(
-            i if isinstance(i, Exception) else Item.id_from_xml(i)
-            for i in self._consume_item_service(service_cls=MoveItem, items=ids, chunk_size=chunk_size, kwargs=dict(
-                to_folder=to_folder,
-            ))
-        )
+        return dict(to_folder=to_folder)
 
-    def fetch(self, ids, folder=None, only_fields=None, chunk_size=None):
+    def fetch(self, ids, folder=None, only_fields=None, chunk_size=None, ordered=True):
         """ Fetch items by ID
 
         :param ids: an iterable of either (id, changekey) tuples or Item objects.
         :param folder: used for validating 'only_fields'
         :param only_fields: A list of string or FieldPath items specifying the fields to fetch. Default to all fields
         :param chunk_size: The number of items to send to the server in a single request
+        :param ordered: If False, return (index, item) tuples in the order the items were received from the server.
+               'index' is the position of the corresponding item in 'ids'.
         :return: A generator of Item objects, in the same order as the input
         """
+        for i in self._fetch(ids=ids, folder=folder, only_fields=only_fields, chunk_size=chunk_size, ordered=ordered):
+            yield i
+
+    def _fetch(self, ids, folder, only_fields, chunk_size, ordered, parse_func=None):
+        # Like fetch(), but converts the elements returned by the GetItem service with 'parse_func', if set
+        validation_folder, additional_fields = self._get_fetch_fields(folder=folder, only_fields=only_fields)
+
+        if parse_func is None:
+            def parse_func(elem):
+                return validation_folder.item_model_from_tag(elem.tag).from_xml(elem=elem, account=self)
+
+        # Always use IdOnly here, because AllProperties doesn't actually get *all* properties
+        for i in self._consume_item_service(service_cls=GetItem, items=ids, chunk_size=chunk_size, kwargs=dict(
+                additional_fields=additional_fields,
+                shape=ID_ONLY,
+        ), ordered=ordered, parse_func=parse_func):
+            yield i
+
+    def _get_fetch_fields(self, folder, only_fields):
+        # Returns the folder used for validating fields, and the fields to fetch
         validation_folder = folder or Folder(root=self.root)  # Default to a folder type that supports all item types
-        # 'ids' could be an unevaluated QuerySet, e.g. if we ended up here via `fetch(ids=some_folder.filter(...))`. In
-        # that case, we want to use its iterator. Otherwise, peek() will start a count() which is wasteful because we
-        # need the item IDs immediately afterwards. iterator() will only do the bare minimum.
         if only_fields is None:
             # We didn't restrict list of field paths. Get all fields from the server, including extended properties.
             additional_fields = {
@@ -574,16 +638,73 @@ class Account(object):
             for field in only_fields:
                 validation_folder.validate_item_field(field=field)
             additional_fields = validation_folder.normalize_fields(fields=only_fields)
-        # Always use IdOnly here, because AllProperties doesn't actually get *all* properties
-        for i in self._consume_item_service(service_cls=GetItem, items=ids, chunk_size=chunk_size, kwargs=dict(
-                additional_fields=additional_fields,
-                shape=ID_ONLY,
-        )):
-            if isinstance(i, Exception):
-                yield i
-            else:
-                item = validation_folder.item_model_from_tag(i.tag).from_xml(elem=i, account=self)
-                yield item
+        return validation_folder, additional_fields
+
+    # The following are asynchronous versions of the above methods, for use with 'await' and 'async for'. They require
+    # Python 3.6+. See the 'aio' module for details.
+
+    def afetch(self, ids, folder=None, only_fields=None, chunk_size=None, ordered=True):
+        """Like fetch(), but returns an asynchronous generator of Item objects, for use with 'async for'"""
+        from .aio import fetch
+        return fetch(account=self, ids=ids, folder=folder, only_fields=only_fields, chunk_size=chunk_size,
+                     ordered=ordered)
+
+    def abulk_create(self, folder, items, message_disposition=SAVE_ONLY, send_meeting_invitations=SEND_TO_NONE,
+                     chunk_size=None):
+        """Like bulk_create(), but returns an awaitable"""
+        from .aio import consume_item_service
+        kwargs = self._get_bulk_create_kwargs(
+            folder=folder, items=items, message_disposition=message_disposition,
+            send_meeting_invitations=send_meeting_invitations,
+        )
+        return consume_item_service(account=self, service_cls=CreateItem, items=items, chunk_size=chunk_size,
+                                    kwargs=kwargs, parse_func=self._bulk_create_result_from_xml)
+
+    def abulk_update(self, items, conflict_resolution=AUTO_RESOLVE, message_disposition=SAVE_ONLY,
+                     send_meeting_invitations_or_cancellations=SEND_TO_NONE, suppress_read_receipts=True,
+                     chunk_size=None, ordered=True):
+        """Like bulk_update(), but returns an awaitable"""
+        from .aio import consume_item_service
+        kwargs = self._get_bulk_update_kwargs(
+            items=items, conflict_resolution=conflict_resolution, message_disposition=message_disposition,
+            send_meeting_invitations_or_cancellations=send_meeting_invitations_or_cancellations,
+            suppress_read_receipts=suppress_read_receipts,
+        )
+        return consume_item_service(account=self, service_cls=UpdateItem, items=items, chunk_size=chunk_size,
+                                    kwargs=kwargs, ordered=ordered, parse_func=Item.id_from_xml)
+
+    def abulk_delete(self, ids, delete_type=HARD_DELETE, send_meeting_cancellations=SEND_TO_NONE,
+                     affected_task_occurrences=ALL_OCCURRENCIES, suppress_read_receipts=True, chunk_size=None,
+                     ordered=True):
+        """Like bulk_delete(), but returns an awaitable"""
+        from .aio import consume_item_service
+        kwargs = self._get_bulk_delete_kwargs(
+            delete_type=delete_type, send_meeting_cancellations=send_meeting_cancellations,
+            affected_task_occurrences=affected_task_occurrences, suppress_read_receipts=suppress_read_receipts,
+        )
+        return consume_item_service(account=self, service_cls=DeleteItem, items=ids, chunk_size=chunk_size,
+                                    kwargs=kwargs, ordered=ordered)
+
+    def abulk_send(self, ids, save_copy=True, copy_to_folder=None, chunk_size=None):
+        """Like bulk_send(), but returns an awaitable"""
+        from .aio import consume_item_service
+        kwargs = self._get_bulk_send_kwargs(save_copy=save_copy, copy_to_folder=copy_to_folder)
+        return consume_item_service(account=self, service_cls=SendItem, items=ids, chunk_size=chunk_size,
+                                    kwargs=kwargs)
+
+    def abulk_copy(self, ids, to_folder, chunk_size=None, ordered=True):
+        """Like bulk_copy(), but returns an awaitable"""
+        from .aio import consume_item_service
+        return consume_item_service(account=self, service_cls=CopyItem, items=ids, chunk_size=chunk_size,
+                                    kwargs=self._get_bulk_move_kwargs(to_folder=to_folder), ordered=ordered,
+                                    parse_func=Item.id_from_xml)
+
+    def abulk_move(self, ids, to_folder, chunk_size=None, ordered=True):
+        """Like bulk_move(), but returns an awaitable"""
+        from .aio import consume_item_service
+        return consume_item_service(account=self, service_cls=MoveItem, items=ids, chunk_size=chunk_size,
+                                    kwargs=self._get_bulk_move_kwargs(to_folder=to_folder), ordered=ordered,
+                                    parse_func=Item.id_from_xml)
 
     @property
     def mail_tips(self):
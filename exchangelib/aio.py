@@ -0,0 +1,730 @@
+# coding=utf-8
+"""
+Asynchronous versions of the service layer, for use with asyncio. Requires Python 3.6+.
+
+This module is imported lazily from the asynchronous entry points, e.g. 'async for item in qs', 'Account.afetch()' and
+'Account.abulk_create()', so the rest of the package can still be imported on Python versions without 'async' syntax.
+
+HTTP requests are sent with aiohttp if it is installed (pip install exchangelib[async]) and the protocol uses no
+authentication or basic authentication with the default HTTP adapter. In all other cases, e.g. NTLM or Kerberos auth,
+requests are sent with the normal 'requests' sessions of the protocol, from the default executor of the event loop.
+Either way, the number of concurrent requests to a server is limited by the session pool size of the protocol.
+"""
+import asyncio
+import datetime
+import functools
+import inspect
+import logging
+import os
+import traceback
+import weakref
+
+import requests.adapters
+
+from .errors import ErrorServerBusy, RateLimitError, RedirectError
+from .folders import SHALLOW
+from .items import ID_ONLY
+from .queryset import QuerySet
+from .services import FindItem, FindPeople, GetItem
+from .services.common import KNOWN_EXCEPTIONS, EWSAccountService, EWSPooledMixIn
+from .transport import wrap, extra_headers, BASIC, NOAUTH, DEFAULT_HEADERS
+from .util import peek, is_xml, time_func, DummyResponse, CONNECTION_ERRORS, POST_LOG_MSG, \
+    _may_retry_on_error, _redirect_or_fail, _raise_response_errors
+
+try:
+    import aiohttp
+except ImportError:
+    # aiohttp is optional. Without it, requests are sent from a thread pool executor
+    aiohttp = None
+
+log = logging.getLogger(__name__)
+
+
+class AsyncResponse(DummyResponse):
+    # A fully read aiohttp response, with the attributes of a requests.Response that we need
+    def __init__(self, url, status_code, headers, request_headers, content):
+        super().__init__(url=url, headers=headers, request_headers=request_headers, content=content)
+        self.status_code = status_code
+        self.history = ()
+
+
+class AiohttpSession:
+    # Wraps an aiohttp.ClientSession with the parts of a requests.Session that post_ratelimited() needs
+    adapter = 'aiohttp'
+
+    def __init__(self, protocol):
+        self.session_id = sum(map(ord, str(os.urandom(100))))  # Used for debugging messages in services
+        self.protocol = protocol
+        if protocol.auth_type == BASIC:
+            self.auth = aiohttp.BasicAuth(login=protocol.credentials.username, password=protocol.credentials.password)
+        else:
+            self.auth = None
+        self._session = aiohttp.ClientSession(
+            auth=self.auth,
+            # Create a copy of the headers because headers are mutable and session users may modify headers
+            headers=DEFAULT_HEADERS.copy(),
+            connector=aiohttp.TCPConnector(limit=protocol.CONNECTIONS_PER_SESSION),
+        )
+
+    async def post(self, url, headers, data, timeout):
+        async with self._session.post(url, headers=headers, data=data, allow_redirects=False,
+                                      timeout=aiohttp.ClientTimeout(total=timeout)) as r:
+            content = await r.read()
+            return AsyncResponse(url=str(r.url), status_code=r.status, headers=r.headers,
+                                 request_headers=r.request_info.headers, content=content)
+
+    async def close(self):
+        await self._session.close()
+
+
+class ExecutorSession:
+    # Wraps a requests.Session created by the protocol. Requests are sent from the default executor of the event loop
+    def __init__(self, protocol):
+        self.protocol = protocol
+        self._session = protocol.create_session()
+        self.session_id = self._session.session_id
+        self.auth = self._session.auth
+        self.adapter = self._session.get_adapter(protocol.service_endpoint)
+
+    async def post(self, url, headers, data, timeout):
+        return await asyncio.get_event_loop().run_in_executor(None, functools.partial(
+            self._session.post, url=url, headers=headers, data=data, allow_redirects=False, timeout=timeout
+        ))
+
+    async def close(self):
+        self._session.close()
+
+
+class AsyncSessionPool:
+    """An asyncio counterpart to the session pool of a protocol. Sessions are created on demand, up to the current
+    session pool size of the protocol. Sessions can only be used from the event loop that created the pool.
+    """
+    def __init__(self, protocol):
+        self.protocol = protocol
+        self.loop = asyncio.get_event_loop()
+        self._sessions = []
+        self._session_count = 0
+        # Notified when a session is released, so waiting coroutines can pick it up or create a new session if the
+        # session pool size of the protocol was increased in the meantime.
+        self._condition = asyncio.Condition()
+
+    @property
+    def uses_aiohttp(self):
+        return aiohttp is not None \
+            and self.protocol.auth_type in (NOAUTH, BASIC) \
+            and self.protocol.HTTP_ADAPTER_CLS is requests.adapters.HTTPAdapter
+
+    def create_session(self):
+        session = AiohttpSession(self.protocol) if self.uses_aiohttp else ExecutorSession(self.protocol)
+        log.debug('Server %s: Created async session %s', self.protocol.server, session.session_id)
+        return session
+
+    async def get_session(self):
+        async with self._condition:
+            while True:
+                if self._sessions:
+                    return self._sessions.pop()
+                if self._session_count < self.protocol.session_pool_size:
+                    self._session_count += 1
+                    return self.create_session()
+                log.debug('Server %s: Waiting for async session', self.protocol.server)
+                await self._condition.wait()
+
+    async def release_session(self, session):
+        async with self._condition:
+            if self._session_count > self.protocol.session_pool_size:
+                # The session pool size of the protocol was decreased. Close the session instead of releasing it
+                log.debug('Server %s: Closing surplus async session %s', self.protocol.server, session.session_id)
+                self._session_count -= 1
+            else:
+                log.debug('Server %s: Releasing async session %s', self.protocol.server, session.session_id)
+                self._sessions.append(session)
+                session = None
+            # Wake all waiters. Besides the released session, the session pool size may have been increased.
+            self._condition.notify_all()
+        if session is not None:
+            await session.close()
+
+    async def retire_session(self, session):
+        # The session is useless. Close it completely and place a fresh session in the pool
+        log.debug('Server %s: Retiring async session %s', self.protocol.server, session.session_id)
+        await session.close()
+        await self.release_session(self.create_session())
+
+    async def renew_session(self, session):
+        log.debug('Server %s: Renewing async session %s', self.protocol.server, session.session_id)
+        await session.close()
+        return self.create_session()
+
+    async def close(self):
+        while self._sessions:
+            await self._sessions.pop().close()
+            self._session_count -= 1
+
+
+_session_pools = weakref.WeakKeyDictionary()
+
+
+def get_session_pool(protocol):
+    # Returns the async session pool of the protocol for the running event loop
+    pool = _session_pools.get(protocol)
+    if pool is None or pool.loop is not asyncio.get_event_loop():
+        pool = _session_pools[protocol] = AsyncSessionPool(protocol)
+    return pool
+
+
+async def close_connections():
+    """Closes the async sessions of all protocols that were created from the running event loop"""
+    for pool in list(_session_pools.values()):
+        if pool.loop is asyncio.get_event_loop():
+            await pool.close()
+
+
+async def _back_off_if_needed(back_off_until):
+    if back_off_until:
+        sleep_secs = (back_off_until - datetime.datetime.now()).total_seconds()
+        # The back off value may have expired within the last few milliseconds
+        if sleep_secs > 0:
+            log.warning('Server requested back off until %s. Sleeping %s seconds', back_off_until, sleep_secs)
+            await asyncio.sleep(sleep_secs)
+
+
+if aiohttp is not None:
+    _CONNECTION_ERRORS = CONNECTION_ERRORS + (aiohttp.ClientError, asyncio.TimeoutError)
+else:
+    _CONNECTION_ERRORS = CONNECTION_ERRORS + (asyncio.TimeoutError,)
+
+
+async def post_ratelimited(protocol, session, url, headers, data, allow_redirects=False):
+    """The asynchronous counterpart to util.post_ratelimited(), with the same error handling policies. We sleep without
+    blocking the event loop, and 'session' is a session from the async session pool of the protocol.
+    """
+    pool = get_session_pool(protocol)
+    wait = 10  # seconds
+    retry = 0
+    redirects = 0
+    log_vals = dict(
+        retry=retry,
+        wait=wait,
+        timeout=protocol.TIMEOUT,
+        session_id=session.session_id,
+        thread_id=None,
+        auth=session.auth,
+        url=url,
+        adapter=session.adapter,
+        allow_redirects=allow_redirects,
+        stream=False,
+        response_time=None,
+        status_code=None,
+        request_headers=headers,
+        response_headers=None,
+        xml_request=data,
+        xml_response=None,
+    )
+    try:
+        while True:
+            await _back_off_if_needed(protocol.credentials.back_off_until)
+            log.debug('Session %s: retry %s timeout %s POST\'ing to %s after %ss wait', session.session_id, retry,
+                      protocol.TIMEOUT, url, wait)
+            d_start = time_func()
+            # Always create a dummy response for logging purposes, in case we fail in the following
+            r = DummyResponse(url=url, headers={}, request_headers=headers)
+            try:
+                r = await session.post(url=url, headers=headers, data=data, timeout=protocol.TIMEOUT)
+            except _CONNECTION_ERRORS as e:
+                log.debug('Session %s: connection error POST\'ing to %s', session.session_id, url)
+                r = DummyResponse(url=url, headers={'TimeoutException': e}, request_headers=headers)
+            finally:
+                log_vals.update(
+                    retry=retry,
+                    wait=wait,
+                    session_id=session.session_id,
+                    url=str(r.url),
+                    response_time=time_func() - d_start,
+                    status_code=r.status_code,
+                    request_headers=r.request.headers,
+                    response_headers=r.headers,
+                    xml_response=r.content,
+                )
+                r.response_time = log_vals['response_time']
+            log.debug(POST_LOG_MSG, log_vals)
+            if r.status_code == 401:
+                # Our credentials or auth type were rejected. Don't trust any cached auth type for this endpoint
+                protocol.invalidate_persistent_cache()
+            if _may_retry_on_error(r, protocol, wait):
+                log.info("Session %s: Connection error on URL %s (code %s). Cool down %s secs",
+                         session.session_id, r.url, r.status_code, wait)
+                await asyncio.sleep(wait)  # Increase delay for every retry
+                retry += 1
+                wait *= 2
+                session = await pool.renew_session(session)
+                continue
+            if r.status_code in (301, 302):
+                url, redirects = _redirect_or_fail(r, redirects, allow_redirects)
+                continue
+            break
+    except (RateLimitError, RedirectError) as e:
+        log.warning(e.value)
+        await pool.retire_session(session)
+        raise
+    except Exception as e:
+        # Let higher layers handle this. Add full context for better debugging.
+        log.error(str('%s: %s\n%s'), e.__class__.__name__, str(e), POST_LOG_MSG % log_vals)
+        await pool.retire_session(session)
+        raise
+    if r.status_code == 500 and r.content and is_xml(r.content):
+        # Some genius at Microsoft thinks it's OK to send a valid SOAP response as an HTTP 500
+        log.debug('Got status code %s but trying to parse content anyway', r.status_code)
+    elif r.status_code != 200:
+        await pool.retire_session(session)
+        _raise_response_errors(r, protocol, POST_LOG_MSG, log_vals)  # Always raises an exception
+    log.debug('Session %s: Useful response from %s', session.session_id, url)
+    return r, session
+
+
+class AsyncServiceMixIn:
+    # Overrides the methods of EWSService that do I/O with coroutines. Services that return the result of
+    # _get_elements(), _paged_call() or _pool_requests() directly from call() will then return an awaitable or an
+    # asynchronous generator instead.
+
+    async def _get_elements(self, payload, response_times=None):
+        while True:
+            try:
+                # Send the request, get the response and do basic sanity checking on the SOAP XML
+                response = await self._get_response_xml(payload=payload, response_times=response_times)
+                # Read the XML and throw any general EWS error messages. Return a generator over the result elements
+                return self._get_elements_in_response(response=response)
+            except ErrorServerBusy as e:
+                await self._ahandle_backoff(e)
+                continue
+            except KNOWN_EXCEPTIONS:
+                # These are known and understood, and don't require a backtrace.
+                raise
+            except Exception:
+                account = self.account if isinstance(self, EWSAccountService) else None
+                log.warning('EWS %s, account %s: Exception in _get_elements: %s', self.protocol.service_endpoint,
+                            account, traceback.format_exc(20))
+                raise
+
+    async def _ahandle_backoff(self, e):
+        # Decreasing the session pool size takes a thread lock and closes sessions. Keep it off the event loop
+        await asyncio.get_event_loop().run_in_executor(None, self._handle_backoff, e)
+
+    async def _get_response_xml(self, payload, response_times=None, **parse_opts):
+        account, hint, api_versions = self._get_api_versions()
+        pool = get_session_pool(self.protocol)
+        for api_version in api_versions:
+            log.debug('Trying API version %s for account %s', api_version, account)
+            r, session = await post_ratelimited(
+                protocol=self.protocol,
+                session=await pool.get_session(),
+                url=self.protocol.service_endpoint,
+                headers=extra_headers(account=account),
+                data=wrap(content=payload, version=api_version, account=account),
+                allow_redirects=False,
+            )
+            try:
+                # Release the session after handling the response, so coroutines waiting for a session will see a
+                # session pool size that was increased by a successful response.
+                res = self._handle_response(
+                    response=r, account=account, hint=hint, api_version=api_version, **parse_opts
+                )
+            finally:
+                await pool.release_session(session)
+            if res is None:
+                # The guessed server version is wrong. Try the next version
+                continue
+            if response_times is not None:
+                response_times.append(r.response_time)
+            return res
+        self._raise_invalid_version(account=account, api_versions=api_versions)
+
+    async def _paged_call(self, payload_func, max_items, prefetch_pages=0, parallel=False, **kwargs):
+        log_prefix = self._get_paging_log_prefix()
+        paging_infos = self._get_paging_infos()
+        start_offset = common_next_offset = kwargs['offset']
+        get_payload = self._paged_payload_func(payload_func, **kwargs)
+        total_item_count = 0
+        # Pages requested ahead of time, as an offset -> Task mapping
+        prefetched = {}
+        try:
+            while True:
+                log.debug('%s: Getting items at offset %s (max_items %s)', log_prefix, common_next_offset, max_items)
+                task = prefetched.pop(common_next_offset, None)
+                try:
+                    if task is None:
+                        response = await self._get_response_xml(payload=get_payload(common_next_offset))
+                    else:
+                        response = await task
+                except ErrorServerBusy as e:
+                    await self._ahandle_backoff(e)
+                    continue
+                items_in_view = [p['items_in_view'] for p in paging_infos]
+                elems, page_info = self._get_elems_in_pages(
+                    response=response, paging_infos=paging_infos, total_item_count=total_item_count,
+                    max_items=max_items
+                )
+                if (prefetch_pages or parallel) and self._view_has_changed(paging_infos, items_in_view):
+                    log.warning('%s: Item count changed while paging. Continuing without read-ahead', log_prefix)
+                    prefetch_pages, parallel = 0, False
+                next_offset = self._get_common_next_offset(
+                    paging_infos=paging_infos, total_item_count=total_item_count, max_items=max_items
+                )
+                prefetch_offsets = self._get_prefetch_offsets(
+                    next_offset=next_offset, prefetch_pages=prefetch_pages, parallel=parallel,
+                    paging_infos=paging_infos, start_offset=start_offset, max_items=max_items
+                )
+                for offset in [o for o in prefetched if o not in prefetch_offsets]:
+                    prefetched.pop(offset).cancel()
+                for offset in prefetch_offsets:
+                    if offset in prefetched:
+                        continue
+                    log.debug('%s: Prefetching items at offset %s', log_prefix, offset)
+                    prefetched[offset] = asyncio.ensure_future(self._get_response_xml(payload=get_payload(offset)))
+                for elem in elems:
+                    yield elem
+                total_item_count = page_info['total_item_count']
+                common_next_offset = self._get_common_next_offset(
+                    paging_infos=paging_infos, total_item_count=total_item_count, max_items=max_items
+                )
+                if common_next_offset is None:
+                    break
+        finally:
+            # Don't leave requests running if the caller stopped iterating early
+            for task in prefetched.values():
+                task.cancel()
+
+    async def _pool_requests(self, payload_func, items, **kwargs):
+        log.debug('Processing items in chunks of %s', self.get_chunk_size())
+        # Chop items list into suitable pieces and send them concurrently. The number of requests in flight is limited
+        # by the async session pool. The order of the output result list must be the same as the input id list, so the
+        # caller knows which status message belongs to which ID. Yield results as they become available.
+        if not self.ordered:
+            async for elem in self._pool_requests_unordered(payload_func=payload_func, items=items, **kwargs):
+                yield elem
+            return
+        tasks = []
+        try:
+            async for chunk in self._achunkify(items):
+                log.debug('Starting %s._get_elements task %s for %s items', self.__class__.__name__, len(tasks) + 1,
+                          len(chunk))
+                tasks.append(asyncio.ensure_future(self._get_chunk_elements(payload_func, chunk, **kwargs)))
+                # Results will be available before iteration has finished if 'items' is a slow generator. Return early.
+                # Don't consume more of 'items' while the window of outstanding chunks is full.
+                while tasks and (tasks[0].done() or len(tasks) >= self.get_max_in_flight()):
+                    elems = await tasks[0]
+                    tasks.pop(0)
+                    for elem in elems:
+                        yield elem
+            # Yield remaining results in order, as they become available
+            while tasks:
+                elems = await tasks[0]
+                tasks.pop(0)
+                for elem in elems:
+                    yield elem
+        finally:
+            # Don't leave requests running if the consumer stopped early, or if one of the requests failed
+            for task in tasks:
+                task.cancel()
+
+    async def _pool_requests_unordered(self, payload_func, items, **kwargs):
+        # Like _pool_requests(), but yields (index, elem) tuples as soon as the chunk containing the element has
+        # completed. 'index' is the position of the corresponding item in 'items'.
+        tasks = {}  # Maps each task to the index of the first item in its chunk
+        try:
+            start = 0
+            async for chunk in self._achunkify(items):
+                log.debug('Starting %s._get_elements task for %s items', self.__class__.__name__, len(chunk))
+                tasks[asyncio.ensure_future(self._get_chunk_elements(payload_func, chunk, **kwargs))] = start
+                start += len(chunk)
+                while tasks and (any(t.done() for t in tasks) or len(tasks) >= self.get_max_in_flight()):
+                    async for elem in self._get_unordered_results(tasks=tasks):
+                        yield elem
+            while tasks:
+                async for elem in self._get_unordered_results(tasks=tasks):
+                    yield elem
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    @staticmethod
+    async def _get_unordered_results(tasks):
+        # Waits for at least one task to complete, and yields the tagged results of all completed tasks
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            for i, elem in enumerate(task.result(), tasks.pop(task)):
+                yield i, elem
+
+    async def _get_chunk_elements(self, payload_func, chunk, **kwargs):
+        # The asynchronous counterpart to EWSPooledMixIn._get_chunk_elements()
+        while True:
+            response_times = []
+            try:
+                elems = list(await self._get_elements(payload=payload_func(chunk, **kwargs),
+                                                      response_times=response_times))
+            except self.CHUNK_TOO_LARGE_ERRORS as e:
+                self.chunk_sizer.chunk_failed(size=len(chunk))
+                if len(chunk) > 1:
+                    log.debug('%s: Splitting chunk of %s items (%s)', self.SERVICE_NAME, len(chunk), e)
+                    half = len(chunk) // 2
+                    return await self._get_chunk_elements(payload_func, chunk[:half], **kwargs) \
+                        + await self._get_chunk_elements(payload_func, chunk[half:], **kwargs)
+                await self._ahandle_chunk_error(e)
+                continue
+            self.chunk_sizer.chunk_succeeded(size=len(chunk), seconds=sum(response_times))
+            return elems
+
+    async def _ahandle_chunk_error(self, e):
+        # Like EWSPooledMixIn._handle_chunk_error(), but handles the back off in the default executor
+        await asyncio.get_event_loop().run_in_executor(None, self._handle_chunk_error, e)
+
+    async def _achunkify(self, items):
+        # Like EWSPooledMixIn._chunkify(), but also accepts asynchronous iterables
+        if not hasattr(items, '__aiter__'):
+            for chunk in self._chunkify(items):
+                yield chunk
+            return
+        chunk = []
+        async for i in items:
+            chunk.append(i)
+            if len(chunk) >= self.get_chunk_size():
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+class AsyncFindPeople(AsyncServiceMixIn, FindPeople):
+    # FindPeople has its own paging, and parses the elements in call()
+
+    async def call(self, folder, additional_fields, restriction, order_fields, shape, query_string, depth, max_items,
+                   offset):
+        personas = self._paged_call(payload_func=self.get_payload, max_items=max_items, **dict(
+            folder=folder,
+            additional_fields=additional_fields,
+            restriction=restriction,
+            order_fields=order_fields,
+            query_string=query_string,
+            shape=shape,
+            depth=depth,
+            page_size=self.chunk_size,
+            offset=offset,
+        ))
+        parse_func = self._get_parse_func(shape=shape, additional_fields=additional_fields)
+        async for p in personas:
+            yield p if isinstance(p, Exception) else parse_func(p)
+
+    async def _paged_call(self, payload_func, max_items, **kwargs):
+        item_count = kwargs['offset']
+        get_payload = self._paged_payload_func(payload_func, **kwargs)
+        while True:
+            log.debug('EWS %s, account %s, service %s: Getting items at offset %s',
+                      self.protocol.service_endpoint, self.account, self.SERVICE_NAME, item_count)
+            try:
+                response = await self._get_response_xml(payload=get_payload(item_count))
+            except ErrorServerBusy as e:
+                await self._ahandle_backoff(e)
+                continue
+            elems, total_items = self._get_elems_in_page(response=response)
+            for elem in elems:
+                item_count += 1
+                yield elem
+            if self._is_last_page(item_count=item_count, total_items=total_items, max_items=max_items):
+                break
+
+
+_async_service_classes = {FindPeople: AsyncFindPeople}
+
+
+def get_async_service(service_cls):
+    """Returns a subclass of 'service_cls' that sends requests asynchronously"""
+    try:
+        return _async_service_classes[service_cls]
+    except KeyError:
+        if service_cls.streaming:
+            raise ValueError('%s streams its responses, which is not supported asynchronously' % service_cls.__name__)
+        async_service_cls = type(str('Async%s' % service_cls.__name__), (AsyncServiceMixIn, service_cls), {})
+        _async_service_classes[service_cls] = async_service_cls
+        return async_service_cls
+
+
+async def _collect(awaitable_or_async_iterable):
+    # Returns the elements from the result of a call() on an async service
+    if inspect.isawaitable(awaitable_or_async_iterable):
+        return list(await awaitable_or_async_iterable)
+    return [elem async for elem in awaitable_or_async_iterable]
+
+
+async def consume_item_service(account, service_cls, items, chunk_size, kwargs, ordered=True, parse_func=None):
+    """The asynchronous counterpart to Account._consume_item_service(). Returns a list of results, in the same order
+    as the input, or a list of (index, result) tuples if 'ordered' is False. Elements that are not exceptions are
+    converted with 'parse_func', if given.
+    """
+    if isinstance(items, QuerySet):
+        items = iterate_queryset(items, use_cache=False)
+    if hasattr(items, '__aiter__'):
+        if not issubclass(service_cls, EWSPooledMixIn):
+            # This service needs the complete list of items to build its payload
+            items = [i async for i in items]
+    if not hasattr(items, '__aiter__'):
+        is_empty, items = peek(items)
+        if is_empty:
+            # We accept generators, so it's not always convenient for caller to know up-front if 'ids' is empty. Allow
+            # empty 'ids' and return early.
+            return []
+    kwargs['items'] = items
+    service = get_async_service(service_cls)(account=account, chunk_size=chunk_size, ordered=ordered)
+    elems = await _collect(service.call(**kwargs))
+    if parse_func is None:
+        return elems
+    if not ordered:
+        return [(i, e if isinstance(e, Exception) else parse_func(e)) for i, e in elems]
+    return [e if isinstance(e, Exception) else parse_func(e) for e in elems]
+
+
+async def fetch(account, ids, folder=None, only_fields=None, chunk_size=None, ordered=True):
+    """The asynchronous counterpart to Account.fetch()"""
+    async for i in _fetch(account, ids, folder=folder, only_fields=only_fields, chunk_size=chunk_size, ordered=ordered):
+        yield i
+
+
+async def _fetch(account, ids, folder, only_fields, chunk_size, ordered, parse_func=None):
+    # The asynchronous counterpart to Account._fetch()
+    validation_folder, additional_fields = account._get_fetch_fields(folder=folder, only_fields=only_fields)
+    if parse_func is None:
+        def parse_func(elem):
+            return validation_folder.item_model_from_tag(elem.tag).from_xml(elem=elem, account=account)
+    if isinstance(ids, QuerySet):
+        ids = iterate_queryset(ids, use_cache=False)
+    if not hasattr(ids, '__aiter__'):
+        is_empty, ids = peek(ids)
+        if is_empty:
+            return
+    service = get_async_service(GetItem)(account=account, chunk_size=chunk_size, ordered=ordered)
+    # Always use IdOnly here, because AllProperties doesn't actually get *all* properties
+    async for i in service.call(items=ids, additional_fields=additional_fields, shape=ID_ONLY):
+        index = None
+        if not ordered:
+            index, i = i
+        if not isinstance(i, Exception):
+            i = parse_func(i)
+        yield i if ordered else (index, i)
+
+
+async def find_items(folder_collection, q, shape=ID_ONLY, depth=SHALLOW, additional_fields=None, order_fields=None,
+                     calendar_view=None, page_size=None, max_items=None, offset=0, prefetch_pages=0, parallel=False):
+    """The asynchronous counterpart to FolderCollection.find_items()"""
+    async for i in _find_items(
+            folder_collection, q,
+            parse_func=folder_collection._get_find_items_parser(shape=shape, additional_fields=additional_fields),
+            shape=shape, depth=depth, additional_fields=additional_fields, order_fields=order_fields,
+            calendar_view=calendar_view, page_size=page_size, max_items=max_items, offset=offset,
+            prefetch_pages=prefetch_pages, parallel=parallel,
+    ):
+        yield i
+
+
+async def _find_items(folder_collection, q, parse_func, shape=ID_ONLY, depth=SHALLOW, additional_fields=None,
+                      order_fields=None, calendar_view=None, page_size=None, max_items=None, offset=0, prefetch_pages=0,
+                      parallel=False):
+    # The asynchronous counterpart to FolderCollection._find_items()
+    find_item_kwargs = folder_collection._get_find_item_kwargs(
+        q=q, shape=shape, depth=depth, additional_fields=additional_fields, order_fields=order_fields,
+        calendar_view=calendar_view, max_items=max_items, offset=offset, prefetch_pages=prefetch_pages,
+        parallel=parallel,
+    )
+    if find_item_kwargs is None:
+        return
+    service = get_async_service(FindItem)(
+        account=folder_collection.account, folders=folder_collection.folders, chunk_size=page_size
+    )
+    async for i in service.call(**find_item_kwargs):
+        yield i if isinstance(i, Exception) else parse_func(i)
+
+
+async def find_people(folder, q, shape=ID_ONLY, depth=SHALLOW, additional_fields=None, order_fields=None,
+                      page_size=None, max_items=None, offset=0):
+    """The asynchronous counterpart to Folder.find_people()"""
+    service = get_async_service(FindPeople)(account=folder.root.account, chunk_size=page_size)
+    personas = service.call(**folder._get_find_people_kwargs(
+        q=q, shape=shape, depth=depth, additional_fields=additional_fields, order_fields=order_fields,
+        max_items=max_items, offset=offset,
+    ))
+    async for p in personas:
+        if isinstance(p, Exception):
+            raise p
+        yield p
+
+
+async def _query(qs, parse_func=None):
+    # The asynchronous counterpart to QuerySet._query()
+    additional_fields, complex_fields_requested, order_fields, extra_order_fields = qs._get_query_fields()
+    if qs.request_type == qs.PERSONA:
+        if len(qs.folder_collection) != 1:
+            raise ValueError('Personas can only be queried on a single folder')
+        items = find_people(
+            list(qs.folder_collection)[0],
+            qs.q,
+            shape=ID_ONLY,
+            depth=SHALLOW,
+            additional_fields=additional_fields,
+            order_fields=order_fields,
+            page_size=qs.page_size,
+            max_items=qs.max_items,
+            offset=qs.offset,
+        )
+    else:
+        find_item_kwargs = qs._get_find_item_kwargs(
+            additional_fields=additional_fields,
+            complex_fields_requested=complex_fields_requested,
+            order_fields=order_fields,
+        )
+        if complex_fields_requested or parse_func is None:
+            items = find_items(qs.folder_collection, qs.q, **find_item_kwargs)
+        else:
+            items = _find_items(qs.folder_collection, qs.q, parse_func=parse_func, **find_item_kwargs)
+        if complex_fields_requested:
+            # find_items() returns (id, changekey) tuples. Pass that to fetch() to get the complex fields
+            items = _fetch(
+                account=qs.folder_collection.account,
+                ids=items,
+                folder=None,
+                only_fields=additional_fields,
+                chunk_size=qs.page_size,
+                ordered=True,
+                parse_func=parse_func,
+            )
+    if qs._must_sort_clientside:
+        for i in qs._sort_items(items=[i async for i in items], extra_order_fields=extra_order_fields):
+            yield i
+        return
+    async for i in items:
+        yield i
+
+
+async def iterate_queryset(qs, use_cache=True):
+    """The asynchronous counterpart to QuerySet.__iter__(), or QuerySet.iterator() if 'use_cache' is False"""
+    if qs.is_cached:
+        for val in qs._cache:
+            yield val
+        return
+    if qs.q is None:
+        if use_cache:
+            qs._cache = []
+        return
+    values_parser = qs._get_values_parser()
+    if values_parser is None:
+        format_func = qs._get_format_func(return_format=qs.return_format)
+        items = _query(qs, parse_func=qs._get_lazy_parser())
+    else:
+        format_func = None
+        items = _query(qs, parse_func=values_parser)
+    _cache = []
+    async for val in items:
+        if format_func is not None and not isinstance(val, Exception):
+            val = format_func(val)
+        if use_cache:
+            _cache.append(val)
+        yield val
+    if use_cache:
+        qs._cache = _cache
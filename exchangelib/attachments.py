@@ -173,7 +173,7 @@ class FileAttachment(Attachment):
 
     @classmethod
     def from_xml(cls, elem, account):
-        kwargs = {f.name: f.from_xml(elem=elem, account=account) for f in cls.FIELDS}
+        kwargs = cls._fields_from_xml(elem=elem, account=account, fields=cls.FIELDS)
         kwargs['content'] = kwargs.pop('_content')
         cls._clear(elem)
         return cls(**kwargs)
@@ -244,7 +244,7 @@ class ItemAttachment(Attachment):
 
     @classmethod
     def from_xml(cls, elem, account):
-        kwargs = {f.name: f.from_xml(elem=elem, account=account) for f in cls.FIELDS}
+        kwargs = cls._fields_from_xml(elem=elem, account=account, fields=cls.FIELDS)
         kwargs['item'] = kwargs.pop('_item')
         cls._clear(elem)
         return cls(**kwargs)
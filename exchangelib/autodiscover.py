@@ -11,19 +11,13 @@ If you have problems autodiscovering, start by doing an official test at https:/
 """
 from __future__ import unicode_literals
 
-from contextlib import contextmanager
-import getpass
-import glob
 import logging
 import os
-import shelve
-import sys
 import tempfile
 from threading import Lock
 
 import dns.resolver
-from future.moves.queue import LifoQueue
-from future.utils import raise_from, PY2, python_2_unicode_compatible
+from future.utils import raise_from, python_2_unicode_compatible
 from six import text_type
 
 from . import transport
@@ -33,7 +27,7 @@ from .errors import AutoDiscoverFailed, AutoDiscoverRedirect, AutoDiscoverCircul
 from .protocol import BaseProtocol, Protocol
 from .transport import DEFAULT_ENCODING, DEFAULT_HEADERS
 from .util import create_element, get_xml_attr, add_xml_child, to_xml, is_xml, post_ratelimited, xml_to_str, \
-    get_domain, CONNECTION_ERRORS, TLS_ERRORS
+    get_domain, shelve_filename, shelve_open_with_failover, KeyedLock, CONNECTION_ERRORS, TLS_ERRORS
 
 
 log = logging.getLogger(__name__)
@@ -44,38 +38,9 @@ ERROR_NS = 'http://schemas.microsoft.com/exchange/autodiscover/responseschema/20
 RESPONSE_NS = 'http://schemas.microsoft.com/exchange/autodiscover/outlook/responseschema/2006a'
 
 
-def shelve_filename():
-    # 'shelve' may pickle objects using different pickle protocol versions. Append the python major+minor version
-    # numbers to the filename. Also append the username, to avoid permission errors.
-    major, minor = sys.version_info[:2]
-    try:
-        user = getpass.getuser()
-    except KeyError:
-        # getuser() fails on some systems. Provide a sane default. See issue #448
-        user = 'exchangelib'
-    return 'exchangelib.cache.{user}.py{major}{minor}'.format(user=user, major=major, minor=minor)
-
-
 AUTODISCOVER_PERSISTENT_STORAGE = os.path.join(tempfile.gettempdir(), shelve_filename())
 
 
-@contextmanager
-def shelve_open_with_failover(filename):
-    # We can expect empty or corrupt files. Whatever happens, just delete the cache file and try again.
-    # 'shelve' may add a backend-specific suffix to the file, so also delete all files with a suffix.
-    # We don't know which file caused the error, so just delete them all.
-    try:
-        shelve_handle = shelve.open(filename)
-    except Exception as e:
-        for f in glob.glob(filename + '*'):
-            log.warning('Deleting invalid cache file %s (%r)', f, e)
-            os.unlink(f)
-        shelve_handle = shelve.open(filename)
-    yield shelve_handle
-    if PY2:
-        shelve_handle.close()
-
-
 @python_2_unicode_compatible
 class AutodiscoverCache(object):
     # Stores the translation from (email domain, credentials) -> AutodiscoverProtocol object so we can re-use TCP
@@ -91,9 +56,11 @@ class AutodiscoverCache(object):
 
     # If an autodiscover lookup fails for any reason, the corresponding cache entry must be purged.
 
-    # 'shelve' is supposedly thread-safe and process-safe, which suits our needs.
+    # 'shelve' is supposedly process-safe, but we don't rely on it being thread-safe. Threads autodiscovering different
+    # domains may access the cache concurrently, so we guard access to the persistent storage with a lock.
     def __init__(self):
         self._protocols = {}  # Mapping from (domain, credentials) to AutodiscoverProtocol
+        self._storage_lock = Lock()
 
     @property
     def _storage_file(self):
@@ -101,13 +68,13 @@ class AutodiscoverCache(object):
 
     def clear(self):
         # Wipe the entire cache
-        with shelve_open_with_failover(self._storage_file) as db:
+        with self._storage_lock, shelve_open_with_failover(self._storage_file) as db:
             db.clear()
         self._protocols.clear()
 
     def __contains__(self, key):
         domain = key[0]
-        with shelve_open_with_failover(self._storage_file) as db:
+        with self._storage_lock, shelve_open_with_failover(self._storage_file) as db:
             return str(domain) in db
 
     def __getitem__(self, key):
@@ -115,7 +82,7 @@ class AutodiscoverCache(object):
         if protocol:
             return protocol
         domain, credentials = key
-        with shelve_open_with_failover(self._storage_file) as db:
+        with self._storage_lock, shelve_open_with_failover(self._storage_file) as db:
             endpoint, auth_type = db[str(domain)]  # It's OK to fail with KeyError here
         protocol = AutodiscoverProtocol(service_endpoint=endpoint, credentials=credentials, auth_type=auth_type)
         self._protocols[key] = protocol
@@ -124,7 +91,7 @@ class AutodiscoverCache(object):
     def __setitem__(self, key, protocol):
         # Populate both local and persistent cache
         domain = key[0]
-        with shelve_open_with_failover(self._storage_file) as db:
+        with self._storage_lock, shelve_open_with_failover(self._storage_file) as db:
             db[str(domain)] = (protocol.service_endpoint, protocol.auth_type)
         self._protocols[key] = protocol
 
@@ -132,7 +99,7 @@ class AutodiscoverCache(object):
         # Empty both local and persistent cache. Don't fail on non-existing entries because we could end here
         # multiple times due to race conditions.
         domain = key[0]
-        with shelve_open_with_failover(self._storage_file) as db:
+        with self._storage_lock, shelve_open_with_failover(self._storage_file) as db:
             try:
                 del db[str(domain)]
             except KeyError:
@@ -144,7 +111,7 @@ class AutodiscoverCache(object):
 
     def close(self):
         # Close all open connections
-        for (domain, _), protocol in self._protocols.items():
+        for (domain, _), protocol in list(self._protocols.items()):
             log.debug('Domain %s: Closing sessions', domain)
             protocol.close()
             del protocol
@@ -163,7 +130,9 @@ class AutodiscoverCache(object):
 
 
 _autodiscover_cache = AutodiscoverCache()
-_autodiscover_cache_lock = Lock()
+# Guards against multiple threads autodiscovering the same domain and credentials. Threads autodiscovering other domains
+# are not blocked.
+_autodiscover_cache_lock = KeyedLock()
 
 
 def close_connections():
@@ -183,9 +152,9 @@ def discover(email, credentials):
     # We may be using multiple different credentials and changing our minds on TLS verification. This key combination
     # should be safe.
     autodiscover_key = (domain, credentials)
-    # Use lock to guard against multiple threads competing to cache information
+    # Use lock to guard against multiple threads competing to cache information for this key
     log.debug('Waiting for _autodiscover_cache_lock')
-    with _autodiscover_cache_lock:
+    with _autodiscover_cache_lock(autodiscover_key):
         # Don't recurse while holding the lock!
         log.debug('_autodiscover_cache_lock acquired')
         if autodiscover_key in _autodiscover_cache:
@@ -319,13 +288,13 @@ def _autodiscover_hostname(hostname, credentials, email, has_ssl):
         # These are both valid responses from an autodiscover server, showing that we have found the correct
         # server for the original domain. Fill cache before re-raising
         log.debug('Adding cache entry for %s (hostname %s)', domain, hostname)
-        # We have already acquired the cache lock at this point
+        # We hold the cache lock for this domain and credentials at this point
         _autodiscover_cache[(domain, credentials)] = autodiscover_protocol
         raise
 
     # Cache the final hostname of the autodiscover service so we don't need to autodiscover the same domain again
     log.debug('Adding cache entry for %s (hostname %s, has_ssl %s)', domain, hostname, has_ssl)
-    # We have already acquired the cache lock at this point
+    # We hold the cache lock for this domain and credentials at this point
     _autodiscover_cache[(domain, credentials)] = autodiscover_protocol
     # Autodiscover response contains an auth type, but we don't want to spend time here testing if it actually works.
     # Instead of forcing a possibly-wrong auth type, just let Protocol auto-detect the auth type.
@@ -500,9 +469,7 @@ class AutodiscoverProtocol(BaseProtocol):
 
     def __init__(self, *args, **kwargs):
         super(AutodiscoverProtocol, self).__init__(*args, **kwargs)
-        self._session_pool = LifoQueue(maxsize=self.SESSION_POOLSIZE)
-        for _ in range(self.SESSION_POOLSIZE):
-            self._session_pool.put(self.create_session(), block=False)
+        self._session_pool = self._create_session_pool()
 
     def __str__(self):
         return '''\
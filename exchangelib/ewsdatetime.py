@@ -149,9 +149,15 @@ class EWSDateTime(datetime.datetime):
     def __isub__(self, other):
         return self - other
 
+    # UTC offsets of parsed datetime strings, keyed by their '+HH:MM' or '-HH:MM' suffix
+    _utc_offsets = {}
+
     @classmethod
     def from_string(cls, date_string):
         # Parses several common datetime formats and returns timezone-aware EWSDateTime objects
+        dt = cls._from_fixed_width_string(date_string)
+        if dt is not None:
+            return dt
         if date_string.endswith('Z'):
             # UTC datetime
             naive_dt = super(EWSDateTime, cls).strptime(date_string, '%Y-%m-%dT%H:%M:%SZ')
@@ -166,6 +172,46 @@ class EWSDateTime(datetime.datetime):
         aware_dt = dateutil.parser.parse(date_string)
         return cls.from_datetime(aware_dt.astimezone(UTC))  # We want to return EWSDateTime objects
 
+    @classmethod
+    def _from_fixed_width_string(cls, date_string):
+        # EWS returns datetimes as '2009-01-15T13:45:56Z' or '2009-01-15T13:45:56+01:00'. Parse these by slicing, which
+        # is much faster than strptime() and dateutil. Returns None for other formats.
+        length = len(date_string)
+        if length == 20:
+            if date_string[19] != 'Z':
+                return None
+        elif length == 25:
+            if date_string[19] not in '+-' or date_string[22] != ':':
+                return None
+        else:
+            return None
+        if date_string[4] != '-' or date_string[7] != '-' or date_string[10] != 'T' or date_string[13] != ':' \
+                or date_string[16] != ':':
+            return None
+        try:
+            dt = cls(
+                int(date_string[0:4]), int(date_string[5:7]), int(date_string[8:10]),
+                int(date_string[11:13]), int(date_string[14:16]), int(date_string[17:19]),
+                tzinfo=UTC,
+            )
+            if length == 20:
+                return dt
+            return dt - cls._get_utc_offset(date_string[19:])
+        except ValueError:
+            # Let the slow path decide what to do with this string
+            return None
+
+    @classmethod
+    def _get_utc_offset(cls, offset_string):
+        try:
+            return cls._utc_offsets[offset_string]
+        except KeyError:
+            offset = datetime.timedelta(hours=int(offset_string[1:3]), minutes=int(offset_string[4:6]))
+            if offset_string[0] == '-':
+                offset = -offset
+            cls._utc_offsets[offset_string] = offset
+            return offset
+
     @classmethod
     def fromtimestamp(cls, t, tz=None):
         dt = super(EWSDateTime, cls).fromtimestamp(t, tz=tz)
@@ -208,6 +254,15 @@ class EWSTimeZone(object):
     """
     PYTZ_TO_MS_MAP = PYTZ_TO_MS_TIMEZONE_MAP
     MS_TO_PYTZ_MAP = MS_TIMEZONE_TO_PYTZ_MAP
+    # The max number of hours per timezone to cache the timezone state of. See _get_state_cache()
+    STATE_CACHE_SIZE = 100000
+
+    # Instances created by from_pytz(), keyed by class and id() of the pytz timezone
+    _from_pytz_cache = {}
+    # Instances created by timezone(), keyed by class and location
+    _timezone_cache = {}
+    # Timezone states used by localize() and normalize(), keyed by zone name and method
+    _state_caches = {}
 
     def __eq__(self, other):
         # Microsoft timezones are less granular than pytz, so an EWSTimeZone created from 'Europe/Copenhagen' may return
@@ -237,6 +292,21 @@ class EWSTimeZone(object):
 
     @classmethod
     def from_pytz(cls, tz):
+        # Timezone instances are immutable, so we can return the same instance for each pytz timezone. We keep a
+        # reference to 'tz' in the cache, so its id() is not reused.
+        key = cls, id(tz)
+        try:
+            cached_tz, self = cls._from_pytz_cache[key]
+            if cached_tz is tz:
+                return self
+        except KeyError:
+            pass
+        self = cls._from_pytz(tz)
+        cls._from_pytz_cache[key] = tz, self
+        return self
+
+    @classmethod
+    def _from_pytz(cls, tz):
         # pytz timezones are dynamically generated. Subclass the tz.__class__ and add the extra Microsoft timezone
         # labels we need.
 
@@ -269,11 +339,48 @@ class EWSTimeZone(object):
     @classmethod
     def timezone(cls, location):
         # Like pytz.timezone() but returning EWSTimeZone instances
+        key = cls, location
+        try:
+            return cls._timezone_cache[key]
+        except KeyError:
+            pass
         try:
             tz = pytz.timezone(location)
         except pytz.exceptions.UnknownTimeZoneError:
             raise UnknownTimeZone("Timezone '%s' is unknown by pytz" % location)
-        return cls.from_pytz(tz)
+        self = cls._timezone_cache[key] = cls.from_pytz(tz)
+        return self
+
+    def _get_state_cache(self, method_name):
+        # Returns a dict of timezone states of this zone, keyed by hour. The state of a DST timezone only changes at the
+        # transitions of the zone, so the state found for one datetime is valid for all datetimes in the same hour,
+        # unless there is a transition within the hour. Returns None if the zone has no transitions to look up.
+        if not isinstance(self, pytz.tzinfo.DstTzInfo):
+            return None
+        key = self.zone, method_name
+        try:
+            cache = self._state_caches[key]
+        except KeyError:
+            cache = self._state_caches[key] = {}
+        if len(cache) > self.STATE_CACHE_SIZE:
+            cache.clear()
+        return cache
+
+    @staticmethod
+    def _hour_key(dt):
+        return dt.year, dt.month, dt.day, dt.hour
+
+    @staticmethod
+    def _hour_bounds(dt):
+        return dt.replace(minute=0, second=0, microsecond=0), dt.replace(minute=59, second=59, microsecond=999999)
+
+    def _get_hour_state(self, states):
+        # Returns the timezone state of an hour, given the states at the start and end of the hour. Returns None if
+        # there is a transition within the hour. The states may be pytz or EWSTimeZone instances.
+        start, end = states
+        if (start._utcoffset, start._dst, start._tzname) != (end._utcoffset, end._dst, end._tzname):
+            return None
+        return start if isinstance(start, EWSTimeZone) else self.from_pytz(start)
 
     def normalize(self, dt, is_dst=False):
         # super() returns a dt.tzinfo of class pytz.tzinfo.FooBar. We need to return type EWSTimeZone
@@ -286,11 +393,34 @@ class EWSTimeZone(object):
             except pytz.exceptions.NonExistentTimeError:
                 raise NonExistentTimeError(str(dt))
         else:
+            res = self._cached_normalize(dt)
+            if res is not None:
+                return res
             res = super(EWSTimeZone, self).normalize(dt)
         if not isinstance(res.tzinfo, EWSTimeZone):
             return res.replace(tzinfo=self.from_pytz(res.tzinfo))
         return res
 
+    def _cached_normalize(self, dt):
+        # Like normalize(), but looks up the timezone state in a cache keyed by the UTC hour of 'dt'. Returns None if
+        # the state cannot be cached.
+        cache = None if dt.tzinfo is None else self._get_state_cache('normalize')
+        if cache is None:
+            return None
+        utc_dt = dt.replace(tzinfo=None) - dt.utcoffset()
+        hour = self._hour_key(utc_dt)
+        tz = cache.get(hour)
+        if tz is None:
+            tz = self._get_hour_state(super(EWSTimeZone, self).fromutc(t).tzinfo for t in self._hour_bounds(utc_dt))
+            if tz is None:
+                return None
+            cache[hour] = tz
+        local_dt = utc_dt + tz._utcoffset
+        return EWSDateTime(
+            local_dt.year, local_dt.month, local_dt.day, local_dt.hour, local_dt.minute, local_dt.second,
+            local_dt.microsecond, tzinfo=tz
+        )
+
     def localize(self, dt, is_dst=False):
         # super() returns a dt.tzinfo of class pytz.tzinfo.FooBar. We need to return type EWSTimeZone
         if is_dst is not False:
@@ -302,11 +432,29 @@ class EWSTimeZone(object):
             except pytz.exceptions.NonExistentTimeError:
                 raise NonExistentTimeError(str(dt))
         else:
+            res = self._cached_localize(dt)
+            if res is not None:
+                return res
             res = super(EWSTimeZone, self).localize(dt)
         if not isinstance(res.tzinfo, EWSTimeZone):
             return res.replace(tzinfo=self.from_pytz(res.tzinfo))
         return res
 
+    def _cached_localize(self, dt):
+        # Like localize(), but looks up the timezone state in a cache keyed by the hour of 'dt'. Returns None if the
+        # state cannot be cached.
+        cache = None if dt.tzinfo is not None else self._get_state_cache('localize')
+        if cache is None:
+            return None
+        hour = self._hour_key(dt)
+        tz = cache.get(hour)
+        if tz is None:
+            tz = self._get_hour_state(super(EWSTimeZone, self).localize(t).tzinfo for t in self._hour_bounds(dt))
+            if tz is None:
+                return None
+            cache[hour] = tz
+        return dt.replace(tzinfo=tz)
+
     def fromutc(self, dt):
         t = super(EWSTimeZone, self).fromutc(dt)
         if isinstance(t, EWSDateTime):
@@ -162,16 +162,23 @@ class FieldPath(object):
         return cls(field=field, label=label, subfield=subfield)
 
     def get_value(self, item):
+        return self._get_path_value(getattr(item, self.field.name))
+
+    def get_value_from_xml(self, elem, account):
+        # Like get_value(), but parses the value from the XML element of an item instead of reading it from an item
+        return self._get_path_value(self.field.from_xml(elem=elem, account=account))
+
+    def _get_path_value(self, value):
         # For indexed properties, get either the full property set, the property with matching label, or a particular
         # subfield.
         if self.label:
-            for subitem in getattr(item, self.field.name):
+            for subitem in value:
                 if subitem.label == self.label:
                     if self.subfield:
                         return getattr(subitem, self.subfield.name)
                     return subitem
             return None  # No item with this label
-        return getattr(item, self.field.name)
+        return value
 
     def to_xml(self):
         if isinstance(self.field, IndexedField):
@@ -313,13 +320,18 @@ class Field(object):
     def to_xml(self, value, version):
         raise NotImplementedError()
 
+    def lookup_tag(self):
+        # The tag of the child element that from_xml() reads the value from, or None if the value is not read from a
+        # single child element. If the element has no child with this tag, from_xml() must return the default value.
+        return None
+
     def supports_version(self, version):
         # 'version' is a Version instance, for convenience by callers
         if not version:
             return True
-        if self.supported_from and version.build < self.supported_from:
+        if self.supported_from and version.build.key < self.supported_from.key:
             return False
-        if self.deprecated_from and version.build >= self.deprecated_from:
+        if self.deprecated_from and version.build.key >= self.deprecated_from.key:
             return False
         return True
 
@@ -368,6 +380,11 @@ class FieldURIField(Field):
             raise ValueError("'field_uri' value is missing")
         return create_element('t:FieldURI', attrs=dict(FieldURI=self.field_uri))
 
+    def lookup_tag(self):
+        if self.is_attribute or not self.field_uri_postfix:
+            return None
+        return self.response_tag()
+
     def request_tag(self):
         if not self.field_uri_postfix:
             raise ValueError("'field_uri_postfix' value is missing")
@@ -684,6 +701,10 @@ class TextListField(TextField):
 class MessageField(TextField):
     INNER_ELEMENT_NAME = 'Message'
 
+    def lookup_tag(self):
+        # from_xml() returns None instead of the default value if the element is missing
+        return None
+
     def from_xml(self, elem, account):
         reply = elem.find(self.response_tag())
         if reply is None:
@@ -863,6 +884,14 @@ class EWSElementField(FieldURIField):
                 return self.value_cls.from_xml(elem=sub_elem, account=account)
         return self.default
 
+    def lookup_tag(self):
+        if self.field_uri is None:
+            if self.is_list or not self.value_cls.ELEMENT_NAME:
+                # Abstract value classes have no element name of their own
+                return None
+            return self.value_cls.response_tag()
+        return super(EWSElementField, self).lookup_tag()
+
     def to_xml(self, value, version):
         if self.field_uri is None:
             return value.to_xml(version=version)
@@ -1116,6 +1145,9 @@ class NamedSubField(SubField):
     def response_tag(self):
         return '{%s}%s' % (self.namespace, self.field_uri)
 
+    def lookup_tag(self):
+        return self.response_tag()
+
 
 class IndexedField(EWSElementField):
     PARENT_ELEMENT_NAME = None
@@ -1246,6 +1278,10 @@ class ItemField(FieldURIField):
         from .items import Item
         return Item
 
+    def lookup_tag(self):
+        # The value may be in one of several elements, one for each item class
+        return None
+
     def from_xml(self, elem, account):
         from .items import ITEM_CLASSES
         for item_cls in ITEM_CLASSES:
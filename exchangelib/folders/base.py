@@ -20,7 +20,7 @@ from ..restriction import Restriction
 from ..services import CreateFolder, UpdateFolder, DeleteFolder, EmptyFolder, FindPeople
 from ..util import TNS
 from ..version import EXCHANGE_2010
-from .collections import FolderCollection
+from .collections import FolderCollection, allowed_item_fields
 from .queryset import SingleFolderQuerySet, SHALLOW
 
 log = logging.getLogger(__name__)
@@ -243,12 +243,7 @@ class Folder(RegisterMixIn, SearchableMixIn):
     @classmethod
     def allowed_item_fields(cls, version):
         # Return non-ID fields of all item classes allowed in this folder type
-        fields = set()
-        for item_model in cls.supported_item_models:
-            fields.update(
-                set(item_model.supported_fields(version=version))
-            )
-        return fields
+        return allowed_item_fields(item_models=cls.supported_item_models, version=version)
 
     def validate_item_field(self, field):
         # Takes a fieldname, Field or FieldPath object pointing to an item field, and checks that it is valid
@@ -343,6 +338,17 @@ class Folder(RegisterMixIn, SearchableMixIn):
         :param offset: the offset relative to the first item in the item collection
         :return: a generator for the returned personas
         """
+        personas = FindPeople(account=self.root.account, chunk_size=page_size).call(**self._get_find_people_kwargs(
+            q=q, shape=shape, depth=depth, additional_fields=additional_fields, order_fields=order_fields,
+            max_items=max_items, offset=offset,
+        ))
+        for p in personas:
+            if isinstance(p, Exception):
+                raise p
+            yield p
+
+    def _get_find_people_kwargs(self, q, shape, depth, additional_fields, order_fields, max_items, offset):
+        # Validates the arguments of find_people() and returns the arguments for FindPeople.call()
         if shape not in SHAPE_CHOICES:
             raise ValueError("'shape' %s must be one of %s" % (shape, SHAPE_CHOICES))
         if depth not in ITEM_TRAVERSAL_CHOICES:
@@ -363,21 +369,17 @@ class Folder(RegisterMixIn, SearchableMixIn):
         else:
             restriction = Restriction(q, folders=[self], applies_to=Restriction.ITEMS)
             query_string = None
-        personas = FindPeople(account=self.root.account, chunk_size=page_size).call(
-                folder=self,
-                additional_fields=additional_fields,
-                restriction=restriction,
-                order_fields=order_fields,
-                shape=shape,
-                query_string=query_string,
-                depth=depth,
-                max_items=max_items,
-                offset=offset,
+        return dict(
+            folder=self,
+            additional_fields=additional_fields,
+            restriction=restriction,
+            order_fields=order_fields,
+            shape=shape,
+            query_string=query_string,
+            depth=depth,
+            max_items=max_items,
+            offset=offset,
         )
-        for p in personas:
-            if isinstance(p, Exception):
-                raise p
-            yield p
 
     def bulk_create(self, items, *args, **kwargs):
         return self.root.account.bulk_create(folder=self, items=items, *args, **kwargs)
@@ -495,7 +497,7 @@ class Folder(RegisterMixIn, SearchableMixIn):
         kwargs = dict(id=folder_id, changekey=changekey)
         # Check for 'DisplayName' element before collecting kwargs because because that clears the elements
         has_name_elem = elem.find(cls.get_field_by_fieldname('name').response_tag()) is not None
-        kwargs.update({f.name: f.from_xml(elem=elem, account=account) for f in cls.supported_fields()})
+        kwargs.update(cls._fields_from_xml(elem=elem, account=account, fields=cls.supported_fields()))
         if has_name_elem and not kwargs['name']:
             # When we request the 'DisplayName' property, some folders may still be returned with an empty value.
             # Assign a default name to these folders.
@@ -558,7 +560,7 @@ class Folder(RegisterMixIn, SearchableMixIn):
         return super(Folder, self).to_xml(version=version)
 
     @classmethod
-    def supported_fields(cls, version=None):
+    def _supported_fields(cls, version):
         return tuple(f for f in cls.FIELDS if f.name not in ('id', 'changekey') and f.supports_version(version))
 
     @classmethod
@@ -6,7 +6,7 @@ from cached_property import threaded_cached_property
 
 from ..fields import FieldPath
 from ..items import Item, ITEM_TRAVERSAL_CHOICES, SHAPE_CHOICES, ID_ONLY
-from ..properties import CalendarView, InvalidField
+from ..properties import CalendarView, InvalidField, EWSElement
 from ..queryset import QuerySet, SearchableMixIn
 from ..restriction import Restriction
 from ..services import FindFolder, GetFolder, FindItem
@@ -14,6 +14,27 @@ from .queryset import SHALLOW, DEEP, FOLDER_TRAVERSAL_CHOICES
 
 log = logging.getLogger(__name__)
 
+# Allowed item fields per (item models, version). Fields may be registered and deregistered at runtime, so cached values
+# are only valid for the generation of fields they were created from.
+_allowed_item_fields_cache = {}
+
+
+def allowed_item_fields(item_models, version):
+    # Return non-ID fields of all the given item classes
+    key = tuple(item_models), (version.build, version.api_version) if version else None
+    generation = EWSElement._fields_generation
+    try:
+        cached_generation, fields = _allowed_item_fields_cache[key]
+        if cached_generation == generation:
+            return set(fields)
+    except KeyError:
+        pass
+    fields = set()
+    for item_model in item_models:
+        fields.update(item_model.supported_fields(version=version))
+    _allowed_item_fields_cache[key] = generation, frozenset(fields)
+    return fields
+
 
 class FolderCollection(SearchableMixIn):
     # These fields are required in a FindFolder or GetFolder call to properly identify folder types
@@ -100,10 +121,7 @@ class FolderCollection(SearchableMixIn):
 
     def allowed_item_fields(self):
         # Return non-ID fields of all item classes allowed in this folder type
-        fields = set()
-        for item_model in self.supported_item_models:
-            fields.update(set(item_model.supported_fields(version=self.account.version)))
-        return fields
+        return allowed_item_fields(item_models=self.supported_item_models, version=self.account.version)
 
     @property
     def supported_item_models(self):
@@ -121,7 +139,7 @@ class FolderCollection(SearchableMixIn):
             raise InvalidField("%r is not a valid field on %s" % (field, self.supported_item_models))
 
     def find_items(self, q, shape=ID_ONLY, depth=SHALLOW, additional_fields=None, order_fields=None,
-                   calendar_view=None, page_size=None, max_items=None, offset=0):
+                   calendar_view=None, page_size=None, max_items=None, offset=0, prefetch_pages=0, parallel=False):
         """
         Private method to call the FindItem service
 
@@ -136,16 +154,66 @@ class FolderCollection(SearchableMixIn):
         :param page_size: the requested number of items per page
         :param max_items: the max number of items to return
         :param offset: the offset relative to the first item in the item collection
+        :param prefetch_pages: the number of pages to request ahead of time while the current page is being consumed
+        :param parallel: if True, keep at least as many pages in flight as there are sessions in the session pool
         :return: a generator for the returned item IDs or items
         """
-        from .base import Folder
+        for i in self._find_items(
+                q=q, parse_func=self._get_find_items_parser(shape=shape, additional_fields=additional_fields),
+                shape=shape, depth=depth, additional_fields=additional_fields, order_fields=order_fields,
+                calendar_view=calendar_view, page_size=page_size, max_items=max_items, offset=offset,
+                prefetch_pages=prefetch_pages, parallel=parallel,
+        ):
+            yield i
+
+    def _find_items(self, q, parse_func, shape=ID_ONLY, depth=SHALLOW, additional_fields=None, order_fields=None,
+                    calendar_view=None, page_size=None, max_items=None, offset=0, prefetch_pages=0, parallel=False):
+        # Like find_items(), but converts the elements returned by the FindItem service with 'parse_func'
+        find_item_kwargs = self._get_find_item_kwargs(
+            q=q, shape=shape, depth=depth, additional_fields=additional_fields, order_fields=order_fields,
+            calendar_view=calendar_view, max_items=max_items, offset=offset, prefetch_pages=prefetch_pages,
+            parallel=parallel,
+        )
+        if find_item_kwargs is None:
+            return
+        for i in FindItem(account=self.account, folders=self.folders, chunk_size=page_size).call(**find_item_kwargs):
+            yield i if isinstance(i, Exception) else parse_func(i)
+
+    def count_items(self, q, depth=SHALLOW, offset=0):
+        """
+        Private method to count items with the FindItem service, without fetching them
+
+        :param q: a Q instance containing any restrictions
+        :param depth: controls the whether to count soft-deleted items or not.
+        :param offset: the offset relative to the first item in each folder, like in find_items()
+        :return: the number of matching items in all folders
+        """
+        find_item_kwargs = self._get_find_item_kwargs(
+            q=q, shape=ID_ONLY, depth=depth, additional_fields=None, order_fields=None, calendar_view=None,
+            max_items=None, offset=0, prefetch_pages=0, parallel=False,
+        )
+        if find_item_kwargs is None:
+            return 0
+        return FindItem(account=self.account, folders=self.folders).count(
+            restriction=find_item_kwargs['restriction'],
+            query_string=find_item_kwargs['query_string'],
+            depth=depth,
+            offset=offset,
+        )
+
+    def _get_find_item_kwargs(self, q, shape, depth, additional_fields, order_fields, calendar_view, max_items,
+                              offset, prefetch_pages, parallel):
+        # Validates the arguments to find_items() and returns the kwargs for FindItem.call(), or None if there are no
+        # folders to search.
         if shape not in SHAPE_CHOICES:
             raise ValueError("'shape' %s must be one of %s" % (shape, SHAPE_CHOICES))
         if depth not in ITEM_TRAVERSAL_CHOICES:
             raise ValueError("'depth' %s must be one of %s" % (depth, ITEM_TRAVERSAL_CHOICES))
+        if not isinstance(prefetch_pages, int) or prefetch_pages < 0:
+            raise ValueError("'prefetch_pages' %r must be a non-negative integer" % prefetch_pages)
         if not self.folders:
             log.debug('Folder list is empty')
-            return
+            return None
         if additional_fields:
             for f in additional_fields:
                 self.validate_item_field(field=f)
@@ -173,7 +241,7 @@ class FolderCollection(SearchableMixIn):
             additional_fields,
             restriction.q if restriction else None,
         )
-        items = FindItem(account=self.account, folders=self.folders, chunk_size=page_size).call(
+        return dict(
             additional_fields=additional_fields,
             restriction=restriction,
             order_fields=order_fields,
@@ -183,16 +251,16 @@ class FolderCollection(SearchableMixIn):
             calendar_view=calendar_view,
             max_items=calendar_view.max_items if calendar_view else max_items,
             offset=offset,
+            prefetch_pages=prefetch_pages,
+            parallel=parallel,
         )
+
+    def _get_find_items_parser(self, shape, additional_fields):
+        # Returns a function that converts an element returned by the FindItem service to an item or an ID tuple
+        from .base import Folder
         if shape == ID_ONLY and additional_fields is None:
-            for i in items:
-                yield i if isinstance(i, Exception) else Item.id_from_xml(i)
-        else:
-            for i in items:
-                if isinstance(i, Exception):
-                    yield i
-                else:
-                    yield Folder.item_model_from_tag(i.tag).from_xml(elem=i, account=self.account)
+            return Item.id_from_xml
+        return lambda elem: Folder.item_model_from_tag(elem.tag).from_xml(elem=elem, account=self.account)
 
     def get_folder_fields(self, is_complex=None):
         from .base import Folder
@@ -236,6 +236,57 @@ class Item(BaseItem):
         item.account = account
         return item
 
+    @classmethod
+    def lazy_from_xml(cls, elem, account):
+        """Like from_xml(), but only the ID and changekey are parsed up front. Each of the other fields is decoded from
+        'elem' the first time it is read. This saves work when only some of the fields in the XML are ever read.
+
+        The item keeps a reference to 'elem' for as long as it lives. An unparsed item element typically uses a few
+        times more memory than the XML text it was parsed from, and is kept in addition to the fields that have been
+        decoded. Lazy items are thus larger than eager items until their element is released, which happens when all
+        fields are decoded at once, e.g. when the item is copied or pickled.
+        """
+        item = cls.__new__(cls)
+        item.id, item.changekey = cls.id_from_xml(elem)
+        item.account = account
+        item.folder = None
+        item._lazy_elem = elem
+        return item
+
+    def __getattr__(self, name):
+        # Only called when the attribute was not found the normal way, i.e. for fields of lazy items that have not been
+        # decoded yet. See lazy_from_xml().
+        elem = self.__dict__.get('_lazy_elem')
+        if elem is None:
+            raise AttributeError("'%s' object has no attribute '%s'" % (self.__class__.__name__, name))
+        try:
+            field = self.get_field_by_fieldname(name)
+        except InvalidField:
+            raise AttributeError("'%s' object has no attribute '%s'" % (self.__class__.__name__, name))
+        value = field.from_xml(elem=elem, account=self.account)
+        if name == 'attachments':
+            # See __init__()
+            if value:
+                for a in value:
+                    a.parent_item = self
+            else:
+                value = []
+        setattr(self, name, value)
+        return value
+
+    def _decode_lazy_fields(self):
+        # Decodes all remaining fields of a lazy item and releases its element
+        if self.__dict__.get('_lazy_elem') is None:
+            return
+        for f in self.FIELDS:
+            getattr(self, f.name)
+        del self._lazy_elem
+
+    def __reduce_ex__(self, protocol):
+        # Copies and pickles of lazy items must not share or contain the XML element
+        self._decode_lazy_fields()
+        return super(Item, self).__reduce_ex__(protocol)
+
     def save(self, update_fields=None, conflict_resolution=AUTO_RESOLVE, send_meeting_invitations=SEND_TO_NONE):
         if self.id:
             item_id, changekey = self._update(
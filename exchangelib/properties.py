@@ -16,7 +16,7 @@ from .fields import SubField, TextField, EmailAddressField, ChoiceField, DateTim
     Choice, BooleanField, IdField, ExtendedPropertyField, IntegerField, TimeField, EnumField, CharField, EmailField, \
     EWSElementListField, EnumListField, FreeBusyStatusField, UnknownEntriesField, MessageField, RecipientAddressField, \
     WEEKDAY_NAMES, FieldPath, Field
-from .util import get_xml_attr, create_element, set_xml_value, value_to_xml_text, MNS, TNS
+from .util import get_xml_attr, create_element, set_xml_value, value_to_xml_text, IndexedElement, MNS, TNS
 from .version import EXCHANGE_2013
 
 log = logging.getLogger(__name__)
@@ -104,6 +104,8 @@ class EWSElement(object):
     NAMESPACE = TNS  # The XML tag namespace. Either TNS or MNS
 
     _fields_lock = Lock()
+    # Incremented each time a field is added to or removed from any class. Used to invalidate caches derived from FIELDS
+    _fields_generation = 0
 
     __slots__ = tuple()
     __slots_keys = None
@@ -148,14 +150,53 @@ class EWSElement(object):
         # Clears an XML element to reduce memory consumption
         elem.clear()
         # Don't attempt to clean up previous siblings. We may not have parsed them yet.
-        elem.getparent().remove(elem)
+        parent = elem.getparent()
+        if parent is not None:
+            # Elements of incrementally parsed responses may already have been removed from their parent
+            parent.remove(elem)
 
     @classmethod
     def from_xml(cls, elem, account):
-        kwargs = {f.name: f.from_xml(elem=elem, account=account) for f in cls.FIELDS}
+        kwargs = cls._fields_from_xml(elem=elem, account=account, fields=cls.FIELDS)
         cls._clear(elem)
         return cls(**kwargs)
 
+    @classmethod
+    def _fields_cache(cls):
+        # Returns a dict for values derived from the FIELDS of this class. The dict is emptied when fields are added or
+        # removed on any class, since FIELDS lists may be shared between classes.
+        cached = cls.__dict__.get('_fields_cache_entry')
+        if cached is None or cached[0] != EWSElement._fields_generation:
+            cached = EWSElement._fields_generation, {}
+            cls._fields_cache_entry = cached
+        return cached[1]
+
+    @classmethod
+    def _field_lookup_tags(cls):
+        # Returns a fieldname -> tag map of the fields that are read from a single child element
+        cache = cls._fields_cache()
+        try:
+            return cache['lookup_tags']
+        except KeyError:
+            lookup_tags = cache['lookup_tags'] = {f.name: f.lookup_tag() for f in cls.FIELDS}
+            return lookup_tags
+
+    @classmethod
+    def _fields_from_xml(cls, elem, account, fields):
+        # Parses the values of 'fields' from 'elem'. The children of 'elem' are indexed by tag in a single pass, so each
+        # field gets its element with a dict lookup instead of a scan of all children. Fields that have no element get
+        # their default value without being parsed.
+        lookup_tags = cls._field_lookup_tags()
+        indexed_elem = IndexedElement(elem)
+        kwargs = {}
+        for f in fields:
+            tag = lookup_tags.get(f.name)
+            if tag is not None and tag not in indexed_elem:
+                kwargs[f.name] = f.default
+            else:
+                kwargs[f.name] = f.from_xml(elem=indexed_elem, account=account)
+        return kwargs
+
     def to_xml(self, version):
         self.clean(version=version)
         # WARNING: The order of addition of XML elements is VERY important. Exchange expects XML elements in a
@@ -202,19 +243,45 @@ class EWSElement(object):
 
     @classmethod
     def attribute_fields(cls):
-        return tuple(f for f in cls.FIELDS if f.is_attribute)
+        cache = cls._fields_cache()
+        try:
+            return cache['attribute_fields']
+        except KeyError:
+            fields = cache['attribute_fields'] = tuple(f for f in cls.FIELDS if f.is_attribute)
+            return fields
 
     @classmethod
     def supported_fields(cls, version=None):
-        # Return non-ID field names. If version is specified, only return the fields supported by this version
+        # Return non-ID field names. If version is specified, only return the fields supported by this version. The
+        # result is cached per build, since this is called for each item we parse or serialize.
+        if version is not None and version.build is None:
+            return cls._supported_fields(version=version)
+        key = 'supported_fields', version.build.key if version else None
+        cache = cls._fields_cache()
+        try:
+            return cache[key]
+        except KeyError:
+            fields = cache[key] = cls._supported_fields(version=version)
+            return fields
+
+    @classmethod
+    def _supported_fields(cls, version):
         return tuple(f for f in cls.FIELDS if not f.is_attribute and f.supports_version(version))
 
     @classmethod
     def get_field_by_fieldname(cls, fieldname):
-        for f in cls.FIELDS:
-            if f.name == fieldname:
-                return f
-        raise InvalidField("'%s' is not a valid field name on '%s'" % (fieldname, cls.__name__))
+        cache = cls._fields_cache()
+        try:
+            fields_by_name = cache['fields_by_name']
+        except KeyError:
+            fields_by_name = {}
+            for f in cls.FIELDS:
+                fields_by_name.setdefault(f.name, f)
+            cache['fields_by_name'] = fields_by_name
+        try:
+            return fields_by_name[fieldname]
+        except KeyError:
+            raise InvalidField("'%s' is not a valid field name on '%s'" % (fieldname, cls.__name__))
 
     @classmethod
     def validate_field(cls, field, version):
@@ -240,12 +307,14 @@ class EWSElement(object):
         with cls._fields_lock:
             idx = tuple(f.name for f in cls.FIELDS).index(insert_after) + 1
             cls.FIELDS.insert(idx, field)
+            EWSElement._fields_generation += 1
 
     @classmethod
     def remove_field(cls, field):
         # Remove the given field and invalidate the fieldname cache
         with cls._fields_lock:
             cls.FIELDS.remove(field)
+            EWSElement._fields_generation += 1
 
     def __eq__(self, other):
         return hash(self) == hash(other)
@@ -1094,7 +1163,7 @@ class IdChangeKeyMixIn(EWSElement):
     @classmethod
     def from_xml(cls, elem, account):
         item_id, changekey = cls.id_from_xml(elem)
-        kwargs = {f.name: f.from_xml(elem=elem, account=account) for f in cls.supported_fields()}
+        kwargs = cls._fields_from_xml(elem=elem, account=account, fields=cls.supported_fields())
         cls._clear(elem)
         return cls(id=item_id, changekey=changekey, **kwargs)
 
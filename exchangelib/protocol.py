@@ -7,10 +7,13 @@ when creating an Account.
 """
 from __future__ import unicode_literals
 
+from collections import namedtuple, deque
 import logging
 from multiprocessing.pool import ThreadPool
 import os
-from threading import Lock
+import tempfile
+from threading import Lock, Thread
+import time
 
 from cached_property import threaded_cached_property
 import requests.adapters
@@ -24,8 +27,9 @@ from .errors import TransportError, SessionPoolMinSizeReached
 from .properties import FreeBusyViewOptions, MailboxData, TimeWindow, TimeZone
 from .services import GetServerTimeZones, GetRoomLists, GetRooms, ResolveNames, GetUserAvailability, \
     GetSearchableMailboxes, ExpandDL
+from .services.common import ApiVersionTracker, ChunkSizer
 from .transport import get_auth_instance, get_service_authtype, get_docs_authtype, AUTH_TYPE_MAP, DEFAULT_HEADERS
-from .util import split_url
+from .util import split_url, shelve_filename, shelve_open_with_failover, KeyedLock
 from .version import Version, API_VERSIONS
 
 log = logging.getLogger(__name__)
@@ -35,6 +39,10 @@ def close_connections():
     CachingProtocol.clear_cache()
 
 
+# Describes a change of the session pool size of a protocol. 'time' is a timestamp as returned by time.time()
+PoolSizeEvent = namedtuple('PoolSizeEvent', ('time', 'old_size', 'new_size', 'reason'))
+
+
 class BaseProtocol(object):
     # Base class for Protocol which implements the bare essentials
 
@@ -42,6 +50,16 @@ class BaseProtocol(object):
     # low unless you have an agreement with the Exchange admin on the receiving end to hammer the server and
     # rate-limiting policies have been disabled for the connecting user.
     SESSION_POOLSIZE = 4
+    # The session pool size is halved when the server asks us to back off, and increased by one session after
+    # POOLSIZE_INCREASE_AFTER consecutive successful requests, up to MAX_SESSION_POOLSIZE. If MAX_SESSION_POOLSIZE is
+    # None, the pool size never grows beyond SESSION_POOLSIZE.
+    MAX_SESSION_POOLSIZE = None
+    POOLSIZE_INCREASE_AFTER = 50
+    # The number of pool size changes to keep in 'session_pool_events', for monitoring purposes
+    POOLSIZE_EVENTS = 100
+    # Sessions are created on demand. If True, sessions are created in a background thread when the session pool is
+    # created, so they are ready when the first requests are sent.
+    PREWARM_SESSIONS = False
     # We want only 1 TCP connection per Session object. We may have lots of different credentials hitting the server and
     # each credential needs its own session (NTLM auth will only send credentials once and then secure the connection,
     # so a connection can only handle requests for one credential). Having multiple connections ser Session could
@@ -63,9 +81,14 @@ class BaseProtocol(object):
         self.credentials = credentials
         self.service_endpoint = service_endpoint
         self.auth_type = auth_type
-        self._session_pool_size = self.SESSION_POOLSIZE
+        self._session_pool_maxsize = self.MAX_SESSION_POOLSIZE or self.SESSION_POOLSIZE
+        self._session_pool_size = min(self.SESSION_POOLSIZE, self._session_pool_maxsize)
         self._session_pool = None  # Consumers need to fill the session pool themselves
-        self._session_pool_lock = None
+        self._session_pool_lock = Lock()
+        self._session_count = 0  # The number of sessions created for the pool that are not closed yet
+        self._successful_requests = 0  # The number of successful requests since the last pool size change
+        self.session_pool_events = deque(maxlen=self.POOLSIZE_EVENTS)
+        self.last_used = time.time()  # The last time a session was requested from the pool
 
     def __del__(self):
         # pylint: disable=bare-except
@@ -75,13 +98,55 @@ class BaseProtocol(object):
             # __del__ should never fail
             pass
 
+    def invalidate_persistent_cache(self):
+        # Called when the server rejects our credentials or API version. Subclasses that persist information about the
+        # service endpoint should forget it.
+        pass
+
     def close(self):
         log.debug('Server %s: Closing sessions', self.server)
         while True:
             try:
-                self._session_pool.get(block=False).close()
+                session = self._session_pool.get(block=False)
             except Empty:
                 break
+            session.close()
+            with self._session_pool_lock:
+                self._session_count -= 1
+
+    def _create_session_pool(self):
+        # Create a pool to reuse sessions containing connections to the server. The pool has room for the sessions we
+        # may add if the pool size is increased. Sessions are created when they are first needed.
+        self._session_pool = LifoQueue(maxsize=self._session_pool_maxsize)
+        with self._session_pool_lock:
+            self._session_count = 0
+        if self.PREWARM_SESSIONS:
+            t = Thread(target=self.prewarm_sessions)
+            t.daemon = True
+            t.start()
+        return self._session_pool
+
+    def _reserve_session(self):
+        # Returns True if we may create a new session for the pool without exceeding the pool size
+        with self._session_pool_lock:
+            if self._session_count >= self._session_pool_size:
+                return False
+            self._session_count += 1
+            return True
+
+    def _create_pool_session(self):
+        # Creates a session for a slot reserved with _reserve_session()
+        try:
+            return self.create_session()
+        except Exception:
+            with self._session_pool_lock:
+                self._session_count -= 1
+            raise
+
+    def prewarm_sessions(self):
+        """Creates sessions up to the session pool size, so requests don't have to wait for sessions to be created"""
+        while self._reserve_session():
+            self._session_pool.put(self._create_pool_session(), block=False)
 
     @classmethod
     def get_adapter(cls):
@@ -97,26 +162,79 @@ class BaseProtocol(object):
     def session_pool_size(self):
         return self._session_pool_size
 
+    @property
+    def max_session_pool_size(self):
+        return self._session_pool_maxsize
+
+    def _set_poolsize(self, new_size, reason):
+        # Must be called while holding the session pool lock
+        self.session_pool_events.append(PoolSizeEvent(
+            time=time.time(), old_size=self._session_pool_size, new_size=new_size, reason=reason
+        ))
+        self._session_pool_size = new_size
+        self._successful_requests = 0
+
     def decrease_poolsize(self):
         """Decreases the session pool size in response to error messages from the server requesting to rate-limit
-        requests. We decrease by one session per call.
+        requests. We halve the pool size per call. Idle sessions are closed immediately. Sessions that are in use are
+        closed when they are released.
         """
-        # Take a single session from the pool and discard it. We need to protect this with a lock while we are changing
-        # the pool size variable, to avoid race conditions. We must keep at least one session in the pool.
+        # We need to protect this with a lock while we are changing the pool size variable, to avoid race conditions. We
+        # must keep at least one session in the pool.
         if self._session_pool_size <= 1:
             raise SessionPoolMinSizeReached('Session pool size cannot be decreased further')
         with self._session_pool_lock:
             if self._session_pool_size <= 1:
                 log.debug('Session pool size was decreased in another thread')
                 return
-            log.warning('Lowering session pool size from %s to %s', self._session_pool_size,
-                        self._session_pool_size - 1)
-            self.get_session().close()
-            self._session_pool_size -= 1
+            new_size = self._session_pool_size // 2
+            log.warning('Lowering session pool size from %s to %s', self._session_pool_size, new_size)
+            self._set_poolsize(new_size=new_size, reason='decrease')
+            while self._session_count > self._session_pool_size:
+                try:
+                    session = self._session_pool.get(block=False)
+                except Empty:
+                    break
+                session.close()
+                self._session_count -= 1
+
+    def increase_poolsize(self):
+        """Increases the session pool size by one session, up to the maximum pool size. Returns True if the pool size
+        was increased.
+        """
+        with self._session_pool_lock:
+            return self._increase_poolsize()
+
+    def _increase_poolsize(self):
+        # Must be called while holding the session pool lock
+        if self._session_pool_size >= self._session_pool_maxsize:
+            return False
+        new_size = self._session_pool_size + 1
+        log.info('Raising session pool size from %s to %s', self._session_pool_size, new_size)
+        self._set_poolsize(new_size=new_size, reason='increase')
+        if self._session_pool.empty() and self._session_count < self._session_pool_size:
+            # Threads may be waiting for a session. Don't leave them waiting until a session is released.
+            self._session_pool.put(self.create_session(), block=False)
+            self._session_count += 1
+        return True
+
+    def register_success(self):
+        # Called by services after each successful request. Grows the session pool again after a run of successful
+        # requests, to recover from an earlier decrease. The counter is checked and reset while holding the lock, so
+        # concurrent requests can't grow the pool by more than one session per run.
+        if self._session_pool_size >= self._session_pool_maxsize:
+            return
+        with self._session_pool_lock:
+            self._successful_requests += 1
+            if self._successful_requests >= self.POOLSIZE_INCREASE_AFTER:
+                self._increase_poolsize()
 
     def get_session(self):
+        self.last_used = time.time()
         _timeout = 60  # Rate-limit messages about session starvation
         while True:
+            if self._session_pool.empty() and self._reserve_session():
+                return self._create_pool_session()
             try:
                 log.debug('Server %s: Waiting for session', self.server)
                 session = self._session_pool.get(timeout=_timeout)
@@ -127,8 +245,17 @@ class BaseProtocol(object):
                 log.debug('Server %s: No sessions available for %s seconds', self.server, _timeout)
 
     def release_session(self, session):
+        if self._session_count > self._session_pool_size:
+            with self._session_pool_lock:
+                if self._session_count > self._session_pool_size:
+                    # The session pool size was decreased. Close the session instead of releasing it
+                    log.debug('Server %s: Closing surplus session %s', self.server, session.session_id)
+                    session.close()
+                    self._session_count -= 1
+                    return
         # This should never fail, as we don't have more sessions than the queue contains
         log.debug('Server %s: Releasing session %s', self.server, session.session_id)
+        session.last_used = time.time()
         try:
             self._session_pool.put(session, block=False)
         except Full:
@@ -158,9 +285,37 @@ class BaseProtocol(object):
         session.headers.update(DEFAULT_HEADERS.copy())
         session.mount('http://', adapter=self.get_adapter())
         session.mount('https://', adapter=self.get_adapter())
+        session.last_used = time.time()
         log.debug('Server %s: Created session %s', self.server, session.session_id)
         return session
 
+    def close_idle_sessions(self, max_idle):
+        """Closes sessions that have been unused in the session pool for more than 'max_idle' seconds. New sessions are
+        created on demand. Returns the number of closed sessions.
+        """
+        now = time.time()
+        # The least recently used sessions are at the bottom of the LIFO queue, so we need to take out all sessions to
+        # find them. Sessions in use by other threads are not in the queue and are never closed here.
+        sessions = []
+        while True:
+            try:
+                sessions.append(self._session_pool.get(block=False))
+            except Empty:
+                break
+        idle_sessions = [s for s in sessions if now - s.last_used > max_idle]
+        # Put back the remaining sessions in their original order, with the most recently used session on top
+        for session in reversed(sessions):
+            if session not in idle_sessions:
+                self._session_pool.put(session, block=False)
+        if not idle_sessions:
+            return 0
+        for session in idle_sessions:
+            log.debug('Server %s: Closing idle session %s', self.server, session.session_id)
+            session.close()
+        with self._session_pool_lock:
+            self._session_count -= len(idle_sessions)
+        return len(idle_sessions)
+
     @classmethod
     def raw_session(cls):
         s = requests.sessions.Session()
@@ -172,9 +327,83 @@ class BaseProtocol(object):
         return self.__class__.__name__ + repr((self.service_endpoint, self.credentials, self.auth_type))
 
 
+BOOTSTRAP_PERSISTENT_STORAGE = os.path.join(tempfile.gettempdir(), shelve_filename(prefix='exchangelib.bootstrap'))
+
+
+class BootstrapCache(object):
+    # Persists the service endpoint -> (auth_type, docs_auth_type, version) translation to the filesystem, so new
+    # processes can skip the round trips to the server that are needed to find this information when creating a
+    # Protocol. Like the autodiscover cache, the persistent storage must not contain any sensitive information since the
+    # cache could be readable by unprivileged users. Just don't persist any credentials info.
+
+    # An entry is removed when the server rejects our credentials or the cached API version.
+    def __init__(self):
+        self._storage_lock = Lock()
+
+    @property
+    def _storage_file(self):
+        return BOOTSTRAP_PERSISTENT_STORAGE
+
+    def clear(self):
+        # Wipe the entire cache
+        with self._storage_lock, shelve_open_with_failover(self._storage_file) as db:
+            db.clear()
+
+    def get(self, service_endpoint):
+        # Returns an (auth_type, docs_auth_type, version) tuple, or None if there is no usable cache entry
+        try:
+            with self._storage_lock, shelve_open_with_failover(self._storage_file) as db:
+                value = db.get(str(service_endpoint))
+            if value is None:
+                return None
+            auth_type, docs_auth_type, version = value
+            if auth_type not in AUTH_TYPE_MAP or not isinstance(version, Version):
+                raise ValueError('Unexpected cache contents: %r' % (value,))
+            return value
+        except Exception as e:
+            # The entry may have been written by an incompatible version of this package
+            log.warning('Could not read cache entry for %s (%r)', service_endpoint, e)
+            del self[service_endpoint]
+            return None
+
+    def __contains__(self, service_endpoint):
+        with self._storage_lock, shelve_open_with_failover(self._storage_file) as db:
+            return str(service_endpoint) in db
+
+    def __setitem__(self, service_endpoint, value):
+        auth_type, docs_auth_type, version = value
+        with self._storage_lock, shelve_open_with_failover(self._storage_file) as db:
+            db[str(service_endpoint)] = (auth_type, docs_auth_type, version)
+
+    def __delitem__(self, service_endpoint):
+        # Don't fail on non-existing entries because we could end here multiple times due to race conditions
+        with self._storage_lock, shelve_open_with_failover(self._storage_file) as db:
+            try:
+                del db[str(service_endpoint)]
+            except KeyError:
+                pass
+
+
+_bootstrap_cache = BootstrapCache()
+
+
 class CachingProtocol(type):
     _protocol_cache = {}
-    _protocol_cache_lock = Lock()
+    _protocol_cache_lock = Lock()  # Guards changes to the cache
+    _protocol_creation_lock = KeyedLock()  # Guards creation of protocols, per cache key
+    _protocol_failure_times = {}  # Maps cache keys of cached TransportError instances to the time of the failure
+    _reaper = None
+
+    # The maximum number of cache entries. When the cache is full, the least recently used protocol is evicted from the
+    # cache. None means no limit.
+    MAX_CACHED_PROTOCOLS = 100
+    # Protocols that have not been used for this many seconds are evicted from the cache. None means never.
+    PROTOCOL_TTL = None
+    # Failures to create a protocol are cached for this many seconds. None means forever.
+    NEGATIVE_TTL = 300
+    # If set, a background thread closes sessions of cached protocols that have been idle for this many seconds, and
+    # evicts expired protocols.
+    SESSION_IDLE_TIMEOUT = None
 
     def __call__(cls, *args, **kwargs):
         # Cache Protocol instances that point to the same endpoint and use the same credentials. This ensures that we
@@ -188,21 +417,15 @@ class CachingProtocol(type):
         # combination should be safe.
         _protocol_cache_key = kwargs['service_endpoint'], kwargs['credentials']
 
-        protocol = cls._protocol_cache.get(_protocol_cache_key)
-        if isinstance(protocol, Exception):
-            # The input data leads to a TransportError. Re-throw
-            raise protocol
+        protocol = cls._get_cached_protocol(_protocol_cache_key)
         if protocol is not None:
             return protocol
 
-        # Acquire lock to guard against multiple threads competing to cache information. Having a per-server lock is
-        # probably overkill although it would reduce lock contention.
-        log.debug('Waiting for _protocol_cache_lock')
-        with cls._protocol_cache_lock:
-            protocol = cls._protocol_cache.get(_protocol_cache_key)
-            if isinstance(protocol, Exception):
-                # Someone got ahead of us while holding the lock, but the input data leads to a TransportError. Re-throw
-                raise protocol
+        # Acquire lock to guard against multiple threads creating a protocol for the same key. Creating a protocol may
+        # involve slow network requests, so we don't block threads creating protocols for other keys.
+        log.debug('Waiting for _protocol_creation_lock')
+        with cls._protocol_creation_lock(_protocol_cache_key):
+            protocol = cls._get_cached_protocol(_protocol_cache_key)
             if protocol is not None:
                 # Someone got ahead of us while holding the lock
                 return protocol
@@ -212,24 +435,115 @@ class CachingProtocol(type):
             except TransportError as e:
                 # This can happen if, for example, autodiscover supplies us with a bogus EWS endpoint
                 log.warning('Failed to create cached protocol with key %s: %s', _protocol_cache_key, e)
-                cls._protocol_cache[_protocol_cache_key] = e
+                with cls._protocol_cache_lock:
+                    cls._protocol_cache[_protocol_cache_key] = e
+                    cls._protocol_failure_times[_protocol_cache_key] = time.time()
+                    cls._evict_protocols()
                 raise e
-            cls._protocol_cache[_protocol_cache_key] = protocol
+            with cls._protocol_cache_lock:
+                cls._protocol_cache[_protocol_cache_key] = protocol
+                cls._protocol_failure_times.pop(_protocol_cache_key, None)
+                cls._evict_protocols()
+                cls._start_reaper()
         return protocol
 
+    def _get_cached_protocol(cls, key):
+        # Returns the cached protocol for the key, or None if there is no usable cache entry. Re-raises cached errors
+        protocol = cls._protocol_cache.get(key)
+        if isinstance(protocol, Exception):
+            failed_at = cls._protocol_failure_times.get(key)
+            if failed_at is None or (cls.NEGATIVE_TTL is not None and time.time() - failed_at >= cls.NEGATIVE_TTL):
+                # The cached error has expired. Try again
+                return None
+            # The input data leads to a TransportError. Re-throw
+            raise protocol
+        return protocol
+
+    @classmethod
+    def _last_used(mcs, key):
+        protocol = mcs._protocol_cache[key]
+        if isinstance(protocol, Exception):
+            return mcs._protocol_failure_times.get(key, 0)
+        return protocol.last_used
+
+    @classmethod
+    def _evict(mcs, key):
+        protocol = mcs._protocol_cache.pop(key)
+        mcs._protocol_failure_times.pop(key, None)
+        if isinstance(protocol, Exception):
+            return
+        # The protocol may still be used by Account objects, maybe in other threads, so we don't close it. We just
+        # close its idle sessions, which are recreated if the protocol is used again. The protocol closes its thread
+        # pool and remaining sessions when the last reference to it is gone.
+        log.debug("Service endpoint '%s': Evicting protocol from cache", key[0])
+        protocol.close_idle_sessions(max_idle=0)
+
+    @classmethod
+    def _evict_protocols(mcs):
+        # Evicts expired cache entries, and the least recently used entries if the cache is full. Must be called while
+        # holding the cache lock.
+        now = time.time()
+        for key, protocol in list(mcs._protocol_cache.items()):
+            ttl = mcs.NEGATIVE_TTL if isinstance(protocol, Exception) else mcs.PROTOCOL_TTL
+            if ttl is not None and now - mcs._last_used(key) >= ttl:
+                mcs._evict(key)
+        if mcs.MAX_CACHED_PROTOCOLS is None:
+            return
+        while len(mcs._protocol_cache) > mcs.MAX_CACHED_PROTOCOLS:
+            mcs._evict(min(mcs._protocol_cache, key=mcs._last_used))
+
+    @classmethod
+    def _start_reaper(mcs):
+        # Must be called while holding the cache lock
+        if mcs.SESSION_IDLE_TIMEOUT is None or (mcs._reaper is not None and mcs._reaper.is_alive()):
+            return
+        mcs._reaper = Thread(target=mcs._run_reaper)
+        mcs._reaper.daemon = True
+        mcs._reaper.start()
+
+    @classmethod
+    def _run_reaper(mcs):
+        # Runs until the reaper is disabled or the cache is empty. The reaper is restarted when a protocol is cached.
+        while mcs.SESSION_IDLE_TIMEOUT is not None and mcs._protocol_cache:
+            time.sleep(mcs.SESSION_IDLE_TIMEOUT / 2.0)
+            try:
+                mcs.reap_idle_sessions()
+            except Exception:
+                log.warning('Failed to reap idle sessions', exc_info=True)
+
+    @classmethod
+    def reap_idle_sessions(mcs):
+        """Evicts expired cache entries and closes sessions of cached protocols that have been idle for more than
+        SESSION_IDLE_TIMEOUT seconds. This is called periodically by a background thread if SESSION_IDLE_TIMEOUT is set.
+        """
+        with mcs._protocol_cache_lock:
+            mcs._evict_protocols()
+            protocols = [p for p in mcs._protocol_cache.values() if not isinstance(p, Exception)]
+        if mcs.SESSION_IDLE_TIMEOUT is None:
+            return
+        for protocol in protocols:
+            protocol.close_idle_sessions(max_idle=mcs.SESSION_IDLE_TIMEOUT)
+
     @classmethod
     def clear_cache(mcs):
-        for key, protocol in mcs._protocol_cache.items():
+        with mcs._protocol_cache_lock:
+            cached_items = list(mcs._protocol_cache.items())
+            mcs._protocol_cache.clear()
+            mcs._protocol_failure_times.clear()
+        for key, protocol in cached_items:
             if isinstance(protocol, Exception):
                 continue
             service_endpoint = key[0]
             log.debug("Service endpoint '%s': Closing sessions", service_endpoint)
             protocol.close()
-        mcs._protocol_cache.clear()
 
 
 @python_2_unicode_compatible
 class Protocol(with_metaclass(CachingProtocol, BaseProtocol)):
+    # If True, the auth type and version of the service endpoint are cached on disk when we have detected them, and
+    # reused when a Protocol for the same service endpoint is created, e.g. in another process.
+    USE_PERSISTENT_CACHE = False
+
     def __init__(self, *args, **kwargs):
         version = kwargs.pop('version', None)
         super(Protocol, self).__init__(*args, **kwargs)
@@ -239,11 +553,21 @@ class Protocol(with_metaclass(CachingProtocol, BaseProtocol)):
         self.messages_url = '%s://%s/EWS/messages.xsd' % (scheme, self.server)
         self.types_url = '%s://%s/EWS/types.xsd' % (scheme, self.server)
 
+        # Look for auth type and version info in the persistent cache if we need to detect any of them
+        use_persistent_cache = self.USE_PERSISTENT_CACHE and (self.auth_type is None or not version)
+        cached = _bootstrap_cache.get(self.service_endpoint) if use_persistent_cache else None
+        self._persistently_cached = cached is not None
+        if cached:
+            log.debug('Using cached auth type and version for %s: %s', self.service_endpoint, cached)
+
         # Autodetect authentication type if necessary
         # pylint: disable=access-member-before-definition
         if self.auth_type is None:
-            self.auth_type = get_service_authtype(service_endpoint=self.service_endpoint, versions=API_VERSIONS,
-                                                  name=self.credentials.username)
+            if cached:
+                self.auth_type = cached[0]
+            else:
+                self.auth_type = get_service_authtype(service_endpoint=self.service_endpoint, versions=API_VERSIONS,
+                                                      name=self.credentials.username)
 
         # Default to the auth type used by the service. We only need this if 'version' is None
         self.docs_auth_type = self.auth_type
@@ -251,11 +575,12 @@ class Protocol(with_metaclass(CachingProtocol, BaseProtocol)):
         # Try to behave nicely with the Exchange server. We want to keep the connection open between requests.
         # We also want to re-use sessions, to avoid the NTLM auth handshake on every request.
         self._session_pool = self._create_session_pool()
-        self._session_pool_lock = Lock()
 
         if version:
             isinstance(version, Version)
             self.version = version
+        elif cached:
+            self.docs_auth_type, self.version = cached[1:]
         else:
             # Version.guess() needs auth objects and a working session pool
             try:
@@ -265,12 +590,24 @@ class Protocol(with_metaclass(CachingProtocol, BaseProtocol)):
                 pass
             self.version = Version.guess(self)
 
-    def _create_session_pool(self):
-        # Create a pool to reuse sessions containing connections to the server
-        session_pool = LifoQueue(maxsize=self._session_pool_size)
-        for _ in range(self._session_pool_size):
-            session_pool.put(self.create_session(), block=False)
-        return session_pool
+        if use_persistent_cache and not cached:
+            _bootstrap_cache[self.service_endpoint] = (self.auth_type, self.docs_auth_type, self.version)
+            self._persistently_cached = True
+
+    def invalidate_persistent_cache(self):
+        if not self._persistently_cached:
+            return
+        log.debug('Removing cached auth type and version for %s', self.service_endpoint)
+        self._persistently_cached = False
+        del _bootstrap_cache[self.service_endpoint]
+
+    def close(self):
+        super(Protocol, self).close()
+        # The thread pool is a cached property. Close it if it was created. Running tasks are allowed to finish. A new
+        # thread pool is created if the protocol is used again.
+        thread_pool = self.__dict__.pop('thread_pool', None)
+        if thread_pool is not None:
+            thread_pool.close()
 
     @threaded_cached_property
     def thread_pool(self):
@@ -278,9 +615,25 @@ class Protocol(with_metaclass(CachingProtocol, BaseProtocol)):
         # larger than the connection pool so we have time to process data without idling the connection.
         # Create the pool as the last thing here, since we may fail in the version or auth type guessing, which would
         # leave open threads around to be garbage collected.
-        thread_poolsize = 4 * self._session_pool_size
+        thread_poolsize = 4 * self._session_pool_maxsize
         return ThreadPool(processes=thread_poolsize)
 
+    @threaded_cached_property
+    def chunk_sizers(self):
+        # Used by pooled services to adapt their chunk size to the server. Maps service names to ChunkSizer objects.
+        return {}
+
+    @threaded_cached_property
+    def version_tracker(self):
+        # Used by services to remember the API versions that this service endpoint has rejected
+        return ApiVersionTracker()
+
+    def get_chunk_sizer(self, service_name):
+        try:
+            return self.chunk_sizers[service_name]
+        except KeyError:
+            return self.chunk_sizers.setdefault(service_name, ChunkSizer(service_name=service_name))
+
     def get_timezones(self, timezones=None, return_full_timezone_data=False):
         """ Get timezone definitions from the server
 
@@ -397,20 +750,22 @@ class Protocol(with_metaclass(CachingProtocol, BaseProtocol)):
     def __getstate__(self):
         # The thread and session pools cannot be pickled
         state = self.__dict__.copy()
-        try:
-            del state['thread_pool']
-        except KeyError:
-            # thread_pool is a cached property and may not exist
-            pass
+        for attr in ('thread_pool', 'chunk_sizers', 'version_tracker'):
+            try:
+                del state[attr]
+            except KeyError:
+                # These are cached properties and may not exist
+                pass
         del state['_session_pool']
         del state['_session_pool_lock']
         return state
 
     def __setstate__(self, state):
-        # Restore the session pool. The thread pool is a property and will recreate itself
+        # Restore the session pool. The thread pool is a property and will recreate itself. The lock must exist before
+        # the session pool is created, because sessions may be prewarmed in a background thread.
         self.__dict__.update(state)
-        self._session_pool = self._create_session_pool()
         self._session_pool_lock = Lock()
+        self._session_pool = self._create_session_pool()
 
     def __str__(self):
         return '''\
@@ -1,17 +1,21 @@
 # coding=utf-8
 from __future__ import unicode_literals
 
+from collections import OrderedDict
 from copy import deepcopy
 from itertools import islice
 import logging
 
 from future.utils import python_2_unicode_compatible
 
-from .items import CalendarItem, ID_ONLY
-from .fields import FieldPath, FieldOrder
+from .ewsdatetime import UTC
+from .items import Item, CalendarItem, ID_ONLY
+from .fields import AttachmentField, BooleanField, DateTimeField, DecimalField, EnumAsIntField, EnumField, FieldOrder, \
+    FieldPath, IntegerField
 from .properties import InvalidField
 from .restriction import Q
 from .services import CHUNK_SIZE
+from .util import IndexedElement
 from .version import EXCHANGE_2010
 
 log = logging.getLogger(__name__)
@@ -78,6 +82,9 @@ class QuerySet(SearchableMixIn):
         self.return_format = self.NONE
         self.calendar_view = None
         self.page_size = None
+        self.prefetch_pages = 0
+        self.parallel = False
+        self.lazy = False
         self.max_items = None
         self.offset = 0
 
@@ -109,6 +116,9 @@ class QuerySet(SearchableMixIn):
         new_qs.return_format = self.return_format
         new_qs.calendar_view = self.calendar_view
         new_qs.page_size = self.page_size
+        new_qs.prefetch_pages = self.prefetch_pages
+        new_qs.parallel = self.parallel
+        new_qs.lazy = self.lazy
         new_qs.max_items = self.max_items
         new_qs.offset = self.offset
         return new_qs
@@ -173,15 +183,73 @@ class QuerySet(SearchableMixIn):
         return additional_fields
 
     def _format_items(self, items, return_format):
+        # Transforms results from the server according to the return format. Makes sure to pass on Exception instances
+        # unaltered.
+        format_func = self._get_format_func(return_format=return_format)
+        return (i if isinstance(i, Exception) else format_func(i) for i in items)
+
+    def _get_format_func(self, return_format):
         return {
             self.VALUES: self._as_values,
             self.VALUES_LIST: self._as_values_list,
             self.FLAT: self._as_flat_values_list,
             self.NONE: self._as_items,
-        }[return_format](items)
-
-    def _query(self):
+        }[return_format]()
+
+    def _format_query(self):
+        # Returns the query result in the requested return format
+        values_parser = self._get_values_parser()
+        if values_parser is not None:
+            return self._query(parse_func=values_parser)
+        items = self._query(parse_func=self._get_lazy_parser())
+        return self._format_items(items=items, return_format=self.return_format)
+
+    def _query(self, parse_func=None):
+        # If 'parse_func' is set, it is used to convert the item elements returned by the server, instead of creating
+        # Item objects.
         from .folders import SHALLOW
+        additional_fields, complex_fields_requested, order_fields, extra_order_fields = self._get_query_fields()
+        if self.request_type == self.PERSONA:
+            if len(self.folder_collection) != 1:
+                raise ValueError('Personas can only be queried on a single folder')
+            items = list(self.folder_collection)[0].find_people(
+                self.q,
+                shape=ID_ONLY,
+                depth=SHALLOW,
+                additional_fields=additional_fields,
+                order_fields=order_fields,
+                page_size=self.page_size,
+                max_items=self.max_items,
+                offset=self.offset,
+            )
+        else:
+            find_item_kwargs = self._get_find_item_kwargs(
+                additional_fields=additional_fields,
+                complex_fields_requested=complex_fields_requested,
+                order_fields=order_fields,
+            )
+            if complex_fields_requested or parse_func is None:
+                items = self.folder_collection.find_items(self.q, **find_item_kwargs)
+            else:
+                items = self.folder_collection._find_items(self.q, parse_func=parse_func, **find_item_kwargs)
+            if complex_fields_requested:
+                # find_items() returns (id, changekey) tuples. Pass that to fetch() to get the complex fields
+                items = self.folder_collection.account._fetch(
+                    ids=items,
+                    folder=None,
+                    only_fields=additional_fields,
+                    chunk_size=self.page_size,
+                    ordered=True,
+                    parse_func=parse_func,
+                )
+
+        if not self._must_sort_clientside:
+            return items
+        return self._sort_items(items=items, extra_order_fields=extra_order_fields)
+
+    def _get_query_fields(self):
+        # Returns the fields to request from the server, whether any of these are complex fields, the fields to sort on
+        # server-side, and any extra fields we only requested for client-side sorting.
         from .items import Persona
         if self.only_fields is None:
             # We didn't restrict list of field paths. Get all fields from the server, including extended properties.
@@ -199,65 +267,45 @@ class QuerySet(SearchableMixIn):
 
         # EWS can do server-side sorting on multiple fields. A caveat is that server-side sorting is not supported
         # for calendar views. In this case, we do all the sorting client-side.
-        if self.calendar_view:
-            must_sort_clientside = bool(self.order_fields)
+        if self._must_sort_clientside:
             order_fields = None
-        else:
-            must_sort_clientside = False
-            order_fields = self.order_fields
-
-        if must_sort_clientside:
             # Also fetch order_by fields that we only need for client-side sorting.
             extra_order_fields = {f.field_path for f in self.order_fields} - additional_fields
             if extra_order_fields:
                 additional_fields.update(extra_order_fields)
         else:
+            order_fields = None if self.calendar_view else self.order_fields
             extra_order_fields = set()
+        return additional_fields, complex_fields_requested, order_fields, extra_order_fields
 
-        if self.request_type == self.PERSONA:
-            if len(self.folder_collection) != 1:
-                raise ValueError('Personas can only be queried on a single folder')
-            items = list(self.folder_collection)[0].find_people(
-                self.q,
-                shape=ID_ONLY,
-                depth=SHALLOW,
-                additional_fields=additional_fields,
-                order_fields=order_fields,
-                page_size=self.page_size,
-                max_items=self.max_items,
-                offset=self.offset,
-            )
-        else:
-            find_item_kwargs = dict(
-                shape=ID_ONLY,  # Always use IdOnly here, because AllProperties doesn't actually get *all* properties
-                additional_fields=additional_fields,
-                order_fields=order_fields,
-                calendar_view=self.calendar_view,
-                page_size=self.page_size,
-                max_items=self.max_items,
-                offset=self.offset,
-            )
-
-            if complex_fields_requested:
-                # The FindItem service does not support complex field types. Tell find_items() to return
-                # (id, changekey) tuples, and pass that to fetch().
-                find_item_kwargs['additional_fields'] = None
-                items = self.folder_collection.account.fetch(
-                    ids=self.folder_collection.find_items(self.q, **find_item_kwargs),
-                    only_fields=additional_fields,
-                    chunk_size=self.page_size,
-                )
-            else:
-                if not additional_fields:
-                    # If additional_fields is the empty set, we only requested ID and changekey fields. We can then
-                    # take a shortcut by using (shape=ID_ONLY, additional_fields=None) to tell find_items() to return
-                    # (id, changekey) tuples. We'll post-process those later.
-                    find_item_kwargs['additional_fields'] = None
-                items = self.folder_collection.find_items(self.q, **find_item_kwargs)
-
-        if not must_sort_clientside:
-            return items
-
+    @property
+    def _must_sort_clientside(self):
+        return bool(self.calendar_view and self.order_fields)
+
+    def _get_find_item_kwargs(self, additional_fields, complex_fields_requested, order_fields):
+        find_item_kwargs = dict(
+            shape=ID_ONLY,  # Always use IdOnly here, because AllProperties doesn't actually get *all* properties
+            additional_fields=additional_fields,
+            order_fields=order_fields,
+            calendar_view=self.calendar_view,
+            page_size=self.page_size,
+            max_items=self.max_items,
+            offset=self.offset,
+            prefetch_pages=self.prefetch_pages,
+            parallel=self.parallel,
+        )
+        if complex_fields_requested:
+            # The FindItem service does not support complex field types. Tell find_items() to return
+            # (id, changekey) tuples, and pass that to fetch().
+            find_item_kwargs['additional_fields'] = None
+        elif not additional_fields:
+            # If additional_fields is the empty set, we only requested ID and changekey fields. We can then
+            # take a shortcut by using (shape=ID_ONLY, additional_fields=None) to tell find_items() to return
+            # (id, changekey) tuples. We'll post-process those later.
+            find_item_kwargs['additional_fields'] = None
+        return find_item_kwargs
+
+    def _sort_items(self, items, extra_order_fields):
         # Resort to client-side sorting of the order_by fields. This is greedy. Sorting in Python is stable, so when
         # sorting on multiple fields, we can just do a sort on each of the requested fields in reverse order. Reverse
         # each sort operation if the field was marked as such.
@@ -294,11 +342,16 @@ class QuerySet(SearchableMixIn):
 
         log.debug('Initializing cache')
         _cache = []
-        for val in self._format_items(items=self._query(), return_format=self.return_format):
+        for val in self._format_query():
             _cache.append(val)
             yield val
         self._cache = _cache
 
+    def __aiter__(self):
+        # Supports 'async for item in qs' on Python 3.6+. The cache is filled in the same way as in __iter__()
+        from .aio import iterate_queryset
+        return iterate_queryset(self)
+
     def __len__(self):
         if self.is_cached:
             return len(self._cache)
@@ -350,71 +403,112 @@ class QuerySet(SearchableMixIn):
             new_qs.page_size = new_qs.max_items
         return islice(new_qs.__iter__(), None, None, s.step)
 
-    def _item_yielder(self, iterable, item_func, id_only_func, changekey_only_func, id_and_changekey_func):
-        # Transforms results from the server according to the given transform functions. Makes sure to pass on
-        # Exception instances unaltered.
+    def _item_transformer(self, item_func, id_only_func, changekey_only_func, id_and_changekey_func):
+        # Returns a function that transforms a single result from the server according to the given transform functions
         if self.only_fields:
             has_non_attribute_fields = bool({f for f in self.only_fields if not f.field.is_attribute})
         else:
             has_non_attribute_fields = True
-        if not has_non_attribute_fields:
-            # _query() will return an iterator of (id, changekey) tuples
-            if self._changekey_field not in self.only_fields:
-                transform_func = id_only_func
-            elif self._item_id_field not in self.only_fields:
-                transform_func = changekey_only_func
-            else:
-                transform_func = id_and_changekey_func
-            for i in iterable:
-                if isinstance(i, Exception):
-                    yield i
-                    continue
-                yield transform_func(*i)
-            return
-        for i in iterable:
-            if isinstance(i, Exception):
-                yield i
-                continue
-            yield item_func(i)
+        if has_non_attribute_fields:
+            return item_func
+        # _query() will return an iterator of (id, changekey) tuples
+        if self._changekey_field not in self.only_fields:
+            transform_func = id_only_func
+        elif self._item_id_field not in self.only_fields:
+            transform_func = changekey_only_func
+        else:
+            transform_func = id_and_changekey_func
+        return lambda i: transform_func(*i)
 
-    def _as_items(self, iterable):
+    def _as_items(self):
         from .items import Item
-        return self._item_yielder(
-            iterable=iterable,
+        return self._item_transformer(
             item_func=lambda i: i,
             id_only_func=lambda item_id, changekey: Item(id=item_id),
             changekey_only_func=lambda item_id, changekey: Item(changekey=changekey),
             id_and_changekey_func=lambda item_id, changekey: Item(id=item_id, changekey=changekey),
         )
 
-    def _as_values(self, iterable):
+    def _as_values(self):
         if not self.only_fields:
             raise ValueError('values() requires at least one field name')
-        return self._item_yielder(
-            iterable=iterable,
+        return self._item_transformer(
             item_func=lambda i: {f.path: f.get_value(i) for f in self.only_fields},
             id_only_func=lambda item_id, changekey: {'id': item_id},
             changekey_only_func=lambda item_id, changekey: {'changekey': changekey},
             id_and_changekey_func=lambda item_id, changekey: {'id': item_id, 'changekey': changekey},
         )
 
-    def _as_values_list(self, iterable):
+    def _as_values_list(self):
         if not self.only_fields:
             raise ValueError('values_list() requires at least one field name')
-        return self._item_yielder(
-            iterable=iterable,
+        return self._item_transformer(
             item_func=lambda i: tuple(f.get_value(i) for f in self.only_fields),
             id_only_func=lambda item_id, changekey: (item_id,),
             changekey_only_func=lambda item_id, changekey: (changekey,),
             id_and_changekey_func=lambda item_id, changekey: (item_id, changekey),
         )
 
-    def _as_flat_values_list(self, iterable):
+    def _get_values_parser(self):
+        # Returns a function that reads the values requested with values() or values_list() directly from an item
+        # element returned by the server. Returns None if the results must be formatted from Item objects or ID tuples.
+        if self.return_format == self.NONE:
+            return None
+        if self.return_format == self.FLAT and len(self.only_fields or ()) != 1:
+            return None
+        get_values = self._get_values_reader()
+        if get_values is None:
+            return None
+        if self.return_format == self.VALUES:
+            paths = [f.path for f in self.only_fields]
+            return lambda elem: dict(zip(paths, get_values(elem)))
+        if self.return_format == self.VALUES_LIST:
+            return lambda elem: tuple(get_values(elem))
+        return lambda elem: get_values(elem)[0]
+
+    def _get_values_reader(self):
+        # Returns a function that reads the values of 'only_fields' directly from an item element returned by the
+        # server, as a list. This is much cheaper than creating an Item object for each element, only to read a few of
+        # its fields. Returns None if the values must be read from Item objects or ID tuples.
+        if self.request_type != self.ITEM or self._must_sort_clientside:
+            return None
+        if not self.only_fields or all(f.field.is_attribute for f in self.only_fields):
+            # No fields, or _query() returns (id, changekey) tuples
+            return None
+        if any(isinstance(f.field, AttachmentField) for f in self.only_fields):
+            # Attachments must point to their parent item
+            return None
+        account = self.folder_collection.account
+        only_fields = self.only_fields
+        # The only attribute fields on items are 'id' and 'changekey', which are attributes on the ItemId element
+        attribute_names = [f.field.name if f.field.is_attribute else None for f in only_fields]
+
+        def get_values(elem):
+            item_id, changekey = Item.id_from_xml(elem)
+            ids = dict(id=item_id, changekey=changekey)
+            indexed_elem = IndexedElement(elem)
+            return [
+                ids[name] if name else f.get_value_from_xml(elem=indexed_elem, account=account)
+                for f, name in zip(only_fields, attribute_names)
+            ]
+        return get_values
+
+    def _get_lazy_parser(self):
+        # Returns a function that creates lazy items from the item elements returned by the server. Returns None if
+        # lazy items were not requested, or if _query() returns (id, changekey) tuples.
+        from .folders import Folder
+        if not self.lazy or self.request_type != self.ITEM:
+            return None
+        if self.only_fields is not None and all(f.field.is_attribute for f in self.only_fields):
+            return None
+        account = self.folder_collection.account
+        return lambda elem: Folder.item_model_from_tag(elem.tag).lazy_from_xml(elem=elem, account=account)
+
+    def _as_flat_values_list(self):
         if not self.only_fields or len(self.only_fields) != 1:
             raise ValueError('flat=True requires exactly one field name')
         flat_field_path = self.only_fields[0]
-        return self._item_yielder(
-            iterable=iterable,
+        return self._item_transformer(
             item_func=flat_field_path.get_value,
             id_only_func=lambda item_id, changekey: item_id,
             changekey_only_func=lambda item_id, changekey: changekey,
@@ -536,7 +630,59 @@ class QuerySet(SearchableMixIn):
         if self.is_cached:
             return self._cache
         # Return an iterator that doesn't bother with caching
-        return self._format_items(items=self._query(), return_format=self.return_format)
+        return self._format_query()
+
+    def to_columns(self, *args):
+        """ Return the values of the specified field names as a dict of lists, with one list per field name. The
+        values are read directly from the responses, without creating an object per item. Raises the first error
+        returned by the server, if any """
+        return OrderedDict((f.path, column) for f, column in self._get_columns(args, method_name='to_columns'))
+
+    def to_arrays(self, *args):
+        """ Like to_columns(), but return NumPy arrays. Integer fields are returned as int64 arrays, or float64 arrays
+        with NaN for missing values. Boolean fields are returned as bool arrays, or object arrays if values are
+        missing. Datetime fields are returned as datetime64[us] arrays in UTC, with NaT for missing values. All other
+        fields are returned as object arrays. Requires NumPy """
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError('to_arrays() requires NumPy. Install it with "pip install exchangelib[numpy]"')
+        return OrderedDict(
+            (f.path, _column_to_array(numpy, f, column))
+            for f, column in self._get_columns(args, method_name='to_arrays')
+        )
+
+    def to_dataframe(self, *args):
+        """ Like to_arrays(), but return a pandas DataFrame with one column per field name. Requires pandas """
+        try:
+            import pandas
+        except ImportError:
+            raise ImportError('to_dataframe() requires pandas. Install it with "pip install exchangelib[pandas]"')
+        arrays = self.to_arrays(*args)
+        return pandas.DataFrame(arrays, columns=list(arrays.keys()))
+
+    def _get_columns(self, args, method_name):
+        # Returns (field_path, values) tuples for the field names in 'args'. Each item adds a value to each list of
+        # values. Values are read directly from the item elements when possible.
+        if not args:
+            raise ValueError('%s() requires at least one field name' % method_name)
+        try:
+            qs = self.values_list(*args)
+        except ValueError as e:
+            raise ValueError(e.args[0].replace('values_list()', '%s()' % method_name))
+        get_values = None if qs.q is None else qs._get_values_reader()
+        if get_values is None:
+            rows = qs.iterator()
+        else:
+            rows = qs._query(parse_func=get_values)
+        columns = [[] for _ in qs.only_fields]
+        appenders = [c.append for c in columns]
+        for row in rows:
+            if isinstance(row, Exception):
+                raise row
+            for append, value in zip(appenders, row):
+                append(value)
+        return zip(qs.only_fields, columns)
 
     def get(self, *args, **kwargs):
         """ Assume the query will return exactly one item. Return that item """
@@ -560,10 +706,19 @@ class QuerySet(SearchableMixIn):
         return items[0]
 
     def count(self, page_size=1000):
-        """ Get the query count, with as little effort as possible 'page_size' is the number of items to
-        fetch from the server per request. We're only fetching the IDs, so keep it high"""
+        """ Get the query count, with as little effort as possible. The server tells us the total number of items, so
+        this normally only costs one request. 'page_size' is the number of items to fetch from the server per request
+        when we need to count the items ourselves. We're only fetching the IDs, so keep it high"""
         if self.is_cached:
             return len(self._cache)
+        if self.q is None:
+            return 0
+        if self.request_type == self.ITEM and not self.calendar_view:
+            # The item count of calendar views is not reliable, because recurring items are expanded into occurrences
+            count = self.folder_collection.count_items(self.q, offset=self.offset)
+            if self.max_items is not None:
+                count = min(count, self.max_items)
+            return count
         new_qs = self._copy_self()
         new_qs.only_fields = tuple()
         new_qs.order_fields = None
@@ -658,6 +813,32 @@ class QuerySet(SearchableMixIn):
         return self.__class__.__name__ + '(%s)' % ', '.join('%s=%s' % (k, v) for k, v in fmt_args)
 
 
+def _column_to_array(numpy, field_path, values):
+    # Converts a list of values of 'field_path' to a NumPy array. See QuerySet.to_arrays()
+    field = field_path.field
+    if not field_path.label and not field.is_list:
+        if isinstance(field, IntegerField) and (isinstance(field, EnumAsIntField) or not isinstance(field, (
+                DecimalField, EnumField))):
+            if None in values:
+                return numpy.array([numpy.nan if v is None else v for v in values], dtype='float64')
+            return numpy.array(values, dtype='int64')
+        if isinstance(field, BooleanField) and None not in values:
+            return numpy.array(values, dtype='bool')
+        if isinstance(field, DateTimeField):
+            return numpy.array(
+                [None if v is None else v.astimezone(UTC).replace(tzinfo=None) for v in values],
+                dtype='datetime64[us]',
+            )
+    array = numpy.empty(len(values), dtype='object')
+    if field.is_list and not field_path.label:
+        # Don't let NumPy create a multi-dimensional array from list values
+        for i, v in enumerate(values):
+            array[i] = v
+    else:
+        array[:] = values
+    return array
+
+
 def _get_value_or_default(item, field_order):
     # Python can only sort values when <, > and = are implemented for the two types. Try as best we can to sort
     # items, even when the item may have a None value for the field in question, or when the item is an
@@ -11,7 +11,7 @@ Exchange EWS references:
     - 2013: http://msdn.microsoft.com/en-us/library/bb409286(v=exchg.150).aspx
 """
 
-from .common import CHUNK_SIZE
+from .common import CHUNK_SIZE, MAX_IN_FLIGHT
 from .copy_item import CopyItem
 from .create_attachment import CreateAttachment
 from .create_folder import CreateFolder
@@ -46,6 +46,7 @@ from .upload_items import UploadItems
 
 __all__ = [
     'CHUNK_SIZE',
+    'MAX_IN_FLIGHT',
     'CopyItem',
     'CreateAttachment',
     'CreateFolder',
@@ -2,10 +2,16 @@
 from __future__ import unicode_literals
 
 import abc
-from itertools import chain
+from collections import deque
+from copy import deepcopy
+from itertools import chain, islice
 import logging
+from threading import Event, Lock
 import traceback
 
+from future.moves.queue import Queue
+from six import text_type
+
 from .. import errors
 from ..errors import EWSWarning, TransportError, SOAPError, ErrorTimeoutExpired, ErrorBatchProcessingStopped, \
     ErrorQuotaExceeded, ErrorCannotDeleteObject, ErrorCreateItemAccessDenied, ErrorFolderNotFound, \
@@ -19,12 +25,43 @@ from ..errors import EWSWarning, TransportError, SOAPError, ErrorTimeoutExpired,
     ErrorNoPublicFolderReplicaAvailable, MalformedResponseError, ErrorExceededConnectionCount, \
     SessionPoolMinSizeReached, ErrorIncorrectSchemaVersion, ErrorInvalidRequest
 from ..transport import wrap, extra_headers
-from ..util import chunkify, create_element, add_xml_child, get_xml_attr, to_xml, post_ratelimited, \
-    xml_to_str, set_xml_value, SOAPNS, TNS, MNS, ENS, ParseError
+from ..util import create_element, add_xml_child, get_xml_attr, to_xml, post_ratelimited, xml_to_str, \
+    set_xml_value, iter_xml_events, SOAPNS, TNS, MNS, ENS, ParseError
 
 log = logging.getLogger(__name__)
 
 CHUNK_SIZE = 100  # A default chunk size for all services
+# The default max number of outstanding chunks in pooled services. 'None' means twice the size of the session pool
+MAX_IN_FLIGHT = None
+
+# Exceptions raised from _get_elements() that are known and understood, and don't require a backtrace
+KNOWN_EXCEPTIONS = (
+    ErrorAccessDenied,
+    ErrorADUnavailable,
+    ErrorBatchProcessingStopped,
+    ErrorCannotDeleteObject,
+    ErrorConnectionFailed,
+    ErrorCreateItemAccessDenied,
+    ErrorExceededConnectionCount,
+    ErrorFolderNotFound,
+    ErrorImpersonateUserDenied,
+    ErrorImpersonationFailed,
+    ErrorInternalServerError,
+    ErrorInternalServerTransientError,
+    ErrorInvalidChangeKey,
+    ErrorInvalidLicense,
+    ErrorItemNotFound,
+    ErrorMailboxMoveInProgress,
+    ErrorMailboxStoreUnavailable,
+    ErrorMessageSizeExceeded,
+    ErrorNonExistentMailbox,
+    ErrorNoPublicFolderReplicaAvailable,
+    ErrorNoRespondingCASInDestinationSite,
+    ErrorQuotaExceeded,
+    ErrorTimeoutExpired,
+    RateLimitError,
+    UnauthorizedError,
+)
 
 
 class EWSService(object):
@@ -44,13 +81,31 @@ class EWSService(object):
     WARNINGS_TO_IGNORE_IN_RESPONSE = ()
     # Controls whether the HTTP request should be streaming or fetch everything at once
     streaming = False
+    # Controls whether the response is parsed incrementally. If True, the elements in the element container are handed
+    # out as soon as they have been parsed, instead of after parsing the complete response.
+    incremental_parse = False
+    # Errors that indicate that the request was too large. Services that can split requests into smaller requests will
+    # get these errors raised instead of having them converted to ErrorServerBusy. The split requests are sent again,
+    # so only set this on services where sending a request twice has no side effects.
+    CHUNK_TOO_LARGE_ERRORS = ()
 
-    def __init__(self, protocol, chunk_size=None):
+    def __init__(self, protocol, chunk_size=None, max_in_flight=None, ordered=True):
         self.chunk_size = chunk_size or CHUNK_SIZE  # The number of items to send in a single request
         if not isinstance(self.chunk_size, int):
             raise ValueError("'chunk_size' %r must be an integer" % chunk_size)
         if self.chunk_size < 1:
             raise ValueError("'chunk_size' must be a positive number")
+        self.max_in_flight = max_in_flight or MAX_IN_FLIGHT  # The max number of outstanding chunks
+        if self.max_in_flight is not None:
+            if not isinstance(self.max_in_flight, int):
+                raise ValueError("'max_in_flight' %r must be an integer" % max_in_flight)
+            if self.max_in_flight < 1:
+                raise ValueError("'max_in_flight' must be a positive number")
+        if ordered not in (True, False):
+            raise ValueError("'ordered' %s must be True or False" % ordered)
+        # If False, pooled services return (index, result) tuples as soon as a chunk completes, instead of returning
+        # results in the same order as the input.
+        self.ordered = ordered
         self.protocol = protocol
 
     # The following two methods are the minimum required to be implemented by subclasses, but the name and number of
@@ -64,42 +119,17 @@ class EWSService(object):
     # def get_payload(self, **kwargs):
     #     raise NotImplementedError()
 
-    def _get_elements(self, payload):
+    def _get_elements(self, payload, response_times=None):
         while True:
             try:
                 # Send the request, get the response and do basic sanity checking on the SOAP XML
-                response = self._get_response_xml(payload=payload)
+                response = self._get_response_xml(payload=payload, response_times=response_times)
                 # Read the XML and throw any general EWS error messages. Return a generator over the result elements
                 return self._get_elements_in_response(response=response)
             except ErrorServerBusy as e:
                 self._handle_backoff(e)
                 continue
-            except (
-                    ErrorAccessDenied,
-                    ErrorADUnavailable,
-                    ErrorBatchProcessingStopped,
-                    ErrorCannotDeleteObject,
-                    ErrorConnectionFailed,
-                    ErrorCreateItemAccessDenied,
-                    ErrorExceededConnectionCount,
-                    ErrorFolderNotFound,
-                    ErrorImpersonateUserDenied,
-                    ErrorImpersonationFailed,
-                    ErrorInternalServerError,
-                    ErrorInternalServerTransientError,
-                    ErrorInvalidChangeKey,
-                    ErrorInvalidLicense,
-                    ErrorItemNotFound,
-                    ErrorMailboxMoveInProgress,
-                    ErrorMailboxStoreUnavailable,
-                    ErrorNonExistentMailbox,
-                    ErrorNoPublicFolderReplicaAvailable,
-                    ErrorNoRespondingCASInDestinationSite,
-                    ErrorQuotaExceeded,
-                    ErrorTimeoutExpired,
-                    RateLimitError,
-                    UnauthorizedError,
-            ):
+            except KNOWN_EXCEPTIONS:
                 # These are known and understood, and don't require a backtrace.
                 raise
             except Exception:
@@ -109,20 +139,14 @@ class EWSService(object):
                             account, traceback.format_exc(20))
                 raise
 
-    def _get_response_xml(self, payload, **parse_opts):
-        # Takes an XML tree and returns SOAP payload as an XML tree
+    def _get_response_xml(self, payload, response_times=None, **parse_opts):
+        # Takes an XML tree and returns SOAP payload as an XML tree. If 'response_times' is a list, the duration of the
+        # HTTP round trip of the successful request is appended to it.
         # Microsoft really doesn't want to make our lives easy. The server may report one version in our initial version
         # guessing tango, but then the server may decide that any arbitrary legacy backend server may actually process
         # the request for an account. Prepare to handle ErrorInvalidSchemaVersionForMailboxVersion errors and set the
         # server version per-account.
-        from ..version import API_VERSIONS
-        if isinstance(self, EWSAccountService):
-            account = self.account
-            hint = self.account.version
-        else:
-            account = None
-            hint = self.protocol.version
-        api_versions = [hint.api_version] + [v for v in API_VERSIONS if v != hint.api_version]
+        account, hint, api_versions = self._get_api_versions()
         for api_version in api_versions:
             log.debug('Trying API version %s for account %s', api_version, account)
             r, session = post_ratelimited(
@@ -141,58 +165,100 @@ class EWSService(object):
                 # If we're streaming, we want to wait to release the session until we have consumed the stream.
                 self.protocol.release_session(session)
             try:
-                res = self._get_soap_payload(response=r, **parse_opts)
-            except ParseError as e:
-                raise SOAPError('Bad SOAP response: %s' % e)
-            except (ErrorInvalidServerVersion, ErrorIncorrectSchemaVersion, ErrorInvalidRequest):
-                # The guessed server version is wrong. Try the next version
-                log.debug('API version %s was invalid', api_version)
-                continue
-            except ErrorInvalidSchemaVersionForMailboxVersion:
-                if not account:
-                    # This should never happen for non-account services
-                    raise ValueError("'account' should not be None")
-                # The guessed server version is wrong for this account. Try the next version
-                log.debug('API version %s was invalid for account %s', api_version, account)
-                continue
-            except ErrorExceededConnectionCount as e:
-                # ErrorExceededConnectionCount indicates that the connecting user has too many open TCP connections to
-                # the server. Decrease our session pool size.
-                try:
-                    self.protocol.decrease_poolsize()
-                    continue
-                except SessionPoolMinSizeReached:
-                    # We're already as low as we can go. Let the user handle this.
-                    raise e
-            except (ErrorTooManyObjectsOpened, ErrorTimeoutExpired) as e:
-                # ErrorTooManyObjectsOpened means there are too many connections to the Exchange database. This is very
-                # often a symptom of sending too many requests.
-                #
-                # ErrorTimeoutExpired can be caused by a busy server, or by overly large requests. Start by lowering the
-                # session count. This is done by downstream code.
-                if isinstance(e, ErrorTimeoutExpired) and self.protocol.session_pool_size <= 1:
-                    # We're already as low as we can go, so downstream cannot limit the session count to put less load
-                    # on the server. We don't have a way of lowering the page size of requests from
-                    # this part of the code yet. Let the user handle this.
-                    raise e
-
-                # Re-raise as an ErrorServerBusy with a default delay of 5 minutes
-                raise ErrorServerBusy(msg='Reraised from %s(%s)' % (e.__class__.__name__, e), back_off=300)
-            except ResponseMessageError as rme:
-                # We got an error message from Exchange, but we still want to get any new version info from the response
-                try:
-                    self._update_api_version(hint=hint, api_version=api_version, response=r)
-                except TransportError as te:
-                    log.debug('Failed to update version info (%s)', te)
-                raise rme
-            else:
-                self._update_api_version(hint=hint, api_version=api_version, response=r)
+                res = self._handle_response(response=r, account=account, hint=hint, api_version=api_version,
+                                            **parse_opts)
             finally:
                 if self.streaming:
                     # TODO: We shouldn't release the session yet if we still haven't fully consumed the stream. It seems
                     # a Session can handle multiple unfinished streaming requests, though.
                     self.protocol.release_session(session)
+            if res is None:
+                # The guessed server version is wrong. Try the next version
+                continue
+            if response_times is not None:
+                response_times.append(r.response_time)
             return res
+        self._raise_invalid_version(account=account, api_versions=api_versions)
+
+    def _get_api_versions(self):
+        # Returns the account (if any), the version hint and the list of API versions to try, in prioritized order
+        from ..version import API_VERSIONS
+        if isinstance(self, EWSAccountService):
+            account = self.account
+            hint = self.account.version
+        else:
+            account = None
+            hint = self.protocol.version
+        api_versions = [hint.api_version] + [v for v in API_VERSIONS if v != hint.api_version]
+        if account and hint is self.protocol.version:
+            # The account has not found its own version yet. Start with the version that last worked on this endpoint,
+            # before trying the protocol version.
+            api_versions = self.protocol.version_tracker.prioritize(api_versions)
+        return account, hint, api_versions
+
+    def _handle_response(self, response, account, hint, api_version, **parse_opts):
+        # Parses the HTTP response and returns the SOAP payload. Returns None if the server rejected the API version
+        # and the caller should try the next version.
+        try:
+            res = self._get_soap_payload(response=response, **parse_opts)
+        except ParseError as e:
+            raise SOAPError('Bad SOAP response: %s' % e)
+        except (ErrorInvalidServerVersion, ErrorIncorrectSchemaVersion, ErrorInvalidRequest) as e:
+            # The guessed server version is wrong. Try the next version
+            log.debug('API version %s was invalid', api_version)
+            self.protocol.version_tracker.version_failed(api_version)
+            if isinstance(e, ErrorInvalidServerVersion):
+                # Don't trust any cached version info for this endpoint
+                self.protocol.invalidate_persistent_cache()
+            return None
+        except ErrorInvalidSchemaVersionForMailboxVersion:
+            if not account:
+                # This should never happen for non-account services
+                raise ValueError("'account' should not be None")
+            # The guessed server version is wrong for this account. Try the next version
+            log.debug('API version %s was invalid for account %s', api_version, account)
+            self.protocol.version_tracker.version_failed(api_version)
+            return None
+        except ErrorExceededConnectionCount as e:
+            # ErrorExceededConnectionCount indicates that the connecting user has too many open TCP connections to
+            # the server. Decrease our session pool size.
+            try:
+                self.protocol.decrease_poolsize()
+                return None
+            except SessionPoolMinSizeReached:
+                # We're already as low as we can go. Let the user handle this.
+                raise e
+        except self.CHUNK_TOO_LARGE_ERRORS:
+            # The request may succeed if it is split into smaller requests. This is handled by downstream code.
+            raise
+        except (ErrorTooManyObjectsOpened, ErrorTimeoutExpired) as e:
+            # ErrorTooManyObjectsOpened means there are too many connections to the Exchange database. This is very
+            # often a symptom of sending too many requests.
+            #
+            # ErrorTimeoutExpired can be caused by a busy server, or by overly large requests. Start by lowering the
+            # session count. This is done by downstream code.
+            if isinstance(e, ErrorTimeoutExpired) and self.protocol.session_pool_size <= 1:
+                # We're already as low as we can go, so downstream cannot limit the session count to put less load
+                # on the server. We don't have a way of lowering the page size of requests from
+                # this part of the code yet. Let the user handle this.
+                raise e
+
+            # Re-raise as an ErrorServerBusy with a default delay of 5 minutes
+            raise ErrorServerBusy('Reraised from %s(%s)' % (e.__class__.__name__, e), back_off=300)
+        except ResponseMessageError as rme:
+            # We got an error message from Exchange, but we still want to get any new version info from the response
+            try:
+                self._update_api_version(hint=hint, api_version=api_version, response=response)
+            except TransportError as te:
+                log.debug('Failed to update version info (%s)', te)
+            raise rme
+        self._update_api_version(hint=hint, api_version=api_version, response=response)
+        self.protocol.version_tracker.version_succeeded(api_version)
+        self.protocol.register_success()
+        return res
+
+    @staticmethod
+    def _raise_invalid_version(account, api_versions):
         if account:
             raise ErrorInvalidSchemaVersionForMailboxVersion('Tried versions %s but all were invalid for account %s' %
                                                              (api_versions, account))
@@ -223,10 +289,26 @@ class EWSService(object):
             log.debug('Adding missing build number %s', api_version)
         new_version = Version.from_response(requested_api_version=api_version, bytes_content=response.content)
         if isinstance(self, EWSAccountService):
-            self.account.version = new_version
+            self.account.version = self._get_reported_version(new_version)
         else:
             self.protocol.version = new_version
 
+    @staticmethod
+    def _get_reported_version(version):
+        # The request may have succeeded with an older API version than the server supports, e.g. the version that
+        # last worked for another account on the same endpoint. Never settle for an older API version than the build
+        # number in the response supports.
+        from ..version import API_VERSIONS, Version
+        try:
+            reported_api_version = version.build.api_version()
+        except ValueError:
+            return version
+        if version.api_version not in API_VERSIONS \
+                or API_VERSIONS.index(reported_api_version) >= API_VERSIONS.index(version.api_version):
+            return version
+        log.debug('Raising API version from %s to %s', version.api_version, reported_api_version)
+        return Version(build=version.build, api_version=reported_api_version)
+
     @classmethod
     def _response_tag(cls):
         return '{%s}%sResponse' % (MNS, cls.SERVICE_NAME)
@@ -241,6 +323,8 @@ class EWSService(object):
 
     @classmethod
     def _get_soap_payload(cls, response, **parse_opts):
+        if cls.incremental_parse:
+            return cls._get_incremental_soap_payload(response=response)
         root = to_xml(response.iter_content())
         body = root.find('{%s}Body' % SOAPNS)
         if body is None:
@@ -258,6 +342,42 @@ class EWSService(object):
             return [response]
         return response_messages.findall(cls._response_message_tag())
 
+    @classmethod
+    def _get_incremental_soap_payload(cls, response):
+        # Like _get_soap_payload(), but only parses the response up to the first response message. SOAP faults are
+        # raised here, but errors in response messages are raised when the messages are consumed.
+        #
+        # This is not streaming. The HTTP response has already been downloaded completely, because the session is
+        # released right after the request. Only the parsing is incremental. Reading 'content' avoids iterating the
+        # downloaded bytes of a requests.Response one byte at a time. Responses without it only have iter_content().
+        try:
+            content = response.content
+        except AttributeError:
+            content = response.iter_content()
+        events = iter_xml_events(content)
+        body_tag, fault_tag, response_tag = '{%s}Body' % SOAPNS, '{%s}Fault' % SOAPNS, cls._response_tag()
+        for event, elem in events:
+            if event == 'start' and elem.tag == response_tag:
+                break
+            if event == 'end':
+                if elem.tag == fault_tag:
+                    cls._raise_soap_errors(fault=elem)  # Will throw SOAPError or custom EWS error
+                if elem.tag == body_tag:
+                    raise SOAPError('Unknown SOAP response: %s' % xml_to_str(elem))
+        else:
+            raise MalformedResponseError('No Body element in SOAP response')
+        response_messages_tag = cls._response_messages_tag()
+        for event, elem in events:
+            if event == 'start' and elem.tag == response_messages_tag:
+                return IncrementalResponse(
+                    events=events, message_tag=cls._response_message_tag(), container_tag=cls.element_container_name
+                )
+            if event == 'end' and elem.tag == response_tag:
+                # Result isn't delivered in a list of FooResponseMessages, but directly in the FooResponse. Consumers
+                # expect a list, so return a list
+                return [elem]
+        raise MalformedResponseError('Incomplete SOAP response')
+
     @classmethod
     def _raise_soap_errors(cls, fault):
         # Fault: See http://www.w3.org/TR/2000/NOTE-SOAP-20000508/#_Toc478383507
@@ -372,14 +492,88 @@ class EWSService(object):
             if isinstance(container_or_exc, (bool, Exception)):
                 yield container_or_exc
             else:
-                for c in self._get_elements_in_container(container=container_or_exc):
+                for c in self._get_elements_in_response_container(response=response, container=container_or_exc):
                     yield c
 
+    def _get_elements_in_response_container(self, response, container):
+        # Returns the elements in a container of 'response'. Elements of incrementally parsed responses are returned as
+        # soon as they have been parsed.
+        if isinstance(response, IncrementalResponse):
+            return response.iter_container(container)
+        return self._get_elements_in_container(container=container)
+
     @staticmethod
     def _get_elements_in_container(container):
         return [elem for elem in container]
 
 
+class IncrementalResponse(object):
+    """An iterable of the response messages in an incrementally parsed SOAP response. A message is handed out as soon as
+    everything before its element container has been parsed. The elements in the container are parsed while they are
+    consumed with iter_container(), and are removed from the tree when the next element is handed out. Messages are
+    removed from the tree when they have been parsed completely.
+
+    The messages and elements must be consumed in the order of the response. Elements in containers of earlier messages
+    are kept in the tree until they are consumed.
+    """
+    def __init__(self, events, message_tag, container_tag):
+        self._events = events
+        self._message_tag = message_tag
+        self._container_tag = container_tag
+        self._container = None  # The container whose elements are currently being parsed
+        self._container_done = False
+
+    def _get_events(self):
+        try:
+            for event in self._events:
+                yield event
+        except ParseError as e:
+            raise SOAPError('Bad SOAP response: %s' % e)
+
+    def __iter__(self):
+        message = None
+        for event, elem in self._get_events():
+            if event == 'start':
+                if elem.tag == self._message_tag:
+                    message = elem
+                elif message is not None and self._container is None and elem.tag == self._container_tag:
+                    # The response code and paging attributes are in the tree now
+                    self._container, self._container_done = elem, False
+                    yield message
+                    # The consumer may not have consumed all elements in the container. Parse the rest of it.
+                    if not self._container_done:
+                        self._skip_container()
+            elif event == 'end' and elem.tag == self._message_tag:
+                if self._container is None:
+                    yield message
+                self._container, message = None, None
+                elem.getparent().remove(elem)
+
+    def _skip_container(self):
+        for event, elem in self._get_events():
+            if event == 'end' and elem is self._container:
+                break
+        self._container_done = True
+
+    def iter_container(self, container):
+        if container is not self._container or self._container_done:
+            # The container has already been parsed
+            for elem in list(container):
+                yield elem
+            return
+        for event, elem in self._get_events():
+            if event != 'end':
+                continue
+            if elem is container:
+                break
+            if elem.getparent() is container:
+                yield elem
+                parent = elem.getparent()
+                if parent is not None:
+                    parent.remove(elem)
+        self._container_done = True
+
+
 class EWSAccountService(EWSService):
 
     def __init__(self, *args, **kwargs):
@@ -398,76 +592,226 @@ class EWSFolderService(EWSAccountService):
 
 
 class PagingEWSMixIn(EWSService):
-    def _paged_call(self, payload_func, max_items, **kwargs):
+    # Tags of the elements holding the paging offset of the request
+    PAGING_VIEW_TAGS = ('{%s}IndexedPageItemView' % MNS, '{%s}IndexedPageFolderView' % MNS)
+
+    def _paged_payload_func(self, payload_func, **kwargs):
+        """Returns a function that returns the payload for a given offset. Only the offset changes between pages, so
+        the payload is built once and each page gets a copy with the 'Offset' attribute replaced. Copies are needed
+        because a payload is moved into the SOAP envelope when it is sent, possibly from another thread.
+        """
+        template = payload_func(**kwargs)
+        template_offset = kwargs['offset']
+        view_tag = None
+        for tag in self.PAGING_VIEW_TAGS:
+            if template.find(tag) is not None:
+                view_tag = tag
+                break
+
+        def get_payload(offset):
+            if offset == template_offset:
+                return deepcopy(template)
+            if view_tag is None:
+                # There's no paging element to patch. Let the service build the payload, or complain about it.
+                return payload_func(**dict(kwargs, offset=offset))
+            payload = deepcopy(template)
+            payload.find(view_tag).set('Offset', text_type(offset))
+            return payload
+        return get_payload
+
+    def _paged_call(self, payload_func, max_items, prefetch_pages=0, parallel=False, **kwargs):
+        log_prefix = self._get_paging_log_prefix()
+        paging_infos = self._get_paging_infos()
+        start_offset = common_next_offset = kwargs['offset']
+        get_payload = self._paged_payload_func(payload_func, **kwargs)
+        total_item_count = 0
+        # Pages requested ahead of time, as an offset -> (skip event, AsyncResult) mapping
+        prefetched = {}
+        try:
+            while True:
+                log.debug('%s: Getting items at offset %s (max_items %s)', log_prefix, common_next_offset, max_items)
+                skip, res = prefetched.pop(common_next_offset, (None, None))
+                try:
+                    if res is None:
+                        response = self._get_response_xml(payload=get_payload(common_next_offset))
+                    else:
+                        response = res.get()
+                except ErrorServerBusy as e:
+                    self._handle_backoff(e)
+                    continue
+                items_in_view = [p['items_in_view'] for p in paging_infos]
+                elems, page_info = self._get_elems_in_pages(
+                    response=response, paging_infos=paging_infos, total_item_count=total_item_count,
+                    max_items=max_items
+                )
+                if (prefetch_pages or parallel) and self._view_has_changed(paging_infos, items_in_view):
+                    log.warning('%s: Item count changed while paging. Continuing without read-ahead', log_prefix)
+                    prefetch_pages, parallel = 0, False
+                # The elements of this page may not have been parsed yet, so we don't know if this page reaches
+                # 'max_items'. The prefetch offsets are limited by 'max_items' anyway.
+                next_offset = self._get_common_next_offset(
+                    paging_infos=paging_infos, total_item_count=total_item_count, max_items=max_items
+                )
+                # Request the next pages before handing out the elements of this page, so the server can work while
+                # the caller is busy consuming them.
+                prefetch_offsets = self._get_prefetch_offsets(
+                    next_offset=next_offset, prefetch_pages=prefetch_pages, parallel=parallel,
+                    paging_infos=paging_infos, start_offset=start_offset, max_items=max_items
+                )
+                self._discard_stale_pages(prefetched=prefetched, keep_offsets=prefetch_offsets)
+                for offset in prefetch_offsets:
+                    if offset in prefetched:
+                        continue
+                    log.debug('%s: Prefetching items at offset %s', log_prefix, offset)
+                    skip = Event()
+                    prefetched[offset] = skip, self.protocol.thread_pool.apply_async(
+                        self._get_prefetched_response_xml, (), dict(payload=get_payload(offset), skip=skip)
+                    )
+                for elem in elems:
+                    yield elem
+                total_item_count = page_info['total_item_count']
+                common_next_offset = self._get_common_next_offset(
+                    paging_infos=paging_infos, total_item_count=total_item_count, max_items=max_items
+                )
+                if common_next_offset is None:
+                    break
+        finally:
+            # The caller may stop iterating early, e.g. when the generator is closed. AsyncResults can't be cancelled,
+            # so tell the prefetch tasks that haven't started yet to not send their request.
+            self._discard_stale_pages(prefetched=prefetched, keep_offsets=())
+
+    def _get_prefetched_response_xml(self, payload, skip):
+        # Runs in the thread pool. The page may have become unnecessary while the task was waiting for a free thread
+        if skip.is_set():
+            return None
+        return self._get_response_xml(payload=payload)
+
+    def _get_paging_log_prefix(self):
         if isinstance(self, EWSAccountService):
-            log_prefix = 'EWS %s, account %s, service %s' % (
-                self.protocol.service_endpoint, self.account, self.SERVICE_NAME)
-        else:
-            log_prefix = 'EWS %s, service %s' % (self.protocol.service_endpoint, self.SERVICE_NAME)
+            return 'EWS %s, account %s, service %s' % (self.protocol.service_endpoint, self.account, self.SERVICE_NAME)
+        return 'EWS %s, service %s' % (self.protocol.service_endpoint, self.SERVICE_NAME)
+
+    def _get_expected_message_count(self):
         if isinstance(self, EWSFolderService):
-            expected_message_count = len(self.folders)
-        else:
-            expected_message_count = 1
-        paging_infos = [dict(item_count=0, next_offset=None) for _ in range(expected_message_count)]
-        common_next_offset = kwargs['offset']
-        total_item_count = 0
-        while True:
-            log.debug('%s: Getting items at offset %s (max_items %s)', log_prefix, common_next_offset, max_items)
-            kwargs['offset'] = common_next_offset
-            payload = payload_func(**kwargs)
-            try:
-                response = self._get_response_xml(payload=payload)
-            except ErrorServerBusy as e:
-                self._handle_backoff(e)
+            return len(self.folders)
+        return 1
+
+    def _get_paging_infos(self):
+        # Keeps track of the paging progress for each of the response messages we expect from the server
+        return [
+            dict(item_count=0, next_offset=None, items_in_view=None) for _ in range(self._get_expected_message_count())
+        ]
+
+    def _get_elems_in_pages(self, response, paging_infos, total_item_count, max_items):
+        # Reads the paging progress of a page of results into 'paging_infos'. Returns a generator of the elements in the
+        # page, and a dict with the total item count. The elements of incrementally parsed responses may not have been
+        # parsed yet, so the item counts are updated while the elements are consumed.
+        #
+        # Only read as many response messages as we expect. Looking for more messages would parse all elements of the
+        # messages before we can hand out the first element.
+        messages = iter(response)
+        # Collect a tuple of (rootfolder, next_offset, items_in_view) tuples
+        parsed_pages = [
+            self._get_page(message) + (self._get_total_item_count(message),)
+            for message in islice(messages, len(paging_infos))
+        ]
+        if len(parsed_pages) != len(paging_infos):
+            raise MalformedResponseError(
+                "Expected %s items in 'response', got %s" % (len(paging_infos), len(parsed_pages))
+            )
+        for (_, next_offset, items_in_view), paging_info in zip(parsed_pages, paging_infos):
+            paging_info['next_offset'] = next_offset
+            paging_info['items_in_view'] = items_in_view
+        page_info = dict(total_item_count=total_item_count)
+        elems = self._iter_elems_in_pages(
+            response=response, messages=messages, rootfolders=[p[0] for p in parsed_pages], paging_infos=paging_infos,
+            page_info=page_info, max_items=max_items
+        )
+        return elems, page_info
+
+    def _iter_elems_in_pages(self, response, messages, rootfolders, paging_infos, page_info, max_items):
+        for rootfolder, paging_info in zip(rootfolders, paging_infos):
+            if rootfolder is not None:
+                container = rootfolder.find(self.element_container_name)
+                if container is None:
+                    raise MalformedResponseError('No %s elements in ResponseMessage (%s)' % (
+                        self.element_container_name, xml_to_str(rootfolder)))
+                for elem in self._get_elements_in_response_container(response=response, container=container):
+                    paging_info['item_count'] += 1
+                    yield elem
+                page_info['total_item_count'] += paging_info['item_count']
+                if max_items and page_info['total_item_count'] >= max_items:
+                    # No need to continue. Break out of inner loop
+                    log.debug("'max_items' count reached (inner)")
+                    break
+            if not paging_info['next_offset']:
+                # Paging is done for this message
                 continue
-            # Collect a tuple of (rootfolder, next_offset) tuples
-            parsed_pages = [self._get_page(message) for message in response]
-            if len(parsed_pages) != expected_message_count:
-                raise MalformedResponseError(
-                    "Expected %s items in 'response', got %s" % (expected_message_count, len(parsed_pages))
-                )
-            for (rootfolder, next_offset), paging_info in zip(parsed_pages, paging_infos):
-                paging_info['next_offset'] = next_offset
-                if rootfolder is not None:
-                    container = rootfolder.find(self.element_container_name)
-                    if container is None:
-                        raise MalformedResponseError('No %s elements in ResponseMessage (%s)' % (
-                            self.element_container_name, xml_to_str(rootfolder)))
-                    for elem in self._get_elements_in_container(container=container):
-                        paging_info['item_count'] += 1
-                        yield elem
-                    total_item_count += paging_info['item_count']
-                    if max_items and total_item_count >= max_items:
-                        # No need to continue. Break out of inner loop
-                        log.debug("'max_items' count reached (inner)")
-                        break
-                if not paging_info['next_offset']:
-                    # Paging is done for this message
-                    continue
-                # Check sanity of paging offsets, but don't fail. When we are iterating huge collections that take a
-                # long time to complete, the collection may change while we are iterating. This can affect the
-                # 'next_offset' value and make it inconsistent with the number of already collected items.
-                if paging_info['next_offset'] != paging_info['item_count']:
-                    log.warning('Unexpected next offset: %s -> %s. Maybe the server-side collection has changed?'
-                                % (paging_info['item_count'], paging_info['next_offset']))
-            # Also break out of outer loop
-            if max_items and total_item_count >= max_items:
-                log.debug("'max_items' count reached (outer)")
-                break
-            next_offsets = {p['next_offset'] for p in paging_infos if p['next_offset'] is not None}
-            if not next_offsets:
-                # Paging is done for all messages
-                break
-            # We cannot guarantee that all messages that have a next_offset also have the *same* next_offset. This is
-            # because the collections that we are iterating may change while iterating. We'll do our best but we cannot
-            # guarantee 100% consistency when large collections are simultaneously being changed on the server.
-            #
-            # It's not possible to supply a per-folder offset when iterating multiple folders, so we'll just have to
-            # choose something that is most likely to work. Select the lowest of all the values to at least make sure
-            # we don't miss any items, although we may then get duplicates ¯\_(ツ)_/¯
-            if len(next_offsets) > 1:
-                log.warning('Inconsistent next_offset values: %r. Using lowest value', next_offsets)
-            common_next_offset = min(next_offsets)
+            # Check sanity of paging offsets, but don't fail. When we are iterating huge collections that take a
+            # long time to complete, the collection may change while we are iterating. This can affect the
+            # 'next_offset' value and make it inconsistent with the number of already collected items.
+            if paging_info['next_offset'] != paging_info['item_count']:
+                log.warning('Unexpected next offset: %s -> %s. Maybe the server-side collection has changed?'
+                            % (paging_info['item_count'], paging_info['next_offset']))
+        if next(messages, None) is not None:
+            raise MalformedResponseError(
+                "Expected %s items in 'response', got more" % len(paging_infos)
+            )
+
+    @staticmethod
+    def _get_common_next_offset(paging_infos, total_item_count, max_items):
+        # Returns the offset of the next page to fetch, or None if paging is done
+        # Also break out of outer loop
+        if max_items and total_item_count >= max_items:
+            log.debug("'max_items' count reached (outer)")
+            return None
+        next_offsets = {p['next_offset'] for p in paging_infos if p['next_offset'] is not None}
+        if not next_offsets:
+            # Paging is done for all messages
+            return None
+        # We cannot guarantee that all messages that have a next_offset also have the *same* next_offset. This is
+        # because the collections that we are iterating may change while iterating. We'll do our best but we cannot
+        # guarantee 100% consistency when large collections are simultaneously being changed on the server.
+        #
+        # It's not possible to supply a per-folder offset when iterating multiple folders, so we'll just have to
+        # choose something that is most likely to work. Select the lowest of all the values to at least make sure
+        # we don't miss any items, although we may then get duplicates ¯\_(ツ)_/¯
+        if len(next_offsets) > 1:
+            log.warning('Inconsistent next_offset values: %r. Using lowest value', next_offsets)
+        return min(next_offsets)
+
+    def _get_prefetch_offsets(self, next_offset, prefetch_pages, parallel, paging_infos, start_offset, max_items):
+        # Returns the offsets of the pages that should be in flight, starting with the next page. We can't know the
+        # offsets in advance, but pages are full unless they are the last page, so we assume they are. Don't request
+        # pages beyond the end of the largest collection, or beyond the page containing the 'max_items' item.
+        #
+        # In parallel mode, the remaining pages are fanned out over the session pool, so we allow as many pages in
+        # flight as there are sessions.
+        if parallel:
+            prefetch_pages = max(prefetch_pages, self.protocol.session_pool_size)
+        if not prefetch_pages or next_offset is None:
+            return []
+        end_offset = max(p['items_in_view'] for p in paging_infos)
+        if max_items:
+            end_offset = min(end_offset, start_offset + max_items)
+        offsets = (next_offset + i * self.chunk_size for i in range(prefetch_pages))
+        return [offset for offset in offsets if offset < end_offset]
+
+    @staticmethod
+    def _view_has_changed(paging_infos, items_in_view):
+        # Returns True if the total number of items in any of the views changed since the previous page. Offsets of
+        # pages that were requested ahead of time may then be wrong.
+        return any(old is not None and old != p['items_in_view'] for old, p in zip(items_in_view, paging_infos))
+
+    @staticmethod
+    def _discard_stale_pages(prefetched, keep_offsets):
+        # Discards prefetched pages that we will never need, because the server reported an unexpected next offset.
+        # This can happen if the collection changes while we are paging. Requests that haven't been sent yet are
+        # skipped. Requests that are already in flight are allowed to finish, but we just ignore the result.
+        for stale_offset in [o for o in prefetched if o not in keep_offsets]:
+            log.debug('Discarding prefetched page at offset %s', stale_offset)
+            skip, _ = prefetched.pop(stale_offset)
+            skip.set()
 
     def _get_page(self, message):
         rootfolder = self._get_element_container(message=message, name='{%s}RootFolder' % MNS)
@@ -485,44 +829,235 @@ class PagingEWSMixIn(EWSService):
         log.debug('%s: Got page with next offset %s (last_page %s)', self.SERVICE_NAME, next_offset, is_last_page)
         return rootfolder, next_offset
 
+    def _get_total_item_count(self, message):
+        # Returns the total number of items in the view, regardless of the paging offset
+        rootfolder = self._get_element_container(message=message, name='{%s}RootFolder' % MNS)
+        return int(rootfolder.get('TotalItemsInView'))
+
+
+class ApiVersionTracker(object):
+    """Remembers the API version that last worked on a service endpoint. Microsoft may report one server version
+    up-front but delegate account requests to an older backend server. Accounts that have not found their own version
+    yet try the version that last worked first, and then the protocol version and the remaining versions as usual.
+
+    The endpoint may have mailboxes on both old and new backends, so this is only a hint. Newer backends also accept
+    older API versions, but accounts never keep an older API version than their own responses report.
+
+    'wasted_probes' counts the requests that were rejected because of their API version, for monitoring purposes.
+    """
+    def __init__(self):
+        self.last_succeeded = None
+        self.wasted_probes = 0
+        self._lock = Lock()
+
+    def version_failed(self, api_version):
+        with self._lock:
+            self.wasted_probes += 1
+
+    def version_succeeded(self, api_version):
+        self.last_succeeded = api_version
+
+    def prioritize(self, api_versions):
+        # Returns the list of API versions with the version that last worked moved to the front
+        last_succeeded = self.last_succeeded
+        if last_succeeded is None or last_succeeded not in api_versions:
+            return api_versions
+        return [last_succeeded] + [v for v in api_versions if v != last_succeeded]
+
+
+class ChunkSizer(object):
+    """Controls the chunk size of a pooled service. The chunk size is halved when the server complains that a request
+    is too large, and grows again after a run of fast responses. We also keep a moving average of the response time per
+    item, and never grow chunks beyond what can be processed in TARGET_RESPONSE_TIME. Services with large requests or
+    responses will thus settle on smaller chunks than services with small requests and responses. Chunks never grow to
+    a size that has already failed, since a timeout is expensive.
+
+    The chunk size requested by the caller of the service is always the upper limit.
+    """
+    # Responses taking longer than this are considered slow
+    TARGET_RESPONSE_TIME = 30  # Seconds
+    # The number of consecutive fast responses before the chunk size is increased
+    GROW_AFTER = 5
+    # The weight of the newest response time in the moving average
+    SMOOTHING = 0.2
+
+    def __init__(self, service_name):
+        self.service_name = service_name
+        self.chunk_size = None  # None means that the chunk size is not limited
+        self.failed_size = None  # The smallest chunk size that was too large for the server
+        self.seconds_per_item = None
+        self._fast_responses = 0
+        self._lock = Lock()
+
+    def get_chunk_size(self, max_size):
+        if self.chunk_size is None:
+            return max_size
+        return min(self.chunk_size, max_size)
+
+    def chunk_failed(self, size):
+        # A chunk of 'size' items was too large for the server
+        with self._lock:
+            self._fast_responses = 0
+            if size > 1 and (self.failed_size is None or size < self.failed_size):
+                self.failed_size = size
+            new_size = max(1, size // 2)
+            if self.chunk_size is None or new_size < self.chunk_size:
+                log.warning('%s: Lowering chunk size to %s', self.service_name, new_size)
+                self.chunk_size = new_size
+
+    def chunk_succeeded(self, size, seconds):
+        # A chunk of 'size' items was processed in 'seconds'
+        with self._lock:
+            seconds_per_item = float(seconds) / size
+            if self.seconds_per_item is None:
+                self.seconds_per_item = seconds_per_item
+            else:
+                self.seconds_per_item += self.SMOOTHING * (seconds_per_item - self.seconds_per_item)
+            # The largest chunk size that we expect can be processed within the target response time
+            max_size = max(1, int(self.TARGET_RESPONSE_TIME / self.seconds_per_item)) if self.seconds_per_item \
+                else None
+            if seconds > self.TARGET_RESPONSE_TIME:
+                self._fast_responses = 0
+                if max_size is not None and (self.chunk_size is None or max_size < self.chunk_size):
+                    log.debug('%s: Slow response. Lowering chunk size to %s', self.service_name, max_size)
+                    self.chunk_size = max_size
+                return
+            if self.chunk_size is None or size < self.chunk_size:
+                # The chunk size is not what's limiting the request size
+                return
+            self._fast_responses += 1
+            if self._fast_responses < self.GROW_AFTER:
+                return
+            self._fast_responses = 0
+            new_size = self.chunk_size * 2
+            if max_size is not None:
+                new_size = min(new_size, max_size)
+            if self.failed_size is not None:
+                new_size = min(new_size, self.failed_size - 1)
+            if new_size > self.chunk_size:
+                log.debug('%s: Increasing chunk size to %s', self.service_name, new_size)
+                self.chunk_size = new_size
+
 
 class EWSPooledMixIn(EWSService):
     def _pool_requests(self, payload_func, items, **kwargs):
-        log.debug('Processing items in chunks of %s', self.chunk_size)
+        log.debug('Processing items in chunks of %s', self.get_chunk_size())
         # Chop items list into suitable pieces and let worker threads chew on the work. The order of the output result
         # list must be the same as the input id list, so the caller knows which status message belongs to which ID.
         # Yield results as they become available.
-        results = []
-        n = 1
-        for chunk in chunkify(items, self.chunk_size):
-            log.debug('Starting %s._get_elements worker %s for %s items', self.__class__.__name__, n, len(chunk))
-            n += 1
-            results.append(self.protocol.thread_pool.apply_async(
-                lambda c: self._get_elements(payload=payload_func(c, **kwargs)),
-                (chunk,)
-            ))
-            # Results will be available before iteration has finished if 'items' is a slow generator. Return early
-            for i, r in enumerate(results, 1):
-                if r is None:
-                    continue
-                if not r.ready():
-                    # First non-yielded result isn't ready yet. Yielding other ready results would mess up ordering
-                    break
-                log.debug('%s._get_elements result %s is ready early', self.__class__.__name__, i)
+        #
+        # At most 'max_in_flight' chunks are outstanding at any time. When the window is full, we wait for the oldest
+        # chunk to finish before consuming more of 'items'. This keeps memory usage constant, even when 'items' is a
+        # huge generator.
+        if not self.ordered:
+            for elem in self._pool_requests_unordered(payload_func=payload_func, items=items, **kwargs):
+                yield elem
+            return
+        results = deque()
+        for n, chunk in enumerate(self._chunkify(items), 1):
+            # Results will be available before iteration has finished if 'items' is a slow generator. Return early.
+            # Only the first non-yielded result can be yielded. Yielding other ready results would mess up ordering.
+            while results and (results[0][1].ready() or len(results) >= self.get_max_in_flight()):
+                i, r = results.popleft()
+                log.debug('Waiting for %s._get_elements result %s', self.__class__.__name__, i)
                 for elem in r.get():
                     yield elem
-                results[i-1] = None
+            log.debug('Starting %s._get_elements worker %s for %s items', self.__class__.__name__, n, len(chunk))
+            results.append((n, self.protocol.thread_pool.apply_async(
+                self._get_chunk_elements, (payload_func, chunk), kwargs
+            )))
         # Yield remaining results in order, as they become available
-        for i, r in enumerate(results, 1):
-            if r is None:
-                log.debug('%s._get_elements result %s of %s already sent', self.__class__.__name__, i, len(results))
-                continue
-            log.debug('Waiting for %s._get_elements result %s of %s', self.__class__.__name__, i, len(results))
+        while results:
+            i, r = results.popleft()
+            log.debug('Waiting for %s._get_elements result %s', self.__class__.__name__, i)
             elems = r.get()
-            log.debug('%s._get_elements result %s of %s is ready', self.__class__.__name__, i, len(results))
+            log.debug('%s._get_elements result %s is ready', self.__class__.__name__, i)
             for elem in elems:
                 yield elem
 
+    def _pool_requests_unordered(self, payload_func, items, **kwargs):
+        # Like _pool_requests(), but yields (index, elem) tuples as soon as the chunk containing the element has
+        # completed. 'index' is the position of the corresponding item in 'items'. A slow chunk doesn't hold back
+        # the results of chunks that were started later.
+        results = {}  # Maps chunk number to a (start index, AsyncResult) tuple
+        done = Queue()  # Chunk numbers of completed chunks, in the order they completed
+
+        def _get_chunk_elements(n, chunk):
+            try:
+                return self._get_chunk_elements(payload_func, chunk, **kwargs)
+            finally:
+                done.put(n)
+
+        start = 0
+        for n, chunk in enumerate(self._chunkify(items), 1):
+            while results and (not done.empty() or len(results) >= self.get_max_in_flight()):
+                for elem in self._get_unordered_result(results=results, n=done.get()):
+                    yield elem
+            log.debug('Starting %s._get_elements worker %s for %s items', self.__class__.__name__, n, len(chunk))
+            results[n] = start, self.protocol.thread_pool.apply_async(_get_chunk_elements, (n, chunk))
+            start += len(chunk)
+        while results:
+            for elem in self._get_unordered_result(results=results, n=done.get()):
+                yield elem
+
+    def _get_unordered_result(self, results, n):
+        start, r = results.pop(n)
+        log.debug('%s._get_elements result %s is ready', self.__class__.__name__, n)
+        for i, elem in enumerate(r.get(), start):
+            yield i, elem
+
+    def _get_chunk_elements(self, payload_func, chunk, **kwargs):
+        # Sends a chunk of items to the server and returns the result elements. If the server thinks the request is too
+        # large, split the chunk in two and try again. The chunk sizer only gets the time the server took to respond.
+        # Waiting for a session, back off periods and retries say nothing about the size of the chunk.
+        while True:
+            response_times = []
+            try:
+                elems = list(self._get_elements(payload=payload_func(chunk, **kwargs), response_times=response_times))
+            except self.CHUNK_TOO_LARGE_ERRORS as e:
+                self.chunk_sizer.chunk_failed(size=len(chunk))
+                if len(chunk) > 1:
+                    log.debug('%s: Splitting chunk of %s items (%s)', self.SERVICE_NAME, len(chunk), e)
+                    half = len(chunk) // 2
+                    return self._get_chunk_elements(payload_func, chunk[:half], **kwargs) \
+                        + self._get_chunk_elements(payload_func, chunk[half:], **kwargs)
+                self._handle_chunk_error(e)
+                continue
+            self.chunk_sizer.chunk_succeeded(size=len(chunk), seconds=sum(response_times))
+            return elems
+
+    def _handle_chunk_error(self, e):
+        # The request can't be split any further. Fall back to the behaviour of services that can't split requests.
+        if isinstance(e, ErrorTimeoutExpired) and self.protocol.session_pool_size > 1:
+            # Back off and let the server recover. We'll try again with fewer sessions.
+            self._handle_backoff(ErrorServerBusy('Reraised from %s(%s)' % (e.__class__.__name__, e), back_off=300))
+            return
+        raise e
+
+    def _chunkify(self, items):
+        # Like util.chunkify(), but the chunk size may change from chunk to chunk
+        chunk = []
+        for i in items:
+            chunk.append(i)
+            if len(chunk) >= self.get_chunk_size():
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    @property
+    def chunk_sizer(self):
+        return self.protocol.get_chunk_sizer(service_name=self.SERVICE_NAME)
+
+    def get_chunk_size(self):
+        # Returns the number of items to send in the next chunk
+        return self.chunk_sizer.get_chunk_size(max_size=self.chunk_size)
+
+    def get_max_in_flight(self):
+        # Returns the max number of outstanding chunks. By default, allow one extra request per session, so a session
+        # never has to wait for the next request to be created.
+        return self.max_in_flight or 2 * self.protocol.session_pool_size
+
 
 def to_item_id(item, item_cls):
     # Coerce a tuple, dict or object to an 'item_cls' instance. Used to create [Parent][Item|Folder]Id instances from a
@@ -536,14 +1071,37 @@ def to_item_id(item, item_cls):
     return item_cls(item.id, item.changekey)
 
 
+# AdditionalProperties elements per (field paths, version). Each GetItem and FindItem chunk of a query uses the same
+# element, and expanding indexed fields and converting them to XML is expensive.
+SHAPE_CACHE_SIZE = 1000
+_additional_properties_cache = {}
+
+
+def _get_additional_properties(additional_fields, version):
+    from ..properties import EWSElement
+    key = frozenset(additional_fields), (version.build, version.api_version) if version else None
+    generation = EWSElement._fields_generation
+    try:
+        cached_generation, additional_properties = _additional_properties_cache[key]
+        if cached_generation == generation:
+            return additional_properties
+    except KeyError:
+        pass
+    additional_properties = create_element('t:AdditionalProperties')
+    expanded_fields = chain(*(f.expand(version=version) for f in key[0]))
+    set_xml_value(additional_properties, sorted(expanded_fields, key=lambda f: f.path), version=version)
+    if len(_additional_properties_cache) >= SHAPE_CACHE_SIZE:
+        _additional_properties_cache.clear()
+    _additional_properties_cache[key] = generation, additional_properties
+    return additional_properties
+
+
 def create_shape_element(tag, shape, additional_fields, version):
     shape_elem = create_element(tag)
     add_xml_child(shape_elem, 't:BaseShape', shape)
     if additional_fields:
-        additional_properties = create_element('t:AdditionalProperties')
-        expanded_fields = chain(*(f.expand(version=version) for f in additional_fields))
-        set_xml_value(additional_properties, sorted(expanded_fields, key=lambda f: f.path), version=version)
-        shape_elem.append(additional_properties)
+        # The cached element must not be moved into the shape element, so we append a copy
+        shape_elem.append(deepcopy(_get_additional_properties(additional_fields=additional_fields, version=version)))
     return shape_elem
 
 
@@ -1,4 +1,4 @@
-from ..errors import ResponseMessageError
+from ..errors import ResponseMessageError, ErrorTimeoutExpired, ErrorMessageSizeExceeded
 from ..util import create_element, MNS
 from .common import EWSAccountService, EWSPooledMixIn, create_item_ids_element
 
@@ -10,6 +10,7 @@ class ExportItems(EWSAccountService, EWSPooledMixIn):
     ERRORS_TO_CATCH_IN_RESPONSE = ResponseMessageError
     SERVICE_NAME = 'ExportItems'
     element_container_name = '{%s}Data' % MNS
+    CHUNK_TOO_LARGE_ERRORS = (ErrorTimeoutExpired, ErrorMessageSizeExceeded)
 
     def call(self, items):
         return self._pool_requests(payload_func=self.get_payload, **dict(items=items))
@@ -13,6 +13,7 @@ class FindFolder(EWSFolderService, PagingEWSMixIn):
     """
     SERVICE_NAME = 'FindFolder'
     element_container_name = '{%s}Folders' % TNS
+    incremental_parse = True
 
     def call(self, additional_fields, restriction, shape, depth, max_items, offset):
         """
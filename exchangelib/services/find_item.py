@@ -2,6 +2,7 @@ from collections import OrderedDict
 
 from six import text_type
 
+from ..errors import ErrorServerBusy
 from ..util import create_element, set_xml_value, TNS
 from .common import EWSFolderService, PagingEWSMixIn, create_shape_element
 
@@ -12,9 +13,10 @@ class FindItem(EWSFolderService, PagingEWSMixIn):
     """
     SERVICE_NAME = 'FindItem'
     element_container_name = '{%s}Items' % TNS
+    incremental_parse = True
 
     def call(self, additional_fields, restriction, order_fields, shape, query_string, depth, calendar_view, max_items,
-             offset):
+             offset, prefetch_pages=0, parallel=False):
         """
         Find items in an account.
 
@@ -27,19 +29,55 @@ class FindItem(EWSFolderService, PagingEWSMixIn):
         :param calendar_view: If set, returns recurring calendar items unfolded
         :param max_items: the max number of items to return
         :param offset: the offset relative to the first item in the item collection. Usually 0.
+        :param prefetch_pages: the number of pages to request ahead of time while the current page is being consumed
+        :param parallel: if True, request the remaining pages concurrently once the total number of items is known
         :return: XML elements for the matching items
         """
-        return self._paged_call(payload_func=self.get_payload, max_items=max_items, **dict(
-            additional_fields=additional_fields,
+        return self._paged_call(
+            payload_func=self.get_payload, max_items=max_items, prefetch_pages=prefetch_pages, parallel=parallel,
+            **dict(
+                additional_fields=additional_fields,
+                restriction=restriction,
+                order_fields=order_fields,
+                query_string=query_string,
+                shape=shape,
+                depth=depth,
+                calendar_view=calendar_view,
+                page_size=self.chunk_size,
+                offset=offset,
+            )
+        )
+
+    def count(self, restriction, query_string, depth, offset=0):
+        """
+        Count items in an account, without fetching them. Only a single item is requested from each folder. The count
+        is read from the TotalItemsInView attribute of the response.
+
+        :param restriction: a Restriction object for
+        :param query_string: a QueryString object
+        :param depth: How deep in the folder structure to search for items
+        :param offset: the paging offset. Like in call(), it applies to each folder separately
+        :return: The number of matching items after the offset, summed over all folders
+        """
+        from ..items import ID_ONLY
+        payload = self.get_payload(
+            additional_fields=None,
             restriction=restriction,
-            order_fields=order_fields,
+            order_fields=None,
             query_string=query_string,
-            shape=shape,
+            shape=ID_ONLY,
             depth=depth,
-            calendar_view=calendar_view,
-            page_size=self.chunk_size,
-            offset=offset,
-        ))
+            calendar_view=None,
+            page_size=1,
+            offset=0,
+        )
+        while True:
+            try:
+                response = self._get_response_xml(payload=payload)
+            except ErrorServerBusy as e:
+                self._handle_backoff(e)
+                continue
+            return sum(max(self._get_total_item_count(message) - offset, 0) for message in response)
 
     def get_payload(self, additional_fields, restriction, order_fields, query_string, shape, depth, calendar_view,
                     page_size, offset=0):
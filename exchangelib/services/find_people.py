@@ -1,4 +1,5 @@
 from collections import OrderedDict
+import functools
 import logging
 
 from six import text_type
@@ -32,7 +33,6 @@ class FindPeople(EWSAccountService, PagingEWSMixIn):
         :param offset: the offset relative to the first item in the item collection. Usually 0.
         :return: XML elements for the matching items
         """
-        from ..items import Persona, ID_ONLY
         personas = self._paged_call(payload_func=self.get_payload, max_items=max_items, **dict(
             folder=folder,
             additional_fields=additional_fields,
@@ -44,12 +44,15 @@ class FindPeople(EWSAccountService, PagingEWSMixIn):
             page_size=self.chunk_size,
             offset=offset,
         ))
+        parse_func = self._get_parse_func(shape=shape, additional_fields=additional_fields)
+        for p in personas:
+            yield p if isinstance(p, Exception) else parse_func(p)
+
+    def _get_parse_func(self, shape, additional_fields):
+        from ..items import Persona, ID_ONLY
         if shape == ID_ONLY and additional_fields is None:
-            for p in personas:
-                yield p if isinstance(p, Exception) else Persona.id_from_xml(p)
-        else:
-            for p in personas:
-                yield p if isinstance(p, Exception) else Persona.from_xml(p, account=self.account)
+            return Persona.id_from_xml
+        return functools.partial(Persona.from_xml, account=self.account)
 
     def get_payload(self, folder, additional_fields, restriction, order_fields, query_string, shape, depth, page_size,
                     offset=0):
@@ -86,36 +89,47 @@ class FindPeople(EWSAccountService, PagingEWSMixIn):
 
     def _paged_call(self, payload_func, max_items, **kwargs):
         item_count = kwargs['offset']
+        get_payload = self._paged_payload_func(payload_func, **kwargs)
         while True:
             log.debug('EWS %s, account %s, service %s: Getting items at offset %s',
                       self.protocol.service_endpoint, self.account, self.SERVICE_NAME, item_count)
-            kwargs['offset'] = item_count
             try:
-                response = self._get_response_xml(payload=payload_func(**kwargs))
+                response = self._get_response_xml(payload=get_payload(item_count))
             except ErrorServerBusy as e:
                 self._handle_backoff(e)
                 continue
-            # Collect a tuple of (rootfolder, total_items) tuples
-            parsed_pages = [self._get_page(message) for message in response]
-            if len(parsed_pages) != 1:
-                # We can only query one folder, so there should only be one element in response
-                raise MalformedResponseError("Expected single item in 'response', got %s" % len(parsed_pages))
-            rootfolder, total_items = parsed_pages[0]
-            if rootfolder is not None:
-                container = rootfolder.find(self.element_container_name)
-                if container is None:
-                    raise MalformedResponseError('No %s elements in ResponseMessage (%s)' % (
-                        self.element_container_name, xml_to_str(rootfolder)))
-                for elem in self._get_elements_in_container(container=container):
-                    item_count += 1
-                    yield elem
-                if max_items and item_count >= max_items:
-                    log.debug("'max_items' count reached")
-                    break
-            if total_items <= 0 or item_count >= total_items:
-                log.debug('Got all items in view')
+            elems, total_items = self._get_elems_in_page(response=response)
+            for elem in elems:
+                item_count += 1
+                yield elem
+            if self._is_last_page(item_count=item_count, total_items=total_items, max_items=max_items):
                 break
 
+    def _get_elems_in_page(self, response):
+        # Returns the elements in the page and the total number of items in the view
+        parsed_pages = [self._get_page(message) for message in response]
+        if len(parsed_pages) != 1:
+            # We can only query one folder, so there should only be one element in response
+            raise MalformedResponseError("Expected single item in 'response', got %s" % len(parsed_pages))
+        rootfolder, total_items = parsed_pages[0]
+        if rootfolder is None:
+            return [], total_items
+        container = rootfolder.find(self.element_container_name)
+        if container is None:
+            raise MalformedResponseError('No %s elements in ResponseMessage (%s)' % (
+                self.element_container_name, xml_to_str(rootfolder)))
+        return self._get_elements_in_container(container=container), total_items
+
+    @staticmethod
+    def _is_last_page(item_count, total_items, max_items):
+        if max_items and item_count >= max_items:
+            log.debug("'max_items' count reached")
+            return True
+        if total_items <= 0 or item_count >= total_items:
+            log.debug('Got all items in view')
+            return True
+        return False
+
     def _get_page(self, message):
         self._get_element_container(message=message)  # Just raise exceptions
         total_items = int(message.find('{%s}TotalNumberOfPeopleInView' % MNS).text)
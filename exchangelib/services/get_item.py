@@ -1,3 +1,4 @@
+from ..errors import ErrorTimeoutExpired, ErrorMessageSizeExceeded
 from ..util import create_element, MNS
 from .common import EWSAccountService, EWSPooledMixIn, create_item_ids_element, create_shape_element
 
@@ -8,6 +9,8 @@ class GetItem(EWSAccountService, EWSPooledMixIn):
     """
     SERVICE_NAME = 'GetItem'
     element_container_name = '{%s}Items' % MNS
+    CHUNK_TOO_LARGE_ERRORS = (ErrorTimeoutExpired, ErrorMessageSizeExceeded)
+    incremental_parse = True
 
     def call(self, items, additional_fields, shape):
         """
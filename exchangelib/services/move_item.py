@@ -1,8 +1,8 @@
 from ..util import create_element, set_xml_value, MNS
-from .common import EWSAccountService, create_item_ids_element
+from .common import EWSAccountService, EWSPooledMixIn, create_item_ids_element
 
 
-class MoveItem(EWSAccountService):
+class MoveItem(EWSAccountService, EWSPooledMixIn):
     """
     MSDN: https://msdn.microsoft.com/en-us/library/office/aa565781(v=exchg.150).aspx
     """
@@ -10,7 +10,7 @@ class MoveItem(EWSAccountService):
     element_container_name = '{%s}Items' % MNS
 
     def call(self, items, to_folder):
-        return self._get_elements(payload=self.get_payload(
+        return self._pool_requests(payload_func=self.get_payload, **dict(
             items=items,
             to_folder=to_folder,
         ))
@@ -8,7 +8,8 @@ import requests_ntlm
 
 from .credentials import IMPERSONATION
 from .errors import UnauthorizedError, TransportError, RedirectError, RelativeRedirect
-from .util import create_element, add_xml_child, get_redirect_url, xml_to_str, ns_translation, CONNECTION_ERRORS
+from .util import create_element, add_xml_child, get_redirect_url, xml_to_str, ns_translation, tostring, \
+    CONNECTION_ERRORS
 
 log = logging.getLogger(__name__)
 
@@ -46,11 +47,23 @@ def extra_headers(account):
     return None
 
 
-def wrap(content, version, account=None):
-    """
-    Generate the necessary boilerplate XML for a raw SOAP request. The XML is specific to the server version.
-    ExchangeImpersonation allows to act as the user we want to impersonate.
-    """
+# Serialized envelope prefix and suffix, per (version, access_type, primary_smtp_address, timezone ID)
+ENVELOPE_TEMPLATE_CACHE_SIZE = 1000
+_envelope_templates = {}
+# The start and end tag of the namespaced 's:Body' element we use to serialize the request payload
+_BODY_START_TAG = tostring(create_element('s:Body', nsmap=ns_translation), encoding=DEFAULT_ENCODING)[:-2] + b'>'
+_BODY_END_TAG = b'</s:Body>'
+
+
+def _header_key(version, account):
+    if not account:
+        return version, None, None, None
+    if account.access_type == IMPERSONATION:
+        return version, account.access_type, account.primary_smtp_address, account.default_timezone.ms_id
+    return version, account.access_type, None, account.default_timezone.ms_id
+
+
+def _create_envelope(version, account):
     envelope = create_element('s:Envelope', nsmap=ns_translation)
     header = create_element('s:Header')
     requestserverversion = create_element('t:RequestServerVersion', attrs=dict(Version=version))
@@ -67,10 +80,51 @@ def wrap(content, version, account=None):
         timezonecontext.append(timezonedefinition)
         header.append(timezonecontext)
     envelope.append(header)
-    body = create_element('s:Body')
+    return envelope
+
+
+def _envelope_template(version, account):
+    # The envelope is identical for all requests with the same header values. Serialize it once, with an empty body,
+    # and split it into the bytes before and after the body content.
+    key = _header_key(version, account)
+    try:
+        return _envelope_templates[key]
+    except KeyError:
+        pass
+    envelope = _create_envelope(version=version, account=account)
+    envelope.append(create_element('s:Body'))
+    envelope_bytes = xml_to_str(envelope, encoding=DEFAULT_ENCODING, xml_declaration=True)
+    empty_body = b'<s:Body/></s:Envelope>'
+    if not envelope_bytes.endswith(empty_body):
+        raise ValueError('Unexpected envelope XML %r' % envelope_bytes)
+    template = (envelope_bytes[:-len(empty_body)] + b'<s:Body>', _BODY_END_TAG + b'</s:Envelope>')
+    if len(_envelope_templates) >= ENVELOPE_TEMPLATE_CACHE_SIZE:
+        _envelope_templates.clear()
+    _envelope_templates[key] = template
+    return template
+
+
+def _body_to_bytes(content):
+    # Serialize the content inside an 's:Body' element that declares the same namespaces as the envelope. That way,
+    # the content bytes are exactly as they would be when serialized as part of the full envelope.
+    body = create_element('s:Body', nsmap=ns_translation)
     body.append(content)
-    envelope.append(body)
-    return xml_to_str(envelope, encoding=DEFAULT_ENCODING, xml_declaration=True)
+    body_bytes = tostring(body, encoding=DEFAULT_ENCODING, xml_declaration=False)
+    if not body_bytes.startswith(_BODY_START_TAG) or not body_bytes.endswith(_BODY_END_TAG):
+        raise ValueError('Unexpected body XML %r' % body_bytes)
+    return body_bytes[len(_BODY_START_TAG):-len(_BODY_END_TAG)]
+
+
+def wrap(content, version, account=None):
+    """
+    Generate the necessary boilerplate XML for a raw SOAP request. The XML is specific to the server version.
+    ExchangeImpersonation allows to act as the user we want to impersonate.
+
+    The envelope and header are serialized once per unique set of header values, and only the body content is
+    serialized on each call.
+    """
+    prefix, suffix = _envelope_template(version=version, account=account)
+    return prefix + _body_to_bytes(content) + suffix
 
 
 def get_auth_instance(credentials, auth_type):
@@ -3,13 +3,20 @@ from __future__ import unicode_literals
 from base64 import b64decode
 from codecs import BOM_UTF8
 from collections import OrderedDict
+from contextlib import contextmanager
 import datetime
 from decimal import Decimal
+import getpass
+import glob
 import io
 import itertools
 import logging
+import os
 import re
+import shelve
 import socket
+import sys
+from threading import Lock
 import time
 import xml.sax.handler
 
@@ -144,36 +151,57 @@ def get_xml_attrs(tree, name):
     return [elem.text for elem in tree.findall(name) if elem.text is not None]
 
 
-def value_to_xml_text(value):
-    # We can't handle bytes in this function because str == bytes on Python2
+# Maps value types to functions that convert values of that type to XML text. Filled on first use, to avoid circular
+# imports. Subclasses of the registered types are added when they are first seen.
+_xml_text_encoders = {}
+
+
+def _register_xml_text_encoders():
     from .ewsdatetime import EWSTimeZone, EWSDateTime, EWSDate
     from .indexed_properties import PhoneNumber, EmailAddress
     from .properties import Mailbox, Attendee, ConversationId
-    if isinstance(value, string_types):
-        return safe_xml_value(value)
-    if isinstance(value, bool):
-        return '1' if value else '0'
-    if isinstance(value, (int, Decimal)):
-        return text_type(value)
-    if isinstance(value, datetime.time):
-        return value.isoformat()
-    if isinstance(value, EWSTimeZone):
-        return value.ms_id
-    if isinstance(value, EWSDateTime):
-        return value.ewsformat()
-    if isinstance(value, EWSDate):
-        return value.ewsformat()
-    if isinstance(value, PhoneNumber):
-        return value.phone_number
-    if isinstance(value, EmailAddress):
-        return value.email
-    if isinstance(value, Mailbox):
-        return value.email_address
-    if isinstance(value, Attendee):
-        return value.mailbox.email_address
-    if isinstance(value, ConversationId):
-        return value.id
-    raise NotImplementedError('Unsupported type: %s (%s)' % (type(value), value))
+    encoders = {
+        bool: lambda v: '1' if v else '0',
+        int: text_type,
+        Decimal: text_type,
+        datetime.time: lambda v: v.isoformat(),
+        EWSTimeZone: lambda v: v.ms_id,
+        EWSDateTime: lambda v: v.ewsformat(),
+        EWSDate: lambda v: v.ewsformat(),
+        PhoneNumber: lambda v: v.phone_number,
+        EmailAddress: lambda v: v.email,
+        Mailbox: lambda v: v.email_address,
+        Attendee: lambda v: v.mailbox.email_address,
+        ConversationId: lambda v: v.id,
+    }
+    for string_type in string_types:
+        encoders[string_type] = safe_xml_value
+    _xml_text_encoders.update(encoders)
+
+
+def _get_xml_text_encoder(value_type):
+    if not _xml_text_encoders:
+        _register_xml_text_encoders()
+    # Look for the closest registered base class
+    for base_type in value_type.__mro__:
+        try:
+            encoder = _xml_text_encoders[base_type]
+        except KeyError:
+            continue
+        _xml_text_encoders[value_type] = encoder
+        return encoder
+    return None
+
+
+def value_to_xml_text(value):
+    # We can't handle bytes in this function because str == bytes on Python2
+    try:
+        encoder = _xml_text_encoders[type(value)]
+    except KeyError:
+        encoder = _get_xml_text_encoder(type(value))
+        if encoder is None:
+            raise NotImplementedError('Unsupported type: %s (%s)' % (type(value), value))
+    return encoder(value)
 
 
 def xml_text_to_value(value, value_type):
@@ -189,55 +217,151 @@ def xml_text_to_value(value, value_type):
     }[value_type](value)
 
 
-def set_xml_value(elem, value, version):
+def _set_xml_text(elem, value, version):
+    elem.text = value_to_xml_text(value)
+
+
+def _append_xml_element(elem, value, version):
+    elem.append(value)
+
+
+def _append_field_path(elem, value, version):
+    elem.append(value.to_xml())
+
+
+def _append_ews_element(elem, value, version):
+    from .version import Version
+    if not isinstance(version, Version):
+        raise ValueError("'version' %s must be a Version instance" % version)
+    elem.append(value.to_xml(version=version))
+
+
+def _append_xml_values(elem, value, version):
+    from .fields import FieldPath, FieldOrder
+    from .properties import EWSElement
+    for v in value:
+        if isinstance(v, (FieldPath, FieldOrder)):
+            _append_field_path(elem, v, version)
+        elif isinstance(v, EWSElement):
+            _append_ews_element(elem, v, version)
+        elif isinstance(v, RestrictedElement):
+            elem.append(v)
+        elif isinstance(v, string_types):
+            add_xml_child(elem, 't:String', v)
+        else:
+            raise ValueError('Unsupported type %s for list element %s on elem %s' % (type(v), v, elem))
+
+
+# Maps value types to the function that adds values of that type to an element. Filled on first use of each type.
+_xml_value_setters = {}
+
+
+def _get_xml_value_setter(value_type):
+    try:
+        return _xml_value_setters[value_type]
+    except KeyError:
+        pass
     from .ewsdatetime import EWSDateTime, EWSDate
     from .fields import FieldPath, FieldOrder
     from .properties import EWSElement
-    from .version import Version
-    if isinstance(value, string_types + (bool, bytes, int, Decimal, datetime.time, EWSDate, EWSDateTime)):
-        elem.text = value_to_xml_text(value)
-    elif isinstance(value, RestrictedElement):
-        elem.append(value)
-    elif is_iterable(value, generators_allowed=True):
-        for v in value:
-            if isinstance(v, (FieldPath, FieldOrder)):
-                elem.append(v.to_xml())
-            elif isinstance(v, EWSElement):
-                if not isinstance(version, Version):
-                    raise ValueError("'version' %r must be a Version instance" % version)
-                elem.append(v.to_xml(version=version))
-            elif isinstance(v, RestrictedElement):
-                elem.append(v)
-            elif isinstance(v, string_types):
-                add_xml_child(elem, 't:String', v)
-            else:
-                raise ValueError('Unsupported type %s for list element %s on elem %s' % (type(v), v, elem))
-    elif isinstance(value, (FieldPath, FieldOrder)):
-        elem.append(value.to_xml())
-    elif isinstance(value, EWSElement):
-        if not isinstance(version, Version):
-            raise ValueError("'version' %s must be a Version instance" % version)
-        elem.append(value.to_xml(version=version))
+    if issubclass(value_type, string_types + (bool, bytes, int, Decimal, datetime.time, EWSDate, EWSDateTime)):
+        setter = _set_xml_text
+    elif issubclass(value_type, RestrictedElement):
+        setter = _append_xml_element
+    elif hasattr(value_type, '__iter__'):
+        # Lists, generators and other iterables
+        setter = _append_xml_values
+    elif issubclass(value_type, (FieldPath, FieldOrder)):
+        setter = _append_field_path
+    elif issubclass(value_type, EWSElement):
+        setter = _append_ews_element
     else:
+        setter = None
+    _xml_value_setters[value_type] = setter
+    return setter
+
+
+def set_xml_value(elem, value, version):
+    setter = _get_xml_value_setter(type(value))
+    if setter is None:
         raise ValueError('Unsupported type %s for value %s on elem %s' % (type(value), value, elem))
+    setter(elem, value, version)
     return elem
 
 
 def safe_xml_value(value, replacement='?'):
+    # Printable strings never contain any of the characters matched by _ILLEGAL_XML_CHARS_RE, and checking that is much
+    # cheaper than a regex substitution.
+    if not PY2 and value.isprintable():
+        return text_type(value)
     return text_type(_ILLEGAL_XML_CHARS_RE.sub(replacement, value))
 
 
+# Qualified tag names per prefixed name, e.g. 't:Subject' -> '{http://...}Subject'
+_qualified_tags = {}
+
+
 def create_element(name, attrs=None, nsmap=None):
     # Python versions prior to 3.6 do not preserve dict or kwarg ordering, so we cannot pull in attrs as **kwargs if we
     # also want stable XML attribute output. Instead, let callers supply us with an OrderedDict instance.
-    if ':' in name:
-        ns, name = name.split(':')
-        name = '{%s}%s' % (ns_translation[ns], name)
+    try:
+        tag = _qualified_tags[name]
+    except KeyError:
+        if ':' in name:
+            ns, local_name = name.split(':')
+            tag = '{%s}%s' % (ns_translation[ns], local_name)
+        else:
+            tag = name
+        _qualified_tags[name] = tag
     elem = RestrictedElement(attrib=attrs, nsmap=nsmap)
-    elem.tag = name
+    elem.tag = tag
     return elem
 
 
+class IndexedElement(object):
+    """Wraps an XML element and indexes its children by tag in a single pass. Looking up a child by tag is then a dict
+    lookup instead of a scan of all children. Children that were removed from the element after indexing are ignored.
+    Anything else is looked up on the wrapped element.
+    """
+    __slots__ = ('elem', 'children')
+
+    def __init__(self, elem):
+        self.elem = elem
+        self.children = {}
+        for child in elem:
+            self.children.setdefault(child.tag, []).append(child)
+
+    def __contains__(self, tag):
+        return tag in self.children
+
+    def __iter__(self):
+        return iter(self.elem)
+
+    def __len__(self):
+        return len(self.elem)
+
+    def __getattr__(self, name):
+        return getattr(self.elem, name)
+
+    @staticmethod
+    def _is_tag(path):
+        # Only plain '{namespace}name' tags are indexed. Let the wrapped element handle other ElementPath expressions.
+        return path.startswith('{') and '/' not in path and '[' not in path
+
+    def find(self, path):
+        if not self._is_tag(path):
+            return self.elem.find(path)
+        for child in self.children.get(path, ()):
+            if child.getparent() is not None:
+                return child
+        return None
+
+    def findall(self, path):
+        if not self._is_tag(path):
+            return self.elem.findall(path)
+        return [child for child in self.children.get(path, ()) if child.getparent() is not None]
+
+
 def add_xml_child(tree, name, value):
     # We're calling add_xml_child many places where we don't have the version handy. Don't pass EWSElement or list of
     # EWSElement to this function!
@@ -399,6 +523,34 @@ def to_xml(bytes_content):
         raise ParseError('This is not XML: %r' % stream.read(), '<not from file>', -1, 0)
 
 
+# The number of bytes to feed to the incremental XML parser at a time
+XML_CHUNK_SIZE = 64 * 1024
+
+
+def iter_xml_events(bytes_content, chunk_size=XML_CHUNK_SIZE):
+    """Parses bytes or a generator of bytes incrementally, with the same parser settings as to_xml(). Yields (event,
+    element) tuples for the 'start' and 'end' of each element as soon as the parser has read them. Elements are complete
+    when their 'end' event is yielded. Callers may remove completed elements from the tree to save memory.
+    """
+    if isinstance(bytes_content, bytes):
+        content = bytes_content
+        bytes_content = (content[i:i + chunk_size] for i in range(0, len(content), chunk_size))
+    parser = _etree.XMLPullParser(events=('start', 'end'), **ForgivingParser.parser_config)
+    parser.set_element_class_lookup(_etree.ElementDefaultClassLookup(element=ForgivingParser.element_class))
+    try:
+        for chunk in bytes_content:
+            parser.feed(chunk)
+            for event in parser.read_events():
+                yield event
+        parser.close()
+        for event in parser.read_events():
+            yield event
+    except _etree.ParseError as e:
+        if hasattr(e, 'position'):
+            e.lineno, e.offset = e.position
+        raise ParseError(text_type(e), '<not from file>', e.lineno, e.offset)
+
+
 def is_xml(text):
     """
     Helper function. Lightweight test if response is an XML doc
@@ -497,6 +649,63 @@ class DummyResponse(object):
         return self.content
 
 
+class KeyedLock(object):
+    """A lock per key. Threads holding the lock for different keys run in parallel, while threads asking for the lock
+    for the same key are serialized. Locks are discarded when no thread holds or waits for them.
+    """
+    def __init__(self):
+        self._lock = Lock()
+        self._locks = {}  # Maps keys to [lock, number of threads holding or waiting for the lock]
+
+    @contextmanager
+    def __call__(self, key):
+        with self._lock:
+            entry = self._locks.setdefault(key, [Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._locks[key]
+
+    def __len__(self):
+        return len(self._locks)
+
+
+def shelve_filename(prefix='exchangelib.cache'):
+    # 'shelve' may pickle objects using different pickle protocol versions. Append the python major+minor version
+    # numbers to the filename. Also append the username, to avoid permission errors.
+    major, minor = sys.version_info[:2]
+    try:
+        user = getpass.getuser()
+    except KeyError:
+        # getuser() fails on some systems. Provide a sane default. See issue #448
+        user = 'exchangelib'
+    return '{prefix}.{user}.py{major}{minor}'.format(prefix=prefix, user=user, major=major, minor=minor)
+
+
+@contextmanager
+def shelve_open_with_failover(filename):
+    # We can expect empty or corrupt files. Whatever happens, just delete the cache file and try again.
+    # 'shelve' may add a backend-specific suffix to the file, so also delete all files with a suffix.
+    # We don't know which file caused the error, so just delete them all.
+    try:
+        shelve_handle = shelve.open(filename)
+    except Exception as e:
+        for f in glob.glob(filename + '*'):
+            log.warning('Deleting invalid cache file %s (%r)', f, e)
+            os.unlink(f)
+        shelve_handle = shelve.open(filename)
+    try:
+        yield shelve_handle
+    finally:
+        # Always close the handle, so changes are written to disk and other processes can see them
+        shelve_handle.close()
+
+
 def get_domain(email):
     try:
         return email.split('@')[1].lower()
@@ -559,6 +768,28 @@ try:
 except ImportError:
     pass
 
+# In Python 2, we want this to be a 'str' object so logging doesn't break (all formatting arguments are 'str'). We
+# activated 'unicode_literals' at the top of this file, so it would be a 'unicode' object unless we convert to 'str'
+# explicitly. This is a no-op for Python 3.
+POST_LOG_MSG = str('''\
+Retry: %(retry)s
+Waited: %(wait)s
+Timeout: %(timeout)s
+Session: %(session_id)s
+Thread: %(thread_id)s
+Auth type: %(auth)s
+URL: %(url)s
+HTTP adapter: %(adapter)s
+Allow redirects: %(allow_redirects)s
+Streaming: %(stream)s
+Response time: %(response_time)s
+Status code: %(status_code)s
+Request headers: %(request_headers)s
+Response headers: %(response_headers)s
+Request data: %(xml_request)s
+Response data: %(xml_response)s
+''')
+
 
 def post_ratelimited(protocol, session, url, headers, data, allow_redirects=False, stream=False):
     """
@@ -590,27 +821,6 @@ def post_ratelimited(protocol, session, url, headers, data, allow_redirects=Fals
     wait = 10  # seconds
     retry = 0
     redirects = 0
-    # In Python 2, we want this to be a 'str' object so logging doesn't break (all formatting arguments are 'str').
-    # We activated 'unicode_literals' at the top of this file, so it would be a 'unicode' object unless we convert
-    # to 'str' explicitly. This is a no-op for Python 3.
-    log_msg = str('''\
-Retry: %(retry)s
-Waited: %(wait)s
-Timeout: %(timeout)s
-Session: %(session_id)s
-Thread: %(thread_id)s
-Auth type: %(auth)s
-URL: %(url)s
-HTTP adapter: %(adapter)s
-Allow redirects: %(allow_redirects)s
-Streaming: %(stream)s
-Response time: %(response_time)s
-Status code: %(status_code)s
-Request headers: %(request_headers)s
-Response headers: %(response_headers)s
-Request data: %(xml_request)s
-Response data: %(xml_response)s
-''')
     log_vals = dict(
         retry=retry,
         wait=wait,
@@ -655,7 +865,12 @@ Response data: %(xml_response)s
                     response_headers=r.headers,
                     xml_response='[STREAMING]' if stream else r.content,
                 )
-            log.debug(log_msg, log_vals)
+                # The duration of the HTTP round trip alone, without waiting for sessions or back off periods
+                r.response_time = log_vals['response_time']
+            log.debug(POST_LOG_MSG, log_vals)
+            if r.status_code == 401:
+                # Our credentials or auth type were rejected. Don't trust any cached auth type for this endpoint
+                protocol.invalidate_persistent_cache()
             if _may_retry_on_error(r, protocol, wait):
                 log.info("Session %s thread %s: Connection error on URL %s (code %s). Cool down %s secs",
                          session.session_id, thread_id, r.url, r.status_code, wait)
@@ -676,7 +891,7 @@ Response data: %(xml_response)s
         raise
     except Exception as e:
         # Let higher layers handle this. Add full context for better debugging.
-        log.error(str('%s: %s\n%s'), e.__class__.__name__, str(e), log_msg % log_vals)
+        log.error(str('%s: %s\n%s'), e.__class__.__name__, str(e), POST_LOG_MSG % log_vals)
         protocol.retire_session(session)
         raise
     if r.status_code == 500 and r.content and is_xml(r.content):
@@ -685,7 +900,7 @@ Response data: %(xml_response)s
     elif r.status_code != 200:
         protocol.retire_session(session)
         try:
-            _raise_response_errors(r, protocol, log_msg, log_vals)  # Always raises an exception
+            _raise_response_errors(r, protocol, POST_LOG_MSG, log_vals)  # Always raises an exception
         finally:
             if stream:
                 r.close()
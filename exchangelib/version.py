@@ -83,16 +83,27 @@ class Build(PickleMixIn):
         },
     }
 
-    __slots__ = ('major_version', 'minor_version', 'major_build', 'minor_build')
+    __slots__ = ('major_version', 'minor_version', 'major_build', 'minor_build', '_key')
 
     def __init__(self, major_version, minor_version, major_build=0, minor_build=0):
         self.major_version = major_version
         self.minor_version = minor_version
         self.major_build = major_build
         self.minor_build = minor_build
+        self._key = None
         if major_version < 8:
             raise ValueError("Exchange major versions below 8 don't support EWS (%s)" % text_type(self))
 
+    @property
+    def key(self):
+        # An integer that sorts the same way as the build numbers. Builds are compared very often, e.g. when checking
+        # that fields are supported by the server version, so we compute the key once instead of comparing four values.
+        key = getattr(self, '_key', None)
+        if key is None:
+            key = self.major_version << 96 | self.minor_version << 64 | self.major_build << 32 | self.minor_build
+            self._key = key
+        return key
+
     @classmethod
     def from_xml(cls, elem):
         xml_elems_map = {
@@ -119,37 +130,28 @@ class Build(PickleMixIn):
 
     def __cmp__(self, other):
         # __cmp__ is not a magic method in Python3. We'll just use it here to implement comparison operators
-        c = (self.major_version > other.major_version) - (self.major_version < other.major_version)
-        if c != 0:
-            return c
-        c = (self.minor_version > other.minor_version) - (self.minor_version < other.minor_version)
-        if c != 0:
-            return c
-        c = (self.major_build > other.major_build) - (self.major_build < other.major_build)
-        if c != 0:
-            return c
-        return (self.minor_build > other.minor_build) - (self.minor_build < other.minor_build)
+        return (self.key > other.key) - (self.key < other.key)
 
     def __eq__(self, other):
-        return self.__cmp__(other) == 0
+        return self.key == other.key
 
     def __hash__(self):
-        return hash(repr(self))
+        return hash(self.key)
 
     def __ne__(self, other):
-        return self.__cmp__(other) != 0
+        return self.key != other.key
 
     def __lt__(self, other):
-        return self.__cmp__(other) < 0
+        return self.key < other.key
 
     def __le__(self, other):
-        return self.__cmp__(other) <= 0
+        return self.key <= other.key
 
     def __gt__(self, other):
-        return self.__cmp__(other) > 0
+        return self.key > other.key
 
     def __ge__(self, other):
-        return self.__cmp__(other) >= 0
+        return self.key >= other.key
 
     def __str__(self):
         return '%s.%s.%s.%s' % (self.major_version, self.minor_version, self.major_build, self.minor_build)
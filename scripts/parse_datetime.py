@@ -0,0 +1,31 @@
+#!/usr/bin/env python
+
+# Measures the time spent parsing datetime strings from EWS responses. DateTimeField.from_xml() calls
+# EWSDateTime.from_string() for each datetime field of each item. No server is needed.
+import time
+
+import dateutil.parser
+
+from exchangelib import EWSDateTime
+
+strings = {
+    'UTC': ['2018-%02d-%02dT%02d:%02d:%02dZ' % (i % 12 + 1, i % 28 + 1, i % 24, i % 60, i % 60) for i in range(100000)],
+    'offset': ['2018-%02d-%02dT%02d:%02d:%02d+01:00' % (i % 12 + 1, i % 28 + 1, i % 24, i % 60, i % 60)
+               for i in range(100000)],
+}
+
+
+# Worker
+def test(name, func, values):
+    t1 = time.monotonic()
+    for s in values:
+        func(s)
+    t2 = time.monotonic()
+    delta = t2 - t1
+    print('%s: Time to parse %s strings: %.2f sec (%.0f per sec)' % (name, len(values), delta, len(values) / delta))
+
+
+for _ in range(3):
+    for fmt, values in strings.items():
+        test('from_string (%s)' % fmt, EWSDateTime.from_string, values)
+        test('dateutil (%s)' % fmt, dateutil.parser.parse, values)
@@ -43,6 +43,9 @@ setup(
                       'isodate'],
     extras_require={
         'kerberos': ['requests_kerberos'],
+        'async': ['aiohttp'],
+        'numpy': ['numpy'],
+        'pandas': ['numpy', 'pandas'],
     },
     packages=find_packages(exclude=('tests',)),
     tests_require=['PyYAML', 'requests_mock', 'psutil'],
@@ -1,5 +1,6 @@
 # coding=utf-8
 from collections import namedtuple
+import copy
 import datetime
 from decimal import Decimal
 from email.mime.multipart import MIMEMultipart
@@ -14,9 +15,12 @@ import math
 import os
 import pickle
 import random
+import re
+import shutil
 import socket
 import string
 import tempfile
+from threading import Thread, current_thread
 import time
 import unittest
 import unittest.util
@@ -46,7 +50,7 @@ from exchangelib.errors import RelativeRedirect, ErrorItemNotFound, ErrorInvalid
     AmbiguousTimeError, NonExistentTimeError, ErrorUnsupportedPathForQuery, \
     ErrorInvalidValueForProperty, ErrorPropertyUpdate, ErrorDeleteDistinguishedFolder, \
     ErrorNoPublicFolderReplicaAvailable, ErrorServerBusy, ErrorInvalidPropertySet, ErrorObjectTypeChanged, \
-    ErrorInvalidIdMalformed, SessionPoolMinSizeReached
+    ErrorInvalidIdMalformed, SessionPoolMinSizeReached, MalformedResponseError, ErrorTimeoutExpired
 from exchangelib.ewsdatetime import EWSDateTime, EWSDate, EWSTimeZone, UTC, UTC_NOW
 from exchangelib.extended_properties import ExtendedProperty, ExternId
 from exchangelib.fields import BooleanField, IntegerField, DecimalField, TextField, EmailAddressField, URIField, \
@@ -60,14 +64,15 @@ from exchangelib.folders import Calendar, DeletedItems, Drafts, Inbox, Outbox, S
     AllItems, ConversationSettings, Friends, RSSFeeds, Sharing, IMContactList, QuickContacts, Journal, Notes, \
     SyncIssues, MyContacts, ToDoSearch, FolderCollection, DistinguishedFolderId, Files, \
     DefaultFoldersChangeHistory, PassThroughSearchResults, SmsAndChatsSync, GraphAnalytics, Signal, \
-    PdpProfileV2Secured, VoiceMail, FolderQuerySet, SingleFolderQuerySet, SHALLOW
+    PdpProfileV2Secured, VoiceMail, FolderQuerySet, SingleFolderQuerySet, SHALLOW, Root
 from exchangelib.indexed_properties import EmailAddress, PhysicalAddress, PhoneNumber, \
     SingleFieldIndexedElement, MultiFieldIndexedElement
-from exchangelib.items import Item, CalendarItem, Message, Contact, Task, DistributionList, Persona
+from exchangelib.items import Item, CalendarItem, Message, Contact, Task, DistributionList, Persona, HARD_DELETE, \
+    SEND_TO_NONE, ALL_OCCURRENCIES
 from exchangelib.properties import Attendee, Mailbox, RoomList, MessageHeader, Room, ItemId, Member, EWSElement, Body, \
     HTMLBody, TimeZone, FreeBusyView, UID, InvalidField, InvalidFieldForVersion, DLMailbox, PermissionSet, \
     Permission, UserId
-from exchangelib.protocol import BaseProtocol, Protocol, NoVerifyHTTPAdapter
+from exchangelib.protocol import BaseProtocol, Protocol, NoVerifyHTTPAdapter, CachingProtocol
 from exchangelib.queryset import QuerySet, DoesNotExist, MultipleObjectsReturned
 from exchangelib.recurrence import Recurrence, AbsoluteYearlyPattern, RelativeYearlyPattern, AbsoluteMonthlyPattern, \
     RelativeMonthlyPattern, WeeklyPattern, DailyPattern, FirstOccurrence, LastOccurrence, Occurrence, \
@@ -75,10 +80,13 @@ from exchangelib.recurrence import Recurrence, AbsoluteYearlyPattern, RelativeYe
 from exchangelib.restriction import Restriction, Q
 from exchangelib.settings import OofSettings
 from exchangelib.services import GetServerTimeZones, GetRoomLists, GetRooms, GetAttachment, ResolveNames, GetPersona, \
-    GetFolder
-from exchangelib.transport import NOAUTH, BASIC, DIGEST, NTLM, wrap, _get_auth_method_from_response
+    GetFolder, GetItem, DeleteItem, FindItem
+from exchangelib.services.common import ApiVersionTracker, ChunkSizer, create_shape_element
+from exchangelib.transport import NOAUTH, BASIC, DIGEST, NTLM, wrap, _get_auth_method_from_response, _create_envelope, \
+    _header_key, _envelope_templates
 from exchangelib.util import chunkify, peek, get_redirect_url, to_xml, BOM_UTF8, get_domain, value_to_xml_text, \
-    post_ratelimited, create_element, CONNECTION_ERRORS, PrettyXmlHandler, xml_to_str, ParseError, TNS
+    post_ratelimited, create_element, CONNECTION_ERRORS, PrettyXmlHandler, xml_to_str, ParseError, TNS, KeyedLock, \
+    shelve_open_with_failover, add_xml_child, IndexedElement, safe_xml_value, set_xml_value
 from exchangelib.version import Build, Version, EXCHANGE_2007, EXCHANGE_2010, EXCHANGE_2013
 from exchangelib.winzone import generate_map, CLDR_TO_MS_TIMEZONE_MAP, CLDR_WINZONE_URL
 
@@ -116,6 +124,78 @@ class MockResponse(object):
         return self.c
 
 
+class MockAiohttp(object):
+    # A stand-in for the parts of the aiohttp package that the asyncio service layer uses. 'response_func' is called
+    # with the URL and data of each POST request, and returns a (status_code, headers, content) tuple or an exception
+    # to raise. Coroutine methods return completed futures, because tests can't use 'async' syntax on Python 2.
+    def __init__(self, loop, response_func):
+        self.loop = loop
+        self.response_func = response_func
+        self.sessions = []
+        self.urls = []
+
+    def completed(self, result=None):
+        future = self.loop.create_future()
+        future.set_result(result)
+        return future
+
+    @staticmethod
+    def BasicAuth(login, password):
+        return namedtuple('BasicAuth', ['login', 'password'])(login=login, password=password)
+
+    @staticmethod
+    def TCPConnector(limit):
+        return limit
+
+    @staticmethod
+    def ClientTimeout(total):
+        return total
+
+    def ClientSession(self, auth, headers, connector):
+        session = MockAiohttpSession(aiohttp=self, auth=auth)
+        self.sessions.append(session)
+        return session
+
+
+class MockAiohttpSession(object):
+    def __init__(self, aiohttp, auth):
+        self.aiohttp = aiohttp
+        self.auth = auth
+        self.closed = False
+
+    def post(self, url, headers, data, allow_redirects, timeout):
+        self.aiohttp.urls.append(url)
+        res = self.aiohttp.response_func(url, data)
+        if isinstance(res, Exception):
+            raise res
+        status_code, response_headers, content = res
+        return MockAiohttpResponse(aiohttp=self.aiohttp, url=url, status=status_code, headers=response_headers,
+                                   request_headers=headers, content=content)
+
+    def close(self):
+        self.closed = True
+        return self.aiohttp.completed()
+
+
+class MockAiohttpResponse(object):
+    def __init__(self, aiohttp, url, status, headers, request_headers, content):
+        self.aiohttp = aiohttp
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.request_info = namedtuple('RequestInfo', ['headers'])(headers=request_headers)
+        self.content = content
+
+    def __aenter__(self):
+        return self.aiohttp.completed(self)
+
+    def __aexit__(self, exc_type, exc_val, exc_tb):
+        return self.aiohttp.completed()
+
+    def read(self):
+        return self.aiohttp.completed(self.content)
+
+
 class TimedTestCase(unittest.TestCase):
     SLOW_TEST_DURATION = 5  # Log tests that are slower than this value (in seconds)
 
@@ -148,6 +228,9 @@ class BuildTest(TimedTestCase):
         self.assertGreater(Build(15, 1, 1, 2), Build(15, 0, 1, 2))
         self.assertGreater(Build(15, 0, 1, 2), Build(14, 0, 1, 2))
         self.assertGreaterEqual(Build(15, 0, 1, 2), Build(15, 0, 1, 2))
+        self.assertEqual(hash(Build(15, 0, 1, 2)), hash(Build(15, 0, 1, 2)))
+        # Keys must not overflow into the next build number component
+        self.assertLess(Build(15, 0, 1, 2 ** 31), Build(15, 0, 2, 0))
 
     def test_api_version(self):
         self.assertEqual(Build(8, 0).api_version(), 'Exchange2007')
@@ -354,16 +437,315 @@ class ProtocolTest(TimedTestCase):
     def test_decrease_poolsize(self):
         protocol = Protocol(service_endpoint='https://example.com/Foo.asmx', credentials=Credentials('A', 'B'),
                             auth_type=NTLM, version=Version(Build(15, 1)))
+        protocol.prewarm_sessions()
         self.assertEqual(protocol._session_pool.qsize(), Protocol.SESSION_POOLSIZE)
         protocol.decrease_poolsize()
-        self.assertEqual(protocol._session_pool.qsize(), 3)
-        protocol.decrease_poolsize()
         self.assertEqual(protocol._session_pool.qsize(), 2)
         protocol.decrease_poolsize()
         self.assertEqual(protocol._session_pool.qsize(), 1)
         with self.assertRaises(SessionPoolMinSizeReached):
             protocol.decrease_poolsize()
         self.assertEqual(protocol._session_pool.qsize(), 1)
+        self.assertEqual([(e.old_size, e.new_size, e.reason) for e in protocol.session_pool_events],
+                         [(4, 2, 'decrease'), (2, 1, 'decrease')])
+
+    def test_decrease_poolsize_busy_sessions(self):
+        # Sessions that are in use while the pool size is decreased are closed when they are released
+        protocol = Protocol(service_endpoint='https://example.com/Busy.asmx', credentials=Credentials('A', 'B'),
+                            auth_type=NTLM, version=Version(Build(15, 1)))
+        sessions = [protocol.get_session() for _ in range(Protocol.SESSION_POOLSIZE)]
+        protocol.decrease_poolsize()
+        self.assertEqual(protocol.session_pool_size, 2)
+        for session in sessions:
+            protocol.release_session(session)
+        self.assertEqual(protocol._session_pool.qsize(), 2)
+
+    def test_increase_poolsize(self):
+        protocol = Protocol(service_endpoint='https://example.com/Grow.asmx', credentials=Credentials('A', 'B'),
+                            auth_type=NTLM, version=Version(Build(15, 1)))
+        self.assertEqual(protocol.max_session_pool_size, Protocol.SESSION_POOLSIZE)
+        protocol.decrease_poolsize()
+        protocol.decrease_poolsize()
+        self.assertEqual(protocol.session_pool_size, 1)
+        # The pool size grows by one session after a run of successful requests
+        for _ in range(Protocol.POOLSIZE_INCREASE_AFTER - 1):
+            protocol.register_success()
+        self.assertEqual(protocol.session_pool_size, 1)
+        protocol.register_success()
+        self.assertEqual(protocol.session_pool_size, 2)
+        # ... but not beyond the maximum pool size
+        for _ in range(Protocol.POOLSIZE_INCREASE_AFTER * 5):
+            protocol.register_success()
+        self.assertEqual(protocol.session_pool_size, Protocol.SESSION_POOLSIZE)
+        self.assertFalse(protocol.increase_poolsize())
+        self.assertEqual([(e.old_size, e.new_size, e.reason) for e in protocol.session_pool_events][-3:],
+                         [(1, 2, 'increase'), (2, 3, 'increase'), (3, 4, 'increase')])
+        # Concurrent successful requests grow the pool by exactly one session per run
+        protocol.decrease_poolsize()
+        protocol.decrease_poolsize()
+
+        def register_successes():
+            for _ in range(Protocol.POOLSIZE_INCREASE_AFTER // 2):
+                protocol.register_success()
+
+        threads = [Thread(target=register_successes) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(protocol.session_pool_size, 3)
+        self.assertEqual(protocol._successful_requests, 0)
+
+        # The pool may be allowed to grow beyond the initial pool size
+        class MyProtocol(Protocol):
+            MAX_SESSION_POOLSIZE = 6
+
+        protocol = MyProtocol(service_endpoint='https://example.com/Bar.asmx', credentials=Credentials('A', 'B'),
+                              auth_type=NTLM, version=Version(Build(15, 1)))
+        self.assertEqual(protocol.session_pool_size, Protocol.SESSION_POOLSIZE)
+        self.assertEqual(protocol.max_session_pool_size, 6)
+        self.assertTrue(protocol.increase_poolsize())
+        self.assertTrue(protocol.increase_poolsize())
+        self.assertFalse(protocol.increase_poolsize())
+        self.assertEqual(protocol.session_pool_size, 6)
+
+    def test_lazy_session_pool(self):
+        protocol = Protocol(service_endpoint='https://example.com/Lazy.asmx', credentials=Credentials('A', 'B'),
+                            auth_type=NTLM, version=Version(Build(15, 1)))
+        # Sessions are created on demand and then reused
+        self.assertEqual(protocol._session_count, 0)
+        session = protocol.get_session()
+        self.assertEqual(protocol._session_count, 1)
+        protocol.release_session(session)
+        self.assertEqual(protocol.get_session(), session)
+        protocol.release_session(session)
+        self.assertEqual(protocol._session_count, 1)
+        # Sessions can be created ahead of time
+        protocol.prewarm_sessions()
+        self.assertEqual(protocol._session_count, Protocol.SESSION_POOLSIZE)
+        self.assertEqual(protocol._session_pool.qsize(), Protocol.SESSION_POOLSIZE)
+        # Unpickled protocols start with an empty session pool
+        unpickled_protocol = pickle.loads(pickle.dumps(protocol))
+        self.assertEqual(unpickled_protocol._session_count, 0)
+        self.assertEqual(unpickled_protocol._session_pool.qsize(), 0)
+
+        # Sessions can be created in the background when the protocol is created
+        class PrewarmProtocol(Protocol):
+            PREWARM_SESSIONS = True
+
+        protocol = PrewarmProtocol(service_endpoint='https://example.com/Prewarm.asmx',
+                                   credentials=Credentials('A', 'B'), auth_type=NTLM, version=Version(Build(15, 1)))
+        for _ in range(50):
+            if protocol._session_pool.qsize() == Protocol.SESSION_POOLSIZE:
+                break
+            time.sleep(0.1)
+        self.assertEqual(protocol._session_pool.qsize(), Protocol.SESSION_POOLSIZE)
+        # Sessions are also prewarmed when the protocol is unpickled
+        unpickled_protocol = PrewarmProtocol.__new__(PrewarmProtocol)
+        unpickled_protocol.__setstate__(protocol.__getstate__())
+        for _ in range(50):
+            if unpickled_protocol._session_pool.qsize() == Protocol.SESSION_POOLSIZE:
+                break
+            time.sleep(0.1)
+        self.assertEqual(unpickled_protocol._session_pool.qsize(), Protocol.SESSION_POOLSIZE)
+        self.assertEqual(unpickled_protocol._session_count, Protocol.SESSION_POOLSIZE)
+        # Closing the protocol closes all sessions in the pool
+        unpickled_protocol.close()
+        self.assertEqual(unpickled_protocol._session_count, 0)
+
+    def test_protocol_cache_eviction(self):
+        max_cached_protocols = CachingProtocol.MAX_CACHED_PROTOCOLS
+        protocol_ttl = CachingProtocol.PROTOCOL_TTL
+        CachingProtocol.clear_cache()
+        try:
+            CachingProtocol.MAX_CACHED_PROTOCOLS = 2
+            protocols = []
+            for i in range(3):
+                protocols.append(Protocol(
+                    service_endpoint='https://example.com/Evict%s.asmx' % i, credentials=Credentials('A', 'B'),
+                    auth_type=NTLM, version=Version(Build(15, 1))
+                ))
+                if i == 0:
+                    # The protocol is in use, with one idle session and one session that is checked out
+                    session_in_use = protocols[0].get_session()
+                    protocols[0].release_session(protocols[0].get_session())
+                    thread_pool = protocols[0].thread_pool
+                protocols[-1].last_used -= 100 * (3 - i)
+            # The least recently used protocol was evicted
+            cached_endpoints = {key[0] for key in CachingProtocol._protocol_cache}
+            self.assertNotIn('https://example.com/Evict0.asmx', cached_endpoints)
+            self.assertIn('https://example.com/Evict1.asmx', cached_endpoints)
+            self.assertIn('https://example.com/Evict2.asmx', cached_endpoints)
+            # Only the idle session of the evicted protocol was closed. The thread pool is untouched.
+            self.assertEqual(protocols[0]._session_count, 1)
+            self.assertEqual(protocols[0]._session_pool.qsize(), 0)
+            self.assertIs(protocols[0].thread_pool, thread_pool)
+            # An evicted protocol can still be used
+            protocols[0].release_session(session_in_use)
+            protocols[0].release_session(protocols[0].get_session())
+            # Protocols expire after PROTOCOL_TTL seconds of inactivity
+            CachingProtocol.MAX_CACHED_PROTOCOLS = None
+            CachingProtocol.PROTOCOL_TTL = 150
+            CachingProtocol.reap_idle_sessions()
+            cached_endpoints = {key[0] for key in CachingProtocol._protocol_cache}
+            self.assertNotIn('https://example.com/Evict1.asmx', cached_endpoints)
+            self.assertIn('https://example.com/Evict2.asmx', cached_endpoints)
+        finally:
+            CachingProtocol.MAX_CACHED_PROTOCOLS = max_cached_protocols
+            CachingProtocol.PROTOCOL_TTL = protocol_ttl
+
+    def test_clear_cache(self):
+        protocol = Protocol(service_endpoint='https://example.com/Clear.asmx', credentials=Credentials('A', 'B'),
+                            auth_type=NTLM, version=Version(Build(15, 1)))
+        protocol.release_session(protocol.get_session())
+        # The cache is cleared while holding the cache lock
+        with CachingProtocol._protocol_cache_lock:
+            t = Thread(target=CachingProtocol.clear_cache)
+            t.start()
+            t.join(0.2)
+            self.assertTrue(t.is_alive())
+        t.join()
+        self.assertEqual(len(CachingProtocol._protocol_cache), 0)
+        self.assertEqual(protocol._session_count, 0)
+
+    def test_protocol_cache_errors(self):
+        # Errors are cached for a while
+        key = 'https://example.com/Error.asmx', Credentials('A', 'B')
+        with CachingProtocol._protocol_cache_lock:
+            CachingProtocol._protocol_cache[key] = TransportError('XXX')
+            CachingProtocol._protocol_failure_times[key] = time.time()
+        with self.assertRaises(TransportError):
+            Protocol(service_endpoint=key[0], credentials=key[1], auth_type=NTLM, version=Version(Build(15, 1)))
+        # ... but not forever
+        CachingProtocol._protocol_failure_times[key] -= CachingProtocol.NEGATIVE_TTL
+        protocol = Protocol(service_endpoint=key[0], credentials=key[1], auth_type=NTLM, version=Version(Build(15, 1)))
+        self.assertIsInstance(protocol, Protocol)
+        self.assertNotIn(key, CachingProtocol._protocol_failure_times)
+
+    def test_close_idle_sessions(self):
+        protocol = Protocol(service_endpoint='https://example.com/Idle.asmx', credentials=Credentials('A', 'B'),
+                            auth_type=NTLM, version=Version(Build(15, 1)))
+        protocol.prewarm_sessions()
+        sessions = list(protocol._session_pool.queue)
+        for session in sessions[:3]:
+            session.last_used -= 100
+        self.assertEqual(protocol.close_idle_sessions(max_idle=50), 3)
+        self.assertEqual(list(protocol._session_pool.queue), sessions[3:])
+        self.assertEqual(protocol._session_count, 1)
+        # New sessions are created on demand
+        new_sessions = [protocol.get_session() for _ in range(Protocol.SESSION_POOLSIZE)]
+        self.assertEqual(protocol._session_count, Protocol.SESSION_POOLSIZE)
+        for session in new_sessions:
+            protocol.release_session(session)
+        self.assertEqual(protocol.close_idle_sessions(max_idle=50), 0)
+        # Idle sessions are also closed in cached protocols
+        session_idle_timeout = CachingProtocol.SESSION_IDLE_TIMEOUT
+        try:
+            CachingProtocol.SESSION_IDLE_TIMEOUT = 50
+            for session in protocol._session_pool.queue:
+                session.last_used -= 100
+            CachingProtocol.reap_idle_sessions()
+            self.assertEqual(protocol._session_count, 0)
+        finally:
+            CachingProtocol.SESSION_IDLE_TIMEOUT = session_idle_timeout
+
+    def test_parallel_protocol_creation(self):
+        # Creating a protocol for one endpoint does not block creating protocols for other endpoints, but concurrent
+        # attempts to create a protocol for the same endpoint result in only one protocol.
+        created = []
+
+        class SlowProtocol(Protocol):
+            def __init__(self, *args, **kwargs):
+                if 'Slow' in kwargs['service_endpoint']:
+                    time.sleep(0.5)
+                created.append(kwargs['service_endpoint'])
+                super(SlowProtocol, self).__init__(*args, **kwargs)
+
+        def create(endpoint, results):
+            t1 = time.time()
+            results.append(SlowProtocol(service_endpoint=endpoint, credentials=Credentials('A', 'B'), auth_type=NTLM,
+                                        version=Version(Build(15, 1))))
+            results.append(time.time() - t1)
+
+        slow_results, fast_results = [], []
+        threads = [
+            Thread(target=create, args=('https://example.com/Slow.asmx', slow_results)),
+            Thread(target=create, args=('https://example.com/Slow.asmx', slow_results)),
+        ]
+        for t in threads:
+            t.start()
+        time.sleep(0.1)  # Let the slow threads acquire the lock first
+        create('https://example.com/Fast.asmx', fast_results)
+        for t in threads:
+            t.join()
+        self.assertLess(fast_results[1], 0.5)
+        self.assertEqual(created.count('https://example.com/Slow.asmx'), 1)
+        self.assertEqual(id(slow_results[0]), id(slow_results[2]))
+
+    def test_persistent_cache(self):
+        import exchangelib.protocol
+
+        class CachedProtocol(Protocol):
+            USE_PERSISTENT_CACHE = True
+
+        endpoint = 'https://example.com/Cached.asmx'
+        version = Version(Build(15, 1))
+        guesses = []
+
+        def mock_guess(protocol):
+            guesses.append(protocol)
+            return version
+
+        storage = exchangelib.protocol.BOOTSTRAP_PERSISTENT_STORAGE
+        guess = Version.guess
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            exchangelib.protocol.BOOTSTRAP_PERSISTENT_STORAGE = os.path.join(tmp_dir, 'cache')
+            Version.guess = staticmethod(mock_guess)
+            with requests_mock.mock() as m:
+                m.get('https://example.com/EWS/types.xsd', status_code=200)
+                protocol = CachedProtocol(service_endpoint=endpoint, credentials=Credentials('A', 'B'), auth_type=NTLM)
+            self.assertEqual(len(guesses), 1)
+            self.assertIn(endpoint, exchangelib.protocol._bootstrap_cache)
+
+            # A new protocol for the same endpoint, e.g. in a new process, uses the cached info without asking the
+            # server
+            CachingProtocol.clear_cache()
+            with requests_mock.mock():
+                protocol = CachedProtocol(service_endpoint=endpoint, credentials=Credentials('A', 'B'), auth_type=None)
+            self.assertEqual(len(guesses), 1)
+            self.assertEqual(protocol.auth_type, NTLM)
+            self.assertEqual(protocol.docs_auth_type, NOAUTH)
+            self.assertEqual(protocol.version.build, version.build)
+            self.assertEqual(protocol.version.api_version, version.api_version)
+
+            # The entry is removed when the server rejects our credentials
+            with requests_mock.mock() as m:
+                m.post(endpoint, status_code=401)
+                with self.assertRaises(UnauthorizedError):
+                    post_ratelimited(protocol=protocol, session=protocol.get_session(), url=endpoint, headers=None,
+                                     data='')
+            self.assertNotIn(endpoint, exchangelib.protocol._bootstrap_cache)
+
+            # Unusable cache entries are ignored
+            with shelve_open_with_failover(exchangelib.protocol.BOOTSTRAP_PERSISTENT_STORAGE) as db:
+                db[endpoint] = 'XXX'
+            self.assertIsNone(exchangelib.protocol._bootstrap_cache.get(endpoint))
+            self.assertNotIn(endpoint, exchangelib.protocol._bootstrap_cache)
+        finally:
+            exchangelib.protocol.BOOTSTRAP_PERSISTENT_STORAGE = storage
+            Version.guess = guess
+            CachingProtocol.clear_cache()
+            shutil.rmtree(tmp_dir)
+
+    def test_close_thread_pool(self):
+        protocol = Protocol(service_endpoint='https://example.com/Threads.asmx', credentials=Credentials('A', 'B'),
+                            auth_type=NTLM, version=Version(Build(15, 1)))
+        thread_pool = protocol.thread_pool
+        protocol.close()
+        # A new thread pool is created if the protocol is used again
+        self.assertNotEqual(id(protocol.thread_pool), id(thread_pool))
+        self.assertEqual(protocol.thread_pool.apply_async(sum, ([1, 2],)).get(), 3)
 
 
 class CredentialsTest(TimedTestCase):
@@ -480,6 +862,42 @@ class EWSDateTimeTest(TimedTestCase):
         # Test from_ms_id() with non-standard MS ID
         self.assertEqual(EWSTimeZone.timezone('Europe/Copenhagen'), EWSTimeZone.from_ms_id('Europe/Copenhagen'))
 
+        # Test that instances are reused
+        tz = EWSTimeZone.timezone('Europe/Copenhagen')
+        self.assertIs(EWSTimeZone.timezone('Europe/Copenhagen'), tz)
+        self.assertIs(EWSTimeZone.from_pytz(pytz.timezone('Europe/Copenhagen')), tz)
+        self.assertIs(EWSTimeZone.from_ms_id('Romance Standard Time'), EWSTimeZone.from_ms_id('Romance Standard Time'))
+        self.assertIs(EWSTimeZone.localzone(), EWSTimeZone.localzone())
+
+    def test_cached_localize_normalize(self):
+        # localize() and normalize() cache the timezone state per hour. Compare with pytz around DST transitions,
+        # including zones with transitions that are not on a whole UTC hour.
+        for location, start in (
+                ('Europe/Copenhagen', datetime.datetime(2000, 3, 25, 22)),
+                ('Europe/Copenhagen', datetime.datetime(2000, 10, 28, 22)),
+                ('America/St_Johns', datetime.datetime(2000, 4, 1, 22)),
+                ('America/St_Johns', datetime.datetime(2000, 10, 28, 22)),
+                ('Australia/Lord_Howe', datetime.datetime(2000, 3, 25, 22)),
+        ):
+            tz = EWSTimeZone.timezone(location)
+            pytz_tz = pytz.timezone(location)
+            for i in range(0, 8 * 60, 7):
+                dt = start + datetime.timedelta(minutes=i)
+                for _ in range(2):
+                    # The second run hits the cache
+                    local_dt = tz.localize(EWSDateTime.from_datetime(dt))
+                    self.assertIsInstance(local_dt, EWSDateTime)
+                    self.assertIsInstance(local_dt.tzinfo, EWSTimeZone)
+                    self.assertEqual(local_dt.utcoffset(), pytz_tz.localize(dt).utcoffset())
+                    self.assertEqual(local_dt.replace(tzinfo=None), dt)
+                    # Adding an hour may cross a transition, which normalize() must fix
+                    normalized_dt = tz.normalize(local_dt + datetime.timedelta(hours=1))
+                    pytz_normalized_dt = pytz_tz.normalize(pytz_tz.localize(dt) + datetime.timedelta(hours=1))
+                    self.assertIsInstance(normalized_dt, EWSDateTime)
+                    self.assertIsInstance(normalized_dt.tzinfo, EWSTimeZone)
+                    self.assertEqual(normalized_dt.utcoffset(), pytz_normalized_dt.utcoffset())
+                    self.assertEqual(normalized_dt.replace(tzinfo=None), pytz_normalized_dt.replace(tzinfo=None))
+
     def test_localize(self):
         # Test some cornercases around DST
         tz = EWSTimeZone.timezone('Europe/Copenhagen')
@@ -544,6 +962,21 @@ class EWSDateTimeTest(TimedTestCase):
         )
         self.assertIsInstance(EWSDateTime.from_string('2000-01-02T03:04:05+01:00'), EWSDateTime)
         self.assertIsInstance(EWSDateTime.from_string('2000-01-02T03:04:05Z'), EWSDateTime)
+        self.assertEqual(
+            EWSDateTime.from_string('2000-01-01T23:34:05-05:30'),
+            UTC.localize(EWSDateTime(2000, 1, 2, 5, 4, 5))
+        )
+        self.assertEqual(EWSDateTime.from_string('2000-01-02T03:04:05-05:30').tzinfo, UTC)
+        self.assertEqual(EWSDateTime._utc_offsets['-05:30'], -datetime.timedelta(hours=5, minutes=30))
+        # Formats that are not fixed-width are parsed by dateutil
+        self.assertIsNone(EWSDateTime._from_fixed_width_string('2000-01-02T03:04:05.678+01:00'))
+        self.assertEqual(
+            EWSDateTime.from_string('2000-01-02T03:04:05.678+01:00'),
+            UTC.localize(EWSDateTime(2000, 1, 2, 2, 4, 5, 678000))
+        )
+        self.assertIsNone(EWSDateTime._from_fixed_width_string('2000-13-02T03:04:05Z'))
+        with self.assertRaises(ValueError):
+            EWSDateTime.from_string('2000-13-02T03:04:05Z')
 
         # Test addition, subtraction, summertime etc
         self.assertIsInstance(dt + datetime.timedelta(days=1), EWSDateTime)
@@ -669,6 +1102,60 @@ class PropertiesTest(TimedTestCase):
             }
         )
 
+    def test_from_xml(self):
+        # Test that fields are parsed from their child elements, and that missing fields get their default value
+        # Elements are parsed inside their container, like in a response
+        payload = b'''\
+<?xml version="1.0" encoding="utf-8"?>
+<t:Items xmlns:t="http://schemas.microsoft.com/exchange/services/2006/types"><t:Message>
+    <t:ItemId Id="AAA" ChangeKey="BBB"/>
+    <t:Subject>Hello</t:Subject>
+    <t:Categories><t:String>foo</t:String><t:String>bar</t:String></t:Categories>
+    <t:Importance>High</t:Importance>
+    <t:Size>1234</t:Size>
+    <t:From><t:Mailbox><t:Name>Foo</t:Name><t:EmailAddress>foo@example.com</t:EmailAddress></t:Mailbox></t:From>
+    <t:IsRead>true</t:IsRead>
+</t:Message></t:Items>'''
+        item = Message.from_xml(elem=to_xml(payload).getroot()[0], account=None)
+        self.assertEqual((item.id, item.changekey), ('AAA', 'BBB'))
+        self.assertEqual(item.subject, 'Hello')
+        self.assertEqual(item.categories, ['foo', 'bar'])
+        self.assertEqual(item.importance, 'High')
+        self.assertEqual(item.size, 1234)
+        self.assertEqual(item.author, Mailbox(name='Foo', email_address='foo@example.com'))
+        self.assertEqual(item.is_read, True)
+        empty_item = Message(**{f.name: f.default for f in Message.FIELDS})
+        for f in Message.FIELDS:
+            if f.name in ('id', 'changekey', 'subject', 'categories', 'importance', 'size', 'author', 'is_read'):
+                continue
+            self.assertEqual(getattr(item, f.name), getattr(empty_item, f.name), f.name)
+
+        # Fields added after the lookup tags were cached are also parsed
+        field = TextField('foo', field_uri='item:Foo')
+        Message.add_field(field, insert_after='subject')
+        try:
+            elem = to_xml(payload.replace(b'<t:IsRead>', b'<t:Foo>Bar</t:Foo><t:IsRead>')).getroot()[0]
+            self.assertEqual(Message.from_xml(elem=elem, account=None).foo, 'Bar')
+        finally:
+            Message.remove_field(field)
+
+    def test_indexed_element(self):
+        elem = to_xml(b'''\
+<?xml version="1.0" encoding="utf-8"?>
+<t:Foo xmlns:t="http://schemas.microsoft.com/exchange/services/2006/types">
+<t:A>1</t:A><t:B>2</t:B><t:A>3</t:A></t:Foo>''').getroot()
+        indexed_elem = IndexedElement(elem)
+        self.assertIn('{%s}A' % TNS, indexed_elem)
+        self.assertNotIn('{%s}C' % TNS, indexed_elem)
+        self.assertEqual(indexed_elem.find('{%s}A' % TNS).text, '1')
+        self.assertEqual([e.text for e in indexed_elem.findall('{%s}A' % TNS)], ['1', '3'])
+        self.assertIsNone(indexed_elem.find('{%s}C' % TNS))
+        self.assertEqual(len(indexed_elem), 3)
+        self.assertEqual(indexed_elem.tag, '{%s}Foo' % TNS)
+        # Removed children are not returned
+        elem.remove(elem.find('{%s}A' % TNS))
+        self.assertEqual(indexed_elem.find('{%s}A' % TNS).text, '3')
+
     def test_physical_address(self):
         # Test that we can enter an integer zipcode and that it's converted to a string by clean()
         zipcode = 98765
@@ -699,9 +1186,44 @@ class PropertiesTest(TimedTestCase):
 
     def test_add_field(self):
         field = TextField('foo', field_uri='bar')
+        version = Version(build=EXCHANGE_2010)
+        self.assertNotIn(field, Item.supported_fields(version=version))
         Item.add_field(field, insert_after='subject')
-        self.assertEqual(Item.get_field_by_fieldname('foo'), field)
-        Item.remove_field(field)
+        try:
+            self.assertEqual(Item.get_field_by_fieldname('foo'), field)
+            self.assertIn(field, Item.supported_fields(version=version))
+        finally:
+            Item.remove_field(field)
+        # Lookups must not return the removed field
+        with self.assertRaises(InvalidField):
+            Item.get_field_by_fieldname('foo')
+        self.assertNotIn(field, Item.supported_fields(version=version))
+
+    def test_supported_fields(self):
+        # Test that supported fields are cached per build, and that registering extended properties invalidates the
+        # cache.
+        class TestProp(ExtendedProperty):
+            property_set_id = 'deadbeaf-cafe-cafe-cafe-deadbeefcafe'
+            property_name = 'Test Supported Fields Property'
+            property_type = 'Integer'
+
+        text_body = Item.get_field_by_fieldname('text_body')
+        self.assertIn(text_body, Item.supported_fields())
+        self.assertNotIn(text_body, Item.supported_fields(version=Version(build=EXCHANGE_2010)))
+        self.assertIn(text_body, Item.supported_fields(version=Version(build=EXCHANGE_2013)))
+        self.assertIs(Item.supported_fields(version=Version(build=EXCHANGE_2013)),
+                      Item.supported_fields(version=Version(build=Build(15, 0))))
+        # Folders don't return 'id' and 'changekey'
+        self.assertNotIn('id', {f.name for f in Folder.supported_fields(version=Version(build=EXCHANGE_2013))})
+        Message.register(attr_name='dead_beef', attr_cls=TestProp)
+        try:
+            field = Message.get_field_by_fieldname('dead_beef')
+            self.assertIn(field, Message.supported_fields(version=Version(build=EXCHANGE_2013)))
+        finally:
+            Message.deregister(attr_name='dead_beef')
+        with self.assertRaises(InvalidField):
+            Message.get_field_by_fieldname('dead_beef')
+        self.assertNotIn(field, Message.supported_fields(version=Version(build=EXCHANGE_2013)))
 
     def test_itemid_equality(self):
         self.assertEqual(ItemId('X', 'Y'), ItemId('X', 'Y'))
@@ -1301,6 +1823,1034 @@ class ServicesTest(TimedTestCase):
         with self.assertRaises(NotImplementedError):
             GetRooms(protocol=account.protocol).call('XXX')
 
+    def test_shape_cache(self):
+        # Test that shape elements are cached per set of field paths and version, and that registering new fields
+        # invalidates the cache.
+        class TestProp(ExtendedProperty):
+            property_set_id = 'deadbeaf-cafe-cafe-cafe-deadbeefcafe'
+            property_name = 'Test Shape Property'
+            property_type = 'Integer'
+
+        version = Version(build=EXCHANGE_2010)
+        fields = [FieldPath(field=Contact.get_field_by_fieldname('phone_numbers')),
+                  FieldPath(field=Contact.get_field_by_fieldname('subject'))]
+        shape = create_shape_element(tag='m:ItemShape', shape='IdOnly', additional_fields=fields, version=version)
+        additional_properties = shape.find('{%s}AdditionalProperties' % TNS)
+        labels = PhoneNumber.get_field_by_fieldname('label').supported_choices(version=version)
+        self.assertEqual(len(additional_properties), 1 + len(labels))
+        # A second call with the same fields in a different order returns an identical copy of the cached element
+        shape_2 = create_shape_element(tag='m:ItemShape', shape='IdOnly', additional_fields=reversed(fields),
+                                       version=Version(build=EXCHANGE_2010))
+        self.assertEqual(xml_to_str(shape), xml_to_str(shape_2))
+        self.assertIsNot(shape.find('{%s}AdditionalProperties' % TNS), shape_2.find('{%s}AdditionalProperties' % TNS))
+        allowed_fields = Folder.allowed_item_fields(version=version)
+        self.assertEqual(Folder.allowed_item_fields(version=version), allowed_fields)
+        Contact.register(attr_name='dead_beef', attr_cls=TestProp)
+        try:
+            self.assertIn(Contact.get_field_by_fieldname('dead_beef'), Folder.allowed_item_fields(version=version))
+            fields.append(FieldPath(field=Contact.get_field_by_fieldname('dead_beef')))
+            shape = create_shape_element(tag='m:ItemShape', shape='IdOnly', additional_fields=fields, version=version)
+            self.assertIn(b'Test Shape Property', xml_to_str(shape).encode('utf-8'))
+        finally:
+            Contact.deregister(attr_name='dead_beef')
+        self.assertEqual(Folder.allowed_item_fields(version=version), allowed_fields)
+
+    def test_incremental_parse(self):
+        # Test that GetItem responses are parsed incrementally, and that elements are handed out before the rest of the
+        # response has been parsed.
+        version = mock_version(build=EXCHANGE_2010)
+        account = mock_account(version=version, protocol=mock_protocol(version=version, service_endpoint='example.com'))
+        ws = GetItem(account=account)
+        message = '''<m:GetItemResponseMessage ResponseClass="Success">
+          <m:ResponseCode>NoError</m:ResponseCode>
+          <m:Items><t:Message><t:ItemId Id="id%s" ChangeKey="ck%s"/><t:Subject>%s</t:Subject></t:Message></m:Items>
+        </m:GetItemResponseMessage>'''
+        error_message = '''<m:GetItemResponseMessage ResponseClass="Error">
+          <m:MessageText>The specified object was not found in the store.</m:MessageText>
+          <m:ResponseCode>ErrorItemNotFound</m:ResponseCode>
+          <m:DescriptiveLinkKey>0</m:DescriptiveLinkKey>
+          <m:Items />
+        </m:GetItemResponseMessage>'''
+        xml = ('''<?xml version="1.0" encoding="utf-8"?>
+<s:Envelope xmlns:s="http://schemas.xmlsoap.org/soap/envelope/">
+  <s:Body>
+    <m:GetItemResponse xmlns:m="http://schemas.microsoft.com/exchange/services/2006/messages"
+        xmlns:t="http://schemas.microsoft.com/exchange/services/2006/types">
+      <m:ResponseMessages>%s</m:ResponseMessages>
+    </m:GetItemResponse>
+  </s:Body>
+</s:Envelope>''' % (message % (1, 1, 'a' * 200000) + error_message + message % (2, 2, 'b'))).encode('utf-8')
+        # Feed the response in small chunks, so we can see that it's parsed incrementally
+        payload = ws._get_soap_payload(response=MockResponse(xml[i:i + 100] for i in range(0, len(xml), 100)))
+        res = ws._get_elements_in_response(response=payload)
+        first = next(res)
+        self.assertEqual(first.findtext('{%s}Subject' % TNS), 'a' * 200000)
+        self.assertNotIn(b'id2', xml_to_str(first.getroottree().getroot()).encode('utf-8'))
+        item = Message.from_xml(elem=first, account=None)
+        self.assertEqual(item.id, 'id1')
+        self.assertIsInstance(next(res), ErrorItemNotFound)
+        self.assertEqual(Message.from_xml(elem=next(res), account=None).subject, 'b')
+        self.assertIsNone(next(res, None))
+
+        # SOAP faults are raised before any elements are handed out
+        fault_xml = b'''<?xml version="1.0" encoding="utf-8"?>
+<s:Envelope xmlns:s="http://schemas.xmlsoap.org/soap/envelope/">
+  <s:Body>
+    <s:Fault>
+      <faultcode xmlns:a="http://schemas.microsoft.com/exchange/services/2006/types">a:ErrorServerBusy</faultcode>
+      <faultstring xml:lang="en-US">The server cannot service this request right now. Try again later.</faultstring>
+      <detail xmlns:e="http://schemas.microsoft.com/exchange/services/2006/errors">
+        <e:ResponseCode>ErrorServerBusy</e:ResponseCode>
+      </detail>
+    </s:Fault>
+  </s:Body>
+</s:Envelope>'''
+        with self.assertRaises(ErrorServerBusy):
+            ws._get_soap_payload(response=MockResponse(fault_xml))
+        with self.assertRaises(SOAPError):
+            ws._get_soap_payload(response=MockResponse(b'''<?xml version="1.0" encoding="utf-8"?>
+<s:Envelope xmlns:s="http://schemas.xmlsoap.org/soap/envelope/"><s:Body><foo/></s:Body></s:Envelope>'''))
+        with self.assertRaises(MalformedResponseError):
+            ws._get_soap_payload(response=MockResponse(b'''<?xml version="1.0" encoding="utf-8"?>
+<s:Envelope xmlns:s="http://schemas.xmlsoap.org/soap/envelope/"></s:Envelope>'''))
+
+
+class MockedServerTest(TimedTestCase):
+    # Base class for tests that run against a server mocked with requests_mock. The server has a single folder with
+    # NUM_ITEMS items.
+    FIND_ITEM_RESPONSE = '''<?xml version="1.0" encoding="utf-8"?>
+<s:Envelope xmlns:s="http://schemas.xmlsoap.org/soap/envelope/">
+  <s:Header>
+    <h:ServerVersionInfo xmlns:h="http://schemas.microsoft.com/exchange/services/2006/types"
+        MajorVersion="15" MinorVersion="1" MajorBuildNumber="845" MinorBuildNumber="22" Version="V2016_10_10"/>
+  </s:Header>
+  <s:Body>
+    <m:FindItemResponse xmlns:m="http://schemas.microsoft.com/exchange/services/2006/messages"
+        xmlns:t="http://schemas.microsoft.com/exchange/services/2006/types">
+      <m:ResponseMessages>
+        <m:FindItemResponseMessage ResponseClass="Success">
+          <m:ResponseCode>NoError</m:ResponseCode>
+          <m:RootFolder IndexedPagingOffset="%(next_offset)s" TotalItemsInView="%(total)s"
+              IncludesLastItemInRange="%(is_last)s">
+            <t:Items>%(items)s</t:Items>
+          </m:RootFolder>
+        </m:FindItemResponseMessage>
+      </m:ResponseMessages>
+    </m:FindItemResponse>
+  </s:Body>
+</s:Envelope>'''
+    DELETE_ITEM_RESPONSE = '''<?xml version="1.0" encoding="utf-8"?>
+<s:Envelope xmlns:s="http://schemas.xmlsoap.org/soap/envelope/">
+  <s:Body>
+    <m:DeleteItemResponse xmlns:m="http://schemas.microsoft.com/exchange/services/2006/messages">
+      <m:ResponseMessages>%s</m:ResponseMessages>
+    </m:DeleteItemResponse>
+  </s:Body>
+</s:Envelope>'''
+    DELETE_ITEM_MESSAGE = '''<m:DeleteItemResponseMessage ResponseClass="Success">
+  <m:ResponseCode>NoError</m:ResponseCode>
+</m:DeleteItemResponseMessage>'''
+    GET_ITEM_RESPONSE = '''<?xml version="1.0" encoding="utf-8"?>
+<s:Envelope xmlns:s="http://schemas.xmlsoap.org/soap/envelope/">
+  <s:Body>
+    <m:GetItemResponse xmlns:m="http://schemas.microsoft.com/exchange/services/2006/messages"
+        xmlns:t="http://schemas.microsoft.com/exchange/services/2006/types">
+      <m:ResponseMessages>%s</m:ResponseMessages>
+    </m:GetItemResponse>
+  </s:Body>
+</s:Envelope>'''
+    GET_ITEM_MESSAGE = '''<m:GetItemResponseMessage ResponseClass="Success">
+  <m:ResponseCode>NoError</m:ResponseCode>
+  <m:Items><t:Message><t:ItemId Id="%s" ChangeKey="%s"/></t:Message></m:Items>
+</m:GetItemResponseMessage>'''
+    FIND_PEOPLE_RESPONSE = '''<?xml version="1.0" encoding="utf-8"?>
+<s:Envelope xmlns:s="http://schemas.xmlsoap.org/soap/envelope/">
+  <s:Body>
+    <m:FindPeopleResponse ResponseClass="Success" xmlns:m="http://schemas.microsoft.com/exchange/services/2006/messages"
+        xmlns:t="http://schemas.microsoft.com/exchange/services/2006/types">
+      <m:ResponseCode>NoError</m:ResponseCode>
+      <m:People>%(people)s</m:People>
+      <m:TotalNumberOfPeopleInView>%(total)s</m:TotalNumberOfPeopleInView>
+      <m:FirstMatchingRowIndex>0</m:FirstMatchingRowIndex>
+      <m:FirstLoadedRowIndex>%(offset)s</m:FirstLoadedRowIndex>
+    </m:FindPeopleResponse>
+  </s:Body>
+</s:Envelope>'''
+    SERVER_BUSY_RESPONSE = '''<?xml version="1.0" encoding="utf-8"?>
+<s:Envelope xmlns:s="http://schemas.xmlsoap.org/soap/envelope/">
+  <s:Body>
+    <s:Fault>
+      <faultcode xmlns:a="http://schemas.microsoft.com/exchange/services/2006/types">a:ErrorServerBusy</faultcode>
+      <faultstring xml:lang="en-US">The server cannot service this request right now. Try again later.</faultstring>
+      <detail>
+        <e:ResponseCode xmlns:e="http://schemas.microsoft.com/exchange/services/2006/errors">\
+ErrorServerBusy</e:ResponseCode>
+        <e:Message xmlns:e="http://schemas.microsoft.com/exchange/services/2006/errors">Busy</e:Message>
+        <t:MessageXml xmlns:t="http://schemas.microsoft.com/exchange/services/2006/types">
+          <t:Value Name="BackOffMilliseconds">500</t:Value>
+        </t:MessageXml>
+      </detail>
+    </s:Fault>
+  </s:Body>
+</s:Envelope>'''
+    NUM_ITEMS = 25
+
+    def setUp(self):
+        super(MockedServerTest, self).setUp()
+        self.config = Configuration(
+            service_endpoint='https://example.com/EWS/Exchange.asmx',
+            credentials=Credentials('foo', 'bar'),
+            auth_type=NTLM,
+            version=Version(Build(15, 1)),
+        )
+        # Protocols are cached and shared between tests. Don't carry over chunk sizes and versions learned in other
+        # tests
+        self.config.protocol.chunk_sizers.clear()
+        self.config.protocol.version_tracker.last_succeeded = None
+        self.account = Account('foo@example.com', config=self.config, default_timezone=UTC)
+        self.folder = Inbox(root=Root(account=self.account), id='XXX', changekey='YYY')
+
+    def mock_response(self, request, context):
+        if b'm:DeleteItem' in request.body:
+            return self.DELETE_ITEM_RESPONSE % (self.DELETE_ITEM_MESSAGE * request.body.count(b'<t:ItemId '))
+        if b'm:GetItem' in request.body:
+            return self.GET_ITEM_RESPONSE % ''.join(
+                self.GET_ITEM_MESSAGE % (i.decode(), c.decode())
+                for i, c in re.findall(br'<t:ItemId Id="([^"]+)" ChangeKey="([^"]+)"', request.body)
+            )
+        offset = int(re.search(br'Offset="(\d+)"', request.body).group(1))
+        page_size = int(re.search(br'MaxEntriesReturned="(\d+)"', request.body).group(1))
+        next_offset = min(offset + page_size, self.NUM_ITEMS)
+        if b'm:FindPeople' in request.body:
+            return self.FIND_PEOPLE_RESPONSE % dict(
+                total=self.NUM_ITEMS,
+                offset=offset,
+                people=''.join('<t:Persona><t:PersonaId Id="id%s"/><t:DisplayName>Person %s</t:DisplayName></t:Persona>'
+                               % (i, i) for i in range(offset, next_offset)),
+            )
+        return self.FIND_ITEM_RESPONSE % dict(
+            next_offset=next_offset,
+            total=self.NUM_ITEMS,
+            is_last='true' if next_offset == self.NUM_ITEMS else 'false',
+            items=''.join('<t:Message><t:ItemId Id="id%s" ChangeKey="ck%s"/></t:Message>' % (i, i)
+                          for i in range(offset, next_offset)),
+        )
+
+
+class QuerySetCountTest(MockedServerTest):
+    NUM_ITEMS = 2000000
+
+    @requests_mock.mock()
+    def test_count(self, m):
+        m.post(self.config.protocol.service_endpoint, text=self.mock_response)
+        # The count is read from the server in one request, without downloading all item IDs
+        qs = self.folder.filter(subject='foo')
+        self.assertEqual(qs.count(), self.NUM_ITEMS)
+        self.assertEqual(m.call_count, 1)
+        self.assertIn(b'MaxEntriesReturned="1"', m.last_request.body)
+        self.assertIn(b'<m:Restriction>', m.last_request.body)
+        self.assertEqual(len(qs), self.NUM_ITEMS)
+        self.assertTrue(qs.exists())
+        self.assertEqual(m.call_count, 3)
+        # Offset and max_items are respected
+        qs.offset = self.NUM_ITEMS - 10
+        self.assertEqual(qs.count(), 10)
+        qs.max_items = 5
+        self.assertEqual(qs.count(), 5)
+        qs.offset = self.NUM_ITEMS + 10
+        self.assertEqual(qs.count(), 0)
+        self.assertFalse(qs.exists())
+        # Empty querysets don't touch the server
+        m.reset_mock()
+        self.assertEqual(self.folder.none().count(), 0)
+        self.assertFalse(self.folder.none().exists())
+        self.assertEqual(m.call_count, 0)
+
+    @requests_mock.mock()
+    def test_count_multiple_folders(self, m):
+        # The server applies the offset to each folder separately. The count must match what iteration returns.
+        num_items = 10
+        head, message, tail = re.split(r'(?s)(<m:FindItemResponseMessage .*</m:FindItemResponseMessage>)',
+                                       self.FIND_ITEM_RESPONSE)
+
+        def mock_response(request, context):
+            offset = int(re.search(br'Offset="(\d+)"', request.body).group(1))
+            page_size = int(re.search(br'MaxEntriesReturned="(\d+)"', request.body).group(1))
+            next_offset = min(offset + page_size, num_items)
+            return head + ''.join(message % dict(
+                next_offset=next_offset,
+                total=num_items,
+                is_last='true' if next_offset >= num_items else 'false',
+                items=''.join('<t:Message><t:ItemId Id="%s-id%s" ChangeKey="ck%s"/></t:Message>'
+                              % (folder_id.decode(), i, i) for i in range(offset, next_offset)),
+            ) for folder_id in re.findall(br'<t:FolderId Id="([^"]+)"', request.body)) + tail
+
+        m.post(self.config.protocol.service_endpoint, text=mock_response)
+        other_folder = Inbox(root=self.folder.root, id='ZZZ', changekey='YYY')
+        qs = FolderCollection(account=self.account, folders=[self.folder, other_folder]).filter(subject='foo')
+        self.assertEqual(qs.count(), 2 * num_items)
+        for offset in (5, 9, 10, 15):
+            qs = FolderCollection(account=self.account, folders=[self.folder, other_folder]).filter(subject='foo')
+            qs = qs.only('id', 'changekey')
+            qs.offset = offset
+            count = qs.count()
+            self.assertEqual(count, 2 * max(num_items - offset, 0))
+            self.assertEqual(count, len(list(qs)))
+
+
+class QuerySetValuesTest(MockedServerTest):
+    def mock_response(self, request, context):
+        offset = int(re.search(br'Offset="(\d+)"', request.body).group(1))
+        page_size = int(re.search(br'MaxEntriesReturned="(\d+)"', request.body).group(1))
+        next_offset = min(offset + page_size, self.NUM_ITEMS)
+        return self.FIND_ITEM_RESPONSE % dict(
+            next_offset=next_offset,
+            total=self.NUM_ITEMS,
+            is_last='true' if next_offset == self.NUM_ITEMS else 'false',
+            items=''.join('''<t:Message><t:ItemId Id="id%s" ChangeKey="ck%s"/><t:Subject>Subject %s</t:Subject>
+<t:DateTimeReceived>2018-01-01T00:00:%02dZ</t:DateTimeReceived></t:Message>''' % (i, i, i, i)
+                          for i in range(offset, next_offset)),
+        )
+
+    @requests_mock.mock()
+    def test_values(self, m):
+        m.post(self.config.protocol.service_endpoint, text=self.mock_response)
+        expected = [
+            ('id%s' % i, 'Subject %s' % i, UTC.localize(EWSDateTime(2018, 1, 1, 0, 0, i)))
+            for i in range(self.NUM_ITEMS)
+        ]
+        self.assertEqual(
+            [(i.id, i.subject, i.datetime_received)
+             for i in self.folder.all().only('id', 'subject', 'datetime_received')],
+            expected
+        )
+        # values() and values_list() read the values directly from the XML, without creating Item objects
+        from_xml = Item.__dict__['from_xml']
+        try:
+            Item.from_xml = classmethod(lambda cls, elem, account: self.fail('Item objects were created'))
+            self.assertEqual(
+                list(self.folder.all().values('id', 'subject', 'datetime_received')),
+                [dict(id=i, subject=s, datetime_received=d) for i, s, d in expected]
+            )
+            self.assertEqual(
+                list(self.folder.all().values_list('id', 'subject', 'datetime_received')), expected
+            )
+            self.assertEqual(
+                list(self.folder.all().values_list('subject', flat=True).iterator()), [s for _, s, _ in expected]
+            )
+            self.assertEqual(self.folder.all().values_list('changekey', 'subject')[3], ('ck3', 'Subject 3'))
+        finally:
+            Item.from_xml = from_xml
+
+    @requests_mock.mock()
+    def test_lazy(self, m):
+        m.post(self.config.protocol.service_endpoint, text=self.mock_response)
+        qs = self.folder.all().only('subject', 'datetime_received')
+        eager_items = list(qs)
+        qs.lazy = True
+        lazy_items = list(qs)
+        self.assertEqual(lazy_items, eager_items)
+        # Comparing items decodes all fields, so use a new query
+        item = qs.all()[3]
+        self.assertIsInstance(item, Message)
+        self.assertEqual((item.id, item.changekey), ('id3', 'ck3'))
+        # Fields are decoded when they are first read
+        with self.assertRaises(AttributeError):
+            Message.subject.__get__(item, Message)
+        self.assertEqual(item.subject, 'Subject 3')
+        self.assertEqual(Message.subject.__get__(item, Message), 'Subject 3')
+        self.assertEqual(item.datetime_received, UTC.localize(EWSDateTime(2018, 1, 1, 0, 0, 3)))
+        self.assertEqual(item.attachments, [])
+        item.subject = 'foo'
+        self.assertEqual(item.subject, 'foo')
+        with self.assertRaises(AttributeError):
+            item.xxx
+        # Copies are fully decoded, and don't share the XML element
+        item_copy = copy.copy(item)
+        self.assertNotIn('_lazy_elem', item.__dict__)
+        self.assertNotIn('_lazy_elem', item_copy.__dict__)
+        self.assertEqual(item_copy.subject, 'foo')
+        item = qs.all()[4]
+        item.account = None
+        self.assertEqual(pickle.loads(pickle.dumps(item)).subject, 'Subject 4')
+        # Values are read from the XML directly, regardless of 'lazy'
+        self.assertEqual(qs.values_list('subject', flat=True)[2], 'Subject 2')
+
+    @requests_mock.mock()
+    def test_to_columns(self, m):
+        m.post(self.config.protocol.service_endpoint, text=self.mock_response)
+        columns = self.folder.all().to_columns('id', 'subject', 'datetime_received')
+        self.assertEqual(list(columns.keys()), ['id', 'subject', 'datetime_received'])
+        self.assertEqual(columns['id'], ['id%s' % i for i in range(self.NUM_ITEMS)])
+        self.assertEqual(columns['subject'], ['Subject %s' % i for i in range(self.NUM_ITEMS)])
+        self.assertEqual(
+            columns['datetime_received'],
+            [UTC.localize(EWSDateTime(2018, 1, 1, 0, 0, i)) for i in range(self.NUM_ITEMS)]
+        )
+        # Only ID fields
+        self.assertEqual(
+            self.folder.all().to_columns('changekey'), {'changekey': ['ck%s' % i for i in range(self.NUM_ITEMS)]}
+        )
+        self.assertEqual(self.folder.none().to_columns('subject'), {'subject': []})
+        with self.assertRaises(ValueError):
+            self.folder.all().to_columns()
+        with self.assertRaises(ValueError):
+            self.folder.all().to_columns('xxx')
+
+    @requests_mock.mock()
+    def test_to_arrays(self, m):
+        try:
+            import numpy
+        except ImportError:
+            raise self.skipTest('NumPy is not installed')
+        m.post(self.config.protocol.service_endpoint, text=self.mock_response)
+        arrays = self.folder.all().to_arrays('subject', 'datetime_received', 'size', 'is_read', 'importance')
+        self.assertEqual(arrays['subject'].dtype, numpy.dtype('object'))
+        self.assertEqual(list(arrays['subject']), ['Subject %s' % i for i in range(self.NUM_ITEMS)])
+        self.assertEqual(arrays['datetime_received'].dtype, numpy.dtype('datetime64[us]'))
+        self.assertEqual(arrays['datetime_received'][3], numpy.datetime64('2018-01-01T00:00:03'))
+        # The response has no values for these fields
+        self.assertEqual(arrays['size'].dtype, numpy.dtype('float64'))
+        self.assertTrue(numpy.isnan(arrays['size']).all())
+        self.assertEqual(arrays['is_read'].dtype, numpy.dtype('bool'))
+        self.assertFalse(arrays['is_read'].any())
+        self.assertEqual(arrays['importance'].dtype, numpy.dtype('object'))
+        self.assertEqual(set(arrays['importance']), {'Normal'})
+
+
+class PrefetchTest(MockedServerTest):
+    @requests_mock.mock()
+    def test_prefetch_pages(self, m):
+        m.post(self.config.protocol.service_endpoint, text=self.mock_response)
+        expected_ids = ['id%s' % i for i in range(self.NUM_ITEMS)]
+        for prefetch_pages in (0, 1, 2, 10):
+            m.reset_mock()
+            qs = self.folder.all().only('id', 'changekey')
+            qs.page_size = 10
+            qs.prefetch_pages = prefetch_pages
+            # Items are returned in order, and we don't request pages beyond the end of the collection
+            self.assertEqual([i.id for i in qs], expected_ids)
+            self.assertEqual(m.call_count, 3)
+            self.assertEqual(
+                sorted(int(re.search(br'Offset="(\d+)"', r.body).group(1)) for r in m.request_history),
+                [0, 10, 20]
+            )
+        # Don't prefetch beyond max_items
+        m.reset_mock()
+        qs = self.folder.all().only('id', 'changekey')
+        qs.page_size = 10
+        qs.max_items = 12
+        qs.prefetch_pages = 10
+        self.assertEqual([i.id for i in qs][:12], expected_ids[:12])
+        self.assertEqual(m.call_count, 2)
+        # Copies of the queryset keep the setting
+        self.assertEqual(qs.filter(subject='foo').prefetch_pages, 10)
+        with self.assertRaises(ValueError):
+            list(self.folder.all().folder_collection.find_items(q=Q(), prefetch_pages=-1))
+
+    @requests_mock.mock()
+    def test_parallel(self, m):
+        m.post(self.config.protocol.service_endpoint, text=self.mock_response)
+        qs = self.folder.all().only('id', 'changekey')
+        qs.page_size = 5
+        qs.parallel = True
+        self.assertEqual([i.id for i in qs], ['id%s' % i for i in range(self.NUM_ITEMS)])
+        self.assertEqual(m.call_count, 5)
+
+    @requests_mock.mock()
+    def test_prefetch_skipped_on_close(self, m):
+        # A thread pool that holds on to the tasks until we run them
+        class MockAsyncResult(object):
+            def __init__(self, func, kwargs):
+                self.func = func
+                self.kwargs = kwargs
+
+            def get(self):
+                return self.func(**self.kwargs)
+
+        class MockThreadPool(object):
+            def __init__(self):
+                self.results = []
+
+            def apply_async(self, func, args, kwargs):
+                self.results.append(MockAsyncResult(func, kwargs))
+                return self.results[-1]
+
+        thread_pool = MockThreadPool()
+        protocol = self.config.protocol
+        protocol.__dict__['thread_pool'] = thread_pool
+        self.addCleanup(protocol.__dict__.pop, 'thread_pool')
+        m.post(protocol.service_endpoint, text=self.mock_response)
+        qs = self.folder.all().only('id', 'changekey')
+        qs.page_size = 5
+        qs.prefetch_pages = 3
+        items = iter(qs)
+        self.assertEqual(next(items).id, 'id0')
+        self.assertEqual(len(thread_pool.results), 3)
+        self.assertEqual(m.call_count, 1)
+        # Prefetch tasks that haven't started when the iterator is closed, don't send their request
+        items.close()
+        self.assertEqual([r.get() for r in thread_pool.results], [None] * 3)
+        self.assertEqual(m.call_count, 1)
+
+    @requests_mock.mock()
+    def test_parallel_view_changed(self, m):
+        # Items are added to the folder after the first page. We should notice the change and continue sequentially
+        def mock_response(request, context):
+            res = self.mock_response(request, context)
+            self.NUM_ITEMS = 30
+            return res
+
+        m.post(self.config.protocol.service_endpoint, text=mock_response)
+        qs = self.folder.all().only('id', 'changekey')
+        qs.page_size = 5
+        qs.parallel = True
+        self.assertEqual([i.id for i in qs], ['id%s' % i for i in range(30)])
+
+    @requests_mock.mock()
+    def test_paged_payload_reuse(self, m):
+        # The payload is built once per query. Only the offset differs between pages.
+        m.post(self.config.protocol.service_endpoint, text=self.mock_response)
+        payload_calls = []
+
+        class MyFindItem(FindItem):
+            def get_payload(self, **kwargs):
+                payload_calls.append(kwargs['offset'])
+                return super(MyFindItem, self).get_payload(**kwargs)
+
+        for prefetch_pages in (0, 2):
+            del payload_calls[:]
+            m.reset_mock()
+            ids = [elem.find('{%s}ItemId' % TNS).get('Id') for elem in MyFindItem(
+                account=self.account, folders=[self.folder], chunk_size=10
+            ).call(
+                additional_fields=None, restriction=Restriction(Q(subject='foo'), folders=[self.folder],
+                                                                applies_to=Restriction.ITEMS),
+                order_fields=None, shape='IdOnly', query_string=None, depth='Shallow', calendar_view=None,
+                max_items=None, offset=3, prefetch_pages=prefetch_pages,
+            )]
+            self.assertEqual(ids, ['id%s' % i for i in range(3, self.NUM_ITEMS)])
+            self.assertEqual(payload_calls, [3])
+            self.assertEqual(
+                sorted(int(re.search(br'Offset="(\d+)"', r.body).group(1)) for r in m.request_history),
+                [3, 13, 23]
+            )
+            # Apart from the offset, all requests are identical
+            bodies = {re.sub(br'Offset="\d+"', b'', r.body) for r in m.request_history}
+            self.assertEqual(len(bodies), 1)
+            self.assertIn(b'<m:Restriction>', bodies.pop())
+
+
+class ApiVersionTrackerTest(MockedServerTest):
+    @requests_mock.mock()
+    def test_mixed_backends(self, m):
+        # The endpoint reports Exchange 2016, but some mailboxes live on an Exchange 2010 backend
+        version_error_response = '''<?xml version="1.0" encoding="utf-8"?>
+<s:Envelope xmlns:s="http://schemas.xmlsoap.org/soap/envelope/">
+  <s:Body>
+    <s:Fault>
+      <faultcode xmlns:a="http://schemas.microsoft.com/exchange/services/2006/types">\
+a:ErrorInvalidSchemaVersionForMailboxVersion</faultcode>
+      <faultstring xml:lang="en-US">Invalid version</faultstring>
+      <detail>
+        <e:ResponseCode xmlns:e="http://schemas.microsoft.com/exchange/services/2006/errors">\
+ErrorInvalidSchemaVersionForMailboxVersion</e:ResponseCode>
+        <e:Message xmlns:e="http://schemas.microsoft.com/exchange/services/2006/errors">Invalid version</e:Message>
+      </detail>
+    </s:Fault>
+  </s:Body>
+</s:Envelope>'''
+        server_version_header = '''
+  <s:Header>
+    <h:ServerVersionInfo xmlns:h="http://schemas.microsoft.com/exchange/services/2006/types"
+        MajorVersion="%s" MinorVersion="%s" MajorBuildNumber="123" MinorBuildNumber="4" Version="%s"/>
+  </s:Header>
+  <s:Body>'''
+        old_delete_response = self.DELETE_ITEM_RESPONSE.replace(
+            '\n  <s:Body>', server_version_header % (14, 3, 'Exchange2010_SP2'), 1)
+        new_delete_response = self.DELETE_ITEM_RESPONSE.replace(
+            '\n  <s:Body>', server_version_header % (15, 1, 'V2017_07_11'), 1)
+        requested_versions = []
+
+        def mock_response(request, context):
+            requested_versions.append(re.search(br'RequestServerVersion Version="(\w+)"', request.body).group(1))
+            if b'old' not in re.search(br'<t:PrimarySmtpAddress>(.*?)</', request.body).group(1):
+                return new_delete_response % self.DELETE_ITEM_MESSAGE
+            if requested_versions[-1] > b'Exchange2010_SP2':
+                context.status_code = 500
+                return version_error_response
+            return old_delete_response % self.DELETE_ITEM_MESSAGE
+
+        def delete(account):
+            requested_versions[:] = []
+            self.assertEqual(account.bulk_delete(ids=[('id1', 'ck1')]), [True])
+            return requested_versions
+
+        def new_account(address):
+            return Account(address, access_type=IMPERSONATION, config=self.config, default_timezone=UTC)
+
+        m.post(self.config.protocol.service_endpoint, text=mock_response)
+        version_tracker = self.config.protocol.version_tracker
+        wasted_probes = version_tracker.wasted_probes
+        # The first account on the old backend tries the versions until one works
+        old_account = new_account('old1@example.com')
+        self.assertEqual(delete(old_account)[-1], b'Exchange2010_SP2')
+        self.assertEqual(old_account.version.api_version, 'Exchange2010_SP2')
+        self.assertEqual(version_tracker.wasted_probes - wasted_probes, len(requested_versions) - 1)
+        # The next account starts with the version that last worked
+        self.assertEqual(delete(new_account('old2@example.com')), [b'Exchange2010_SP2'])
+        # The version also works on the new backend, but the account uses the version that its responses report
+        account = new_account('new1@example.com')
+        self.assertEqual(delete(account), [b'Exchange2010_SP2'])
+        self.assertEqual(account.version.api_version, 'Exchange2016')
+        self.assertEqual(account.version.build, Build(15, 1, 123, 4))
+        self.assertEqual(delete(account), [b'Exchange2016'])
+        self.assertEqual(delete(new_account('new2@example.com')), [b'Exchange2016'])
+        # The protocol version is still tried, and is never lowered
+        self.assertEqual(delete(new_account('old3@example.com'))[:2], [b'Exchange2016', b'Exchange2019'])
+        self.assertEqual(self.config.protocol.version.api_version, 'Exchange2016')
+        # Accounts keep using their own version
+        self.assertEqual(delete(old_account), [b'Exchange2010_SP2'])
+        self.assertEqual(delete(account), [b'Exchange2016'])
+
+    def test_api_version_tracker(self):
+        version_tracker = ApiVersionTracker()
+        self.assertEqual(version_tracker.prioritize(['a', 'b', 'c']), ['a', 'b', 'c'])
+        version_tracker.version_failed('a')
+        version_tracker.version_failed('b')
+        self.assertEqual(version_tracker.prioritize(['a', 'b', 'c']), ['a', 'b', 'c'])
+        self.assertEqual(version_tracker.wasted_probes, 2)
+        # The version that last worked is tried first
+        version_tracker.version_succeeded('c')
+        self.assertEqual(version_tracker.prioritize(['a', 'b', 'c']), ['c', 'a', 'b'])
+        version_tracker.version_succeeded('b')
+        self.assertEqual(version_tracker.prioritize(['a', 'b', 'c']), ['b', 'a', 'c'])
+        self.assertEqual(version_tracker.prioritize(['a', 'c']), ['a', 'c'])
+
+
+class PooledServiceTest(MockedServerTest):
+    @requests_mock.mock()
+    def test_max_in_flight(self, m):
+        m.post(self.config.protocol.service_endpoint, text=self.mock_response)
+        consumed = []
+
+        def ids():
+            for i in range(self.NUM_ITEMS):
+                consumed.append(i)
+                yield 'id%s' % i, 'ck%s' % i
+
+        kwargs = self.account._get_bulk_delete_kwargs(
+            delete_type=HARD_DELETE, send_meeting_cancellations=SEND_TO_NONE,
+            affected_task_occurrences=ALL_OCCURRENCIES, suppress_read_receipts=True,
+        )
+        res = DeleteItem(account=self.account, chunk_size=1, max_in_flight=3).call(items=ids(), **kwargs)
+        # The producer is blocked when the window is full. One more item may be consumed to find out that the next
+        # chunk exists.
+        next(res)
+        self.assertLessEqual(len(consumed), 4)
+        self.assertEqual(len(list(res)), self.NUM_ITEMS - 1)
+        self.assertEqual(m.call_count, self.NUM_ITEMS)
+        # The default depends on the session pool size
+        self.assertEqual(
+            DeleteItem(account=self.account).get_max_in_flight(), 2 * self.account.protocol.session_pool_size
+        )
+        with self.assertRaises(ValueError):
+            DeleteItem(account=self.account, max_in_flight=-1)
+        with self.assertRaises(ValueError):
+            DeleteItem(account=self.account, max_in_flight='XXX')
+
+    @requests_mock.mock()
+    def test_unordered(self, m):
+        class SlowDeleteItem(DeleteItem):
+            # The first chunk is slow. In unordered mode, results from later chunks are returned before it
+            def get_payload(self, items, **kwargs):
+                if items[0] == ('id0', 'ck0'):
+                    time.sleep(0.5)
+                return super(SlowDeleteItem, self).get_payload(items, **kwargs)
+
+        m.post(self.config.protocol.service_endpoint, text=self.mock_response)
+        ids = [('id%s' % i, 'ck%s' % i) for i in range(self.NUM_ITEMS)]
+        kwargs = self.account._get_bulk_delete_kwargs(
+            delete_type=HARD_DELETE, send_meeting_cancellations=SEND_TO_NONE,
+            affected_task_occurrences=ALL_OCCURRENCIES, suppress_read_receipts=True,
+        )
+        res = list(SlowDeleteItem(account=self.account, chunk_size=5, ordered=False).call(items=ids, **kwargs))
+        self.assertNotEqual(res[0][0], 0)
+        self.assertEqual(sorted(i for i, _ in res), list(range(self.NUM_ITEMS)))
+        # Account methods return results tagged with the input index
+        res = self.account.bulk_delete(ids=ids, chunk_size=5, ordered=False)
+        self.assertEqual(sorted(res), [(i, True) for i in range(self.NUM_ITEMS)])
+        # Ordered mode is the default
+        self.assertEqual(self.account.bulk_delete(ids=ids, chunk_size=5), [True] * self.NUM_ITEMS)
+        with self.assertRaises(ValueError):
+            self.account.bulk_delete(ids=ids, ordered='XXX')
+
+    TIMEOUT_RESPONSE = '''<?xml version="1.0" encoding="utf-8"?>
+<s:Envelope xmlns:s="http://schemas.xmlsoap.org/soap/envelope/">
+  <s:Body>
+    <s:Fault>
+      <faultcode xmlns:a="http://schemas.microsoft.com/exchange/services/2006/types">a:ErrorTimeoutExpired</faultcode>
+      <faultstring xml:lang="en-US">The operation timed out</faultstring>
+      <detail>
+        <e:ResponseCode xmlns:e="http://schemas.microsoft.com/exchange/services/2006/errors">\
+ErrorTimeoutExpired</e:ResponseCode>
+        <e:Message xmlns:e="http://schemas.microsoft.com/exchange/services/2006/errors">Timeout</e:Message>
+      </detail>
+    </s:Fault>
+  </s:Body>
+</s:Envelope>'''
+
+    @requests_mock.mock()
+    def test_adaptive_chunk_size(self, m):
+        # The server times out on requests with more than 3 items. Chunks should be split until the server accepts them
+        chunk_sizes = []
+
+        def mock_response(request, context):
+            chunk_sizes.append(request.body.count(b'<t:ItemId '))
+            if chunk_sizes[-1] > 3:
+                context.status_code = 500
+                return self.TIMEOUT_RESPONSE
+            return self.mock_response(request, context)
+
+        def fetch(**kwargs):
+            return [i.id for i in self.account.fetch(ids=ids, folder=self.folder, only_fields=['subject'], **kwargs)]
+
+        m.post(self.config.protocol.service_endpoint, text=mock_response)
+        ids = [('id%s' % i, 'ck%s' % i) for i in range(self.NUM_ITEMS)]
+        expected_ids = [i for i, _ in ids]
+        chunk_sizer = self.account.protocol.get_chunk_sizer(service_name=GetItem.SERVICE_NAME)
+        self.assertIsNone(chunk_sizer.chunk_size)
+        items = self.account.fetch(ids=ids, folder=self.folder, only_fields=['subject'], chunk_size=10, ordered=False)
+        self.assertEqual(sorted(i for i, _ in items), list(range(self.NUM_ITEMS)))
+        self.assertEqual(sum(c for c in chunk_sizes if c <= 3), self.NUM_ITEMS)
+        # The chunk size was lowered for the next requests
+        self.assertLess(chunk_sizer.chunk_size, chunk_sizer.failed_size)
+        self.assertLessEqual(chunk_sizer.failed_size, 5)
+        self.assertEqual(self.account.protocol.get_chunk_sizer(service_name='DeleteItem').chunk_size, None)
+        chunk_sizes[:] = []
+        self.assertEqual(fetch(chunk_size=10), expected_ids)
+        self.assertLess(chunk_sizer.chunk_size, chunk_sizer.failed_size)
+        # The chunk size grows again after a run of fast responses, but not to a size that has failed
+        chunk_sizer.chunk_size, chunk_sizer.failed_size = 2, 4
+        for _ in range(chunk_sizer.GROW_AFTER):
+            chunk_sizer.chunk_succeeded(size=chunk_sizer.chunk_size, seconds=0.1)
+        self.assertEqual(chunk_sizer.chunk_size, 3)
+        chunk_sizer.failed_size = None
+        for _ in range(chunk_sizer.GROW_AFTER):
+            chunk_sizer.chunk_succeeded(size=chunk_sizer.chunk_size, seconds=0.1)
+        self.assertEqual(chunk_sizer.chunk_size, 6)
+        self.assertEqual(fetch(chunk_size=10), expected_ids)
+        self.assertLessEqual(chunk_sizer.failed_size, 6)
+        self.assertLess(chunk_sizer.chunk_size, chunk_sizer.failed_size)
+
+    @requests_mock.mock()
+    def test_chunk_size_ignores_back_off(self, m):
+        # The server asks us to back off before it accepts the chunk. The back off period is not the response time of
+        # the server, so the chunk size must not shrink.
+        responses = [self.SERVER_BUSY_RESPONSE]
+
+        def mock_response(request, context):
+            if responses:
+                context.status_code = 500
+                return responses.pop()
+            return self.mock_response(request, context)
+
+        m.post(self.config.protocol.service_endpoint, text=mock_response)
+        protocol = self.account.protocol
+        credentials, pool_size = protocol.credentials, protocol._session_pool_size
+        protocol.credentials = ServiceAccount(username=credentials.username, password=credentials.password)
+        chunk_sizer = protocol.get_chunk_sizer(service_name=GetItem.SERVICE_NAME)
+        chunk_sizer.TARGET_RESPONSE_TIME = 0.2
+        try:
+            ids = [('id%s' % i, 'ck%s' % i) for i in range(self.NUM_ITEMS)]
+            t1 = time.time()
+            items = self.account.fetch(ids=ids, folder=self.folder, only_fields=['subject'], chunk_size=self.NUM_ITEMS)
+            self.assertEqual([i.id for i in items], [i for i, _ in ids])
+            self.assertGreaterEqual(time.time() - t1, 0.4)
+            self.assertEqual(m.call_count, 2)
+            self.assertIsNone(chunk_sizer.chunk_size)
+            self.assertLess(chunk_sizer.seconds_per_item * self.NUM_ITEMS, 0.2)
+        finally:
+            protocol.credentials = credentials
+            protocol._session_pool_size = pool_size
+
+    @requests_mock.mock()
+    def test_chunk_not_resent(self, m):
+        # The server may have created some of the items before timing out. Services with side effects must not split
+        # and resend the chunk.
+        m.post(self.config.protocol.service_endpoint, text=self.TIMEOUT_RESPONSE, status_code=500)
+        items = [Message(account=self.account, folder=self.folder, subject='Test %s' % i) for i in range(10)]
+        with self.assertRaises((ErrorTimeoutExpired, ErrorServerBusy)):
+            self.account.bulk_create(folder=self.folder, items=items, chunk_size=10)
+        self.assertEqual(m.call_count, 1)
+        self.assertIsNone(self.account.protocol.get_chunk_sizer(service_name='CreateItem').failed_size)
+        m.reset_mock()
+        with self.assertRaises((ErrorTimeoutExpired, ErrorServerBusy)):
+            self.account.bulk_delete(ids=[('id%s' % i, 'ck%s' % i) for i in range(10)], chunk_size=10)
+        self.assertEqual(m.call_count, 1)
+
+    def test_chunk_sizer(self):
+        chunk_sizer = ChunkSizer(service_name='XXX')
+        self.assertEqual(chunk_sizer.get_chunk_size(max_size=100), 100)
+        chunk_sizer.chunk_failed(size=100)
+        self.assertEqual(chunk_sizer.get_chunk_size(max_size=100), 50)
+        self.assertEqual(chunk_sizer.get_chunk_size(max_size=10), 10)
+        chunk_sizer.chunk_failed(size=1)
+        self.assertEqual(chunk_sizer.get_chunk_size(max_size=100), 1)
+        # Slow responses lower the chunk size to what we can process within the target response time
+        chunk_sizer = ChunkSizer(service_name='XXX')
+        chunk_sizer.chunk_succeeded(size=100, seconds=chunk_sizer.TARGET_RESPONSE_TIME * 2)
+        self.assertEqual(chunk_sizer.get_chunk_size(max_size=100), 50)
+        # Responses that are not slow don't grow the chunk size beyond that
+        for _ in range(chunk_sizer.GROW_AFTER * 3):
+            chunk_sizer.chunk_succeeded(size=50, seconds=chunk_sizer.TARGET_RESPONSE_TIME)
+        self.assertEqual(chunk_sizer.get_chunk_size(max_size=100), 50)
+        # Faster responses do
+        for _ in range(chunk_sizer.GROW_AFTER * 3):
+            chunk_sizer.chunk_succeeded(size=50, seconds=chunk_sizer.TARGET_RESPONSE_TIME / 10.0)
+        self.assertEqual(chunk_sizer.get_chunk_size(max_size=100), 100)
+
+
+@unittest.skipIf(PY2, 'asyncio requires Python 3')
+class AsyncTest(MockedServerTest):
+    # Tests the asyncio service layer. With NTLM auth, requests are sent with 'requests' from the default executor of
+    # the event loop, so requests_mock can intercept them.
+    def setUp(self):
+        import asyncio
+        super(AsyncTest, self).setUp()
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        import asyncio
+        from exchangelib.aio import close_connections
+        self.loop.run_until_complete(close_connections())
+        self.loop.close()
+        asyncio.set_event_loop(None)
+        super(AsyncTest, self).tearDown()
+
+    def consume(self, async_iterable):
+        # Collects the results of an async iterable without 'async for', which is a syntax error on Python 2
+        async_iterator = async_iterable.__aiter__()
+        res = []
+        while True:
+            try:
+                res.append(self.loop.run_until_complete(async_iterator.__anext__()))
+            except StopAsyncIteration:  # noqa: F821
+                return res
+
+    @requests_mock.mock()
+    def test_queryset_async_iter(self, m):
+        m.post(self.config.protocol.service_endpoint, text=self.mock_response)
+        qs = self.folder.all().only('id', 'changekey')
+        qs.page_size = 10
+        items = self.consume(qs)
+        self.assertEqual(m.call_count, 3)
+        self.assertEqual(
+            [(i.id, i.changekey) for i in items],
+            [('id%s' % i, 'ck%s' % i) for i in range(self.NUM_ITEMS)]
+        )
+        # The cache was filled
+        self.assertTrue(qs.is_cached)
+        self.assertEqual(self.consume(qs), items)
+        self.assertEqual(m.call_count, 3)
+        # Return formats are supported
+        self.assertEqual(
+            self.consume(self.folder.all().values_list('id', flat=True)),
+            ['id%s' % i for i in range(self.NUM_ITEMS)]
+        )
+        # Empty querysets don't touch the server
+        self.assertEqual(self.consume(self.folder.none()), [])
+        self.assertEqual(m.call_count, 4)
+
+    @requests_mock.mock()
+    def test_bulk_delete_async(self, m):
+        m.post(self.config.protocol.service_endpoint, text=self.mock_response)
+        ids = [('id%s' % i, 'ck%s' % i) for i in range(self.NUM_ITEMS)]
+        res = self.loop.run_until_complete(self.account.abulk_delete(ids=ids, chunk_size=7))
+        self.assertEqual(res, [True] * self.NUM_ITEMS)
+        self.assertEqual(m.call_count, 4)
+        # An async QuerySet is also accepted as input
+        res = self.loop.run_until_complete(
+            self.account.abulk_delete(ids=self.folder.all().only('id', 'changekey'), chunk_size=10)
+        )
+        self.assertEqual(res, [True] * self.NUM_ITEMS)
+        # Empty input doesn't touch the server
+        m.reset_mock()
+        self.assertEqual(self.loop.run_until_complete(self.account.abulk_delete(ids=[])), [])
+        self.assertEqual(m.call_count, 0)
+        # Results can be returned in the order they complete, tagged with their input index
+        res = self.loop.run_until_complete(self.account.abulk_delete(ids=ids, chunk_size=7, ordered=False))
+        self.assertEqual(sorted(res), [(i, True) for i in range(self.NUM_ITEMS)])
+        # Arguments are validated when the coroutine is created
+        with self.assertRaises(ValueError):
+            self.account.abulk_delete(ids=ids, delete_type='XXX')
+
+    @requests_mock.mock()
+    def test_back_off_async(self, m):
+        # The session pool size is decreased outside the event loop, since it takes a thread lock and closes sessions
+        responses = [self.SERVER_BUSY_RESPONSE]
+
+        def mock_response(request, context):
+            if responses:
+                context.status_code = 500
+                return responses.pop()
+            return self.mock_response(request, context)
+
+        m.post(self.config.protocol.service_endpoint, text=mock_response)
+        protocol = self.account.protocol
+        credentials, pool_size = protocol.credentials, protocol._session_pool_size
+        protocol.credentials = ServiceAccount(username=credentials.username, password=credentials.password)
+        threads = []
+
+        def decrease_poolsize():
+            threads.append(current_thread())
+            Protocol.decrease_poolsize(protocol)
+
+        protocol.decrease_poolsize = decrease_poolsize
+        try:
+            ids = [('id%s' % i, 'ck%s' % i) for i in range(self.NUM_ITEMS)]
+            res = self.loop.run_until_complete(self.account.abulk_delete(ids=ids, chunk_size=self.NUM_ITEMS))
+            self.assertEqual(res, [True] * self.NUM_ITEMS)
+            self.assertEqual(m.call_count, 2)
+            self.assertEqual(len(threads), 1)
+            self.assertNotEqual(threads[0], current_thread())
+        finally:
+            del protocol.decrease_poolsize
+            protocol.credentials = credentials
+            protocol._session_pool_size = pool_size
+
+    @requests_mock.mock()
+    def test_persona_async_iter(self, m):
+        m.post(self.config.protocol.service_endpoint, text=self.mock_response)
+        qs = self.folder.people().only('display_name')
+        qs.page_size = 10
+        personas = self.consume(qs)
+        self.assertEqual(m.call_count, 3)
+        self.assertEqual([(p.id, p.display_name) for p in personas],
+                         [('id%s' % i, 'Person %s' % i) for i in range(self.NUM_ITEMS)])
+        self.assertEqual(personas, list(self.folder.people().only('display_name')))
+
+    def test_streaming_service(self):
+        from exchangelib.aio import get_async_service
+        with self.assertRaises(ValueError):
+            get_async_service(GetAttachment)
+
+    def mock_aiohttp(self, response_func):
+        # Returns an account with basic auth, which sends its async requests through a mocked aiohttp
+        import exchangelib.aio
+        aiohttp = MockAiohttp(loop=self.loop, response_func=response_func)
+        self.addCleanup(setattr, exchangelib.aio, 'aiohttp', exchangelib.aio.aiohttp)
+        exchangelib.aio.aiohttp = aiohttp
+        config = Configuration(
+            service_endpoint='https://aiohttp.example.com/EWS/Exchange.asmx',
+            credentials=Credentials('foo', 'bar'),
+            auth_type=BASIC,
+            version=Version(Build(15, 1)),
+        )
+        return aiohttp, Account('foo@example.com', config=config, default_timezone=UTC)
+
+    def test_aiohttp_session(self):
+        def response_func(url, data):
+            request = namedtuple('Request', ['body'])(body=data)
+            return 200, {}, self.mock_response(request=request, context=None).encode('utf-8')
+
+        aiohttp, account = self.mock_aiohttp(response_func)
+        ids = [('id%s' % i, 'ck%s' % i) for i in range(self.NUM_ITEMS)]
+        folder = Inbox(root=Root(account=account), id='XXX', changekey='YYY')
+        items = self.consume(account.afetch(ids=ids, folder=folder, only_fields=['subject'], chunk_size=10))
+        self.assertEqual([i.id for i in items], [i for i, _ in ids])
+        self.assertEqual(len(aiohttp.urls), 3)
+        self.assertEqual(aiohttp.sessions[0].auth, ('foo', 'bar'))
+        self.assertEqual(self.loop.run_until_complete(account.abulk_delete(ids=ids)), [True] * self.NUM_ITEMS)
+        # Sessions are closed by close_connections()
+        from exchangelib.aio import close_connections
+        self.loop.run_until_complete(close_connections())
+        self.assertTrue(all(s.closed for s in aiohttp.sessions))
+
+    def test_aiohttp_post_ratelimited(self):
+        import asyncio
+        from exchangelib.aio import get_session_pool, post_ratelimited
+        responses = []
+        aiohttp, account = self.mock_aiohttp(lambda url, data: responses.pop(0))
+        protocol = account.protocol
+        url = protocol.service_endpoint
+        pool = get_session_pool(protocol)
+
+        def post(mock_responses, allow_redirects=False):
+            responses[:] = mock_responses
+            session = self.loop.run_until_complete(pool.get_session())
+            r, session = self.loop.run_until_complete(post_ratelimited(
+                protocol=protocol, session=session, url=url, headers={}, data=b'', allow_redirects=allow_redirects
+            ))
+            self.loop.run_until_complete(pool.release_session(session))
+            return r
+
+        r = post([(200, {}, b'foo')])
+        self.assertEqual((r.status_code, r.url, r.content), (200, url, b'foo'))
+        # Sessions with errors are closed and replaced with a fresh session
+        with self.assertRaises(asyncio.TimeoutError):
+            post([asyncio.TimeoutError()])
+        self.assertTrue(aiohttp.sessions[0].closed)
+        with self.assertRaises(UnauthorizedError):
+            post([(401, {}, b'')])
+        with self.assertRaises(TransportError):
+            post([(404, {}, b'')])
+        # Allow XML data in a non-HTTP 200 response
+        r = post([(500, {}, b'<?xml version="1.0" ?><foo></foo>')])
+        self.assertEqual(r.content, b'<?xml version="1.0" ?><foo></foo>')
+        # Redirects
+        with self.assertRaises(TransportError):
+            post([(302, {}, b'')])
+        with self.assertRaises(RedirectError):
+            post([(302, {'location': '/EWS/Other.asmx'}, b'')])
+        with self.assertRaises(TransportError):
+            post([(302, {'location': 'https://contoso.com/EWS/Exchange.asmx'}, b'')])
+        del aiohttp.urls[:]
+        r = post([(302, {'location': 'https://contoso.com/EWS/Exchange.asmx'}, b''), (200, {}, b'foo')],
+                 allow_redirects=True)
+        self.assertEqual(aiohttp.urls, [url, 'https://contoso.com/EWS/Exchange.asmx'])
+        self.assertEqual((r.url, r.content), ('https://contoso.com/EWS/Exchange.asmx', b'foo'))
+        # Retired sessions don't change the session count
+        self.assertEqual(pool._session_count, 1)
+
+        credentials = protocol.credentials
+        protocol.credentials = ServiceAccount(username='foo', password='bar', max_wait=1)
+        try:
+            # Rate limit exceeded
+            with self.assertRaises(RateLimitError):
+                post([(503, {}, b'')])
+            # Requests wait for the back off period requested by the server
+            protocol.credentials.back_off(0.5)
+            t1 = time.monotonic()
+            post([(200, {}, b'foo')])
+            self.assertGreaterEqual(time.monotonic() - t1, 0.4)
+        finally:
+            protocol.credentials = credentials
+
+    def test_session_pool_waiters(self):
+        import asyncio
+        from exchangelib.aio import get_session_pool
+        protocol = self.account.protocol
+        pool = get_session_pool(protocol)
+        pool_size = protocol._session_pool_size
+        protocol._session_pool_size = 1
+        try:
+            session = self.loop.run_until_complete(pool.get_session())
+            waiters = [self.loop.create_task(pool.get_session()) for _ in range(2)]
+            self.loop.run_until_complete(asyncio.sleep(0.01))
+            self.assertFalse(any(w.done() for w in waiters))
+            # Both waiters are served when the pool size is increased while they wait
+            self.assertTrue(protocol.increase_poolsize())
+            self.loop.run_until_complete(pool.release_session(session))
+            sessions = self.loop.run_until_complete(asyncio.wait_for(asyncio.gather(*waiters), timeout=1))
+            self.assertIn(session, sessions)
+            self.assertEqual(pool._session_count, 2)
+            for s in sessions:
+                self.loop.run_until_complete(pool.release_session(s))
+        finally:
+            protocol._session_pool_size = pool_size
+
 
 class TransportTest(TimedTestCase):
     @requests_mock.mock()
@@ -1375,6 +2925,29 @@ class TransportTest(TimedTestCase):
 
 
 class UtilTest(TimedTestCase):
+    def test_keyed_lock(self):
+        lock = KeyedLock()
+        events = []
+
+        def worker(key, name):
+            with lock(key):
+                events.append(('start', key, name))
+                time.sleep(0.2)
+                events.append(('end', key, name))
+
+        threads = [Thread(target=worker, args=(key, name)) for key, name in (('a', 1), ('a', 2), ('b', 3))]
+        t1 = time.time()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        # Threads with different keys run in parallel. Threads with the same key are serialized
+        self.assertLess(time.time() - t1, 0.6)
+        a_events = [e[0] for e in events if e[1] == 'a']
+        self.assertEqual(a_events, ['start', 'end', 'start', 'end'])
+        # Locks are cleaned up
+        self.assertEqual(len(lock), 0)
+
     def test_chunkify(self):
         # Test tuple, list, set, range, map, chain and generator
         seq = [1, 2, 3, 4, 5]
@@ -1473,6 +3046,47 @@ class UtilTest(TimedTestCase):
             # Not all lxml versions throw an error here, so we can't use assertRaises
             self.assertIn('Offending text: [...]<t:Foo><t:Bar>Baz</t[...]', e.args[0])
 
+    def test_value_to_xml_text(self):
+        self.assertEqual(value_to_xml_text('foo'), 'foo')
+        self.assertEqual(value_to_xml_text(Body('foo')), 'foo')  # A subclass of a registered type
+        self.assertEqual(value_to_xml_text(True), '1')
+        self.assertEqual(value_to_xml_text(False), '0')
+        self.assertEqual(value_to_xml_text(42), '42')
+        self.assertEqual(value_to_xml_text(datetime.time(10, 20, 30)), '10:20:30')
+        self.assertEqual(value_to_xml_text(EWSTimeZone.timezone('Europe/Copenhagen')), 'Romance Standard Time')
+        self.assertEqual(value_to_xml_text(UTC.localize(EWSDateTime(2000, 1, 2, 3, 4, 5))), '2000-01-02T03:04:05Z')
+        self.assertEqual(value_to_xml_text(EWSDate(2000, 1, 2)), '2000-01-02')
+        self.assertEqual(value_to_xml_text(Mailbox(email_address='foo@example.com')), 'foo@example.com')
+        self.assertEqual(value_to_xml_text(Attendee(mailbox=Mailbox(email_address='foo@example.com'),
+                                                    response_type='Accept')), 'foo@example.com')
+        with self.assertRaises(NotImplementedError):
+            value_to_xml_text(object())
+
+    def test_safe_xml_value(self):
+        self.assertEqual(safe_xml_value('foo bar'), 'foo bar')
+        self.assertEqual(safe_xml_value('foo\nbar\tbaz'), 'foo\nbar\tbaz')
+        self.assertEqual(safe_xml_value('foo\x00bar\x1fbaz'), 'foo?bar?baz')
+        self.assertEqual(safe_xml_value('foo\x08bar', replacement=''), 'foobar')
+
+    def test_set_xml_value(self):
+        version = Version(build=EXCHANGE_2010)
+        self.assertEqual(set_xml_value(create_element('t:Foo'), 42, version=version).text, '42')
+        elem = set_xml_value(create_element('t:Foo'), (s for s in ('a', 'b')), version=version)
+        self.assertEqual([e.text for e in elem], ['a', 'b'])
+        elem = set_xml_value(create_element('t:Foo'), Mailbox(email_address='foo@example.com'), version=version)
+        self.assertEqual(elem[0].tag, '{%s}Mailbox' % TNS)
+        with self.assertRaises(ValueError):
+            set_xml_value(create_element('t:Foo'), Mailbox(email_address='foo@example.com'), version=None)
+        with self.assertRaises(ValueError):
+            set_xml_value(create_element('t:Foo'), object(), version=version)
+        with self.assertRaises(ValueError):
+            set_xml_value(create_element('t:Foo'), [object()], version=version)
+
+    def test_create_element(self):
+        self.assertEqual(create_element('t:Foo').tag, '{%s}Foo' % TNS)
+        self.assertEqual(create_element('t:Foo').tag, '{%s}Foo' % TNS)
+        self.assertEqual(create_element('Foo').tag, 'Foo')
+
     def test_get_domain(self):
         self.assertEqual(get_domain('foo@example.com'), 'example.com')
         with self.assertRaises(ValueError):
@@ -1731,6 +3345,32 @@ class CommonTest(EWSTest):
 </s:Envelope>
 ''')
 
+    def test_wrap_template_cache(self):
+        # Test that the cached envelope produces the same bytes as serializing the full envelope tree
+        MockTZ = namedtuple('EWSTimeZone', ['ms_id'])
+        MockAccount = namedtuple('Account', ['access_type', 'primary_smtp_address', 'default_timezone'])
+
+        def get_content():
+            content = create_element('m:GetItem')
+            add_xml_child(content, 't:BaseShape', 'IdOnly & \xe6\xf8\xe5')
+            return content
+
+        for account in (
+            None,
+            MockAccount(DELEGATE, 'foo@example.com', MockTZ('XXX')),
+            MockAccount(IMPERSONATION, 'foo@example.com', MockTZ('XXX')),
+            MockAccount(IMPERSONATION, 'bar@example.com', MockTZ('YYY')),
+        ):
+            envelope = _create_envelope(version='BBB', account=account)
+            body = create_element('s:Body')
+            body.append(get_content())
+            envelope.append(body)
+            expected = xml_to_str(envelope, encoding='utf-8', xml_declaration=True)
+            self.assertEqual(wrap(content=get_content(), version='BBB', account=account), expected)
+            # Second call uses the cached template
+            self.assertIn(_header_key(version='BBB', account=account), _envelope_templates)
+            self.assertEqual(wrap(content=get_content(), version='BBB', account=account), expected)
+
     def test_poolsize(self):
         self.assertEqual(self.account.protocol.SESSION_POOLSIZE, 4)
 